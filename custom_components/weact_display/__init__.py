@@ -11,7 +11,7 @@ toDo:
 + show icon
 + clear screen
 + analog/digital clock, wird solange minütlich aktualisiert bis ein neues Kommando kommt
-- Rheinturm wird sekündlich neu gemacht, allerdings auch nur der untere Teil mit den Sekunden. Der Rest minütlich
++ Rheinturm wird sekündlich neu gemacht, allerdings nur die umgeschalteten Lampen
 + pic from file
 + set orientation
 + lautstärke
@@ -32,17 +32,14 @@ import os
 import pathlib
 import random
 import re
-import serial
 import struct
-import threading
 import time
 import zoneinfo
 
-from PIL import Image
 from pathlib import Path
 from homeassistant.components import usb
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, ServiceCall, callback, EVENT_HOMEASSISTANT_STARTED
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse, callback, EVENT_HOMEASSISTANT_STARTED
 from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.discovery import async_load_platform
@@ -52,10 +49,16 @@ from datetime import datetime, timedelta
 
 import custom_components.weact_display.const as const
 from .models import DISPLAY_MODELS
-from .clock import start_analog_clock, start_digital_clock, stop_clock
+from .calibration import apply_tuning, calibrate_transfer
+from .clock import start_analog_clock, start_digital_clock, start_rheinturm, stop_clock
 from .commands import normalize_color
-#from .clock import stop_clock, start_analog_clock, start_digital_clock, start_rheinturm
-from .commands import display_selftest, draw_circle, draw_line, draw_line_chart, draw_rectangle, draw_triangle, draw_progress_bar, enable_humiture_reports, generate_random, generate_qr, open_serial, parse_packet, read_firmware_version, read_who_am_i, replace_bg_color, send_full_color, send_screen, set_brightness, set_orientation, show_bmp, show_icon, show_init_screen, write_text
+from .shadow import ShadowImage
+from .fonts import load_custom_fonts
+from .framer import PacketFramer
+from .transport import SerialTransport
+from .render import shutdown_render_executor, start_loop_monitor
+from .widgets import draw_widgets, load_widgets, register_widget, remove_widget, save_widget_values, unbind_widgets, update_widget
+from .commands import display_selftest, draw_batch, draw_circle, draw_line, draw_line_chart, draw_rectangle, draw_triangle, draw_progress_bar, enable_humiture_reports, generate_random, generate_qr, open_serial, parse_packet, read_firmware_version, read_who_am_i, replace_bg_color, send_full_color, send_screen, set_brightness, set_orientation, show_bmp, show_icon, show_init_screen, write_text
 #from .draws import write_text, show_icon, draw_circle, draw_line, draw_rectangle, draw_triangle, draw_progress_bar, generate_qr
 
 # ------------------------------------------------------------
@@ -76,6 +79,9 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     devices       = domain_data.setdefault("devices", {})
     device_id_map = domain_data.setdefault("device_id_map", {})
 
+    if "loop_monitor" not in domain_data:
+        domain_data["loop_monitor"] = start_loop_monitor(hass)   # misst, wie lange der Event-Loop blockiert ist
+
     serial_number     = entry.unique_id
     device_path       = entry.data.get("device_path", None)
     model             = entry.data.get("model", None)
@@ -162,7 +168,15 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     devices[serial_number]["clock_handle"]              = None
     devices[serial_number]["screencare_handle"]         = None
     devices[serial_number]["lock"]                      = asyncio.Lock()
-    devices[serial_number]["shadow"]                    = Image.new("RGB", (width, height))
+    devices[serial_number]["shadow"]                    = ShadowImage(width, height, background_color)
+    devices[serial_number]["render_lock"]               = asyncio.Lock()
+    devices[serial_number]["flush_waiter"]              = None
+    devices[serial_number]["flush_task"]                = None
+    devices[serial_number]["flush_event"]               = asyncio.Event()
+    devices[serial_number]["pending"]                   = {}
+    devices[serial_number]["brightness_waiter"]         = None
+    devices[serial_number]["brightness_task"]           = None
+    await load_widgets(hass, serial_number, entry.options)
     _LOGGER.debug(f"devices={devices}")
 
     # === DEVICE REGISTRY ===
@@ -208,12 +222,42 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     
     # Uhr anhalten
     await stop_clock(hass, serial_number)
+
+    # Widgets hören nicht mehr auf ihre Entitäten, letzte Werte sofort schreiben
+    if serial_number in hass.data[const.DOMAIN]["devices"]:
+        unbind_widgets(hass, serial_number)
+        await save_widget_values(hass, serial_number)
+
+    # laufenden Flush und Helligkeitswechsel abbrechen
+    for task_key in ("flush_task", "brightness_task"):
+        task = hass.data[const.DOMAIN]["devices"].get(serial_number, {}).get(task_key)
+        if task and not task.done():
+            task.cancel()
+
+    # wer noch auf einen Flush wartet, wird freigegeben, auch wenn der Flush nie gestartet ist
+    waiter = hass.data[const.DOMAIN]["devices"].get(serial_number, {}).get("flush_waiter")
+    if waiter is not None and not waiter.done():
+        waiter.set_result(None)
+    if serial_number in hass.data[const.DOMAIN]["devices"]:
+        hass.data[const.DOMAIN]["devices"][serial_number]["flush_waiter"] = None
+
+    # serielle Schnittstelle schließen
+    transport = hass.data[const.DOMAIN]["devices"].get(serial_number, {}).get("transport")
+    if transport:
+        await transport.async_stop()
     # Plattformen entladen
     unload_ok = await hass.config_entries.async_unload_platforms(entry, ["sensor", "select", "number", "switch"],)
 
     if unload_ok and serial_number:
         hass.data[const.DOMAIN]["devices"].pop(serial_number, None)
 
+    # letztes Display weg: Render-Executor und Loop-Messung beenden
+    if not hass.data[const.DOMAIN]["devices"]:
+        stop_monitor = hass.data[const.DOMAIN].pop("loop_monitor", None)
+        if stop_monitor:
+            stop_monitor()
+        shutdown_render_executor(hass)
+
     return unload_ok
 
 
@@ -225,6 +269,9 @@ async def async_setup(hass: HomeAssistant, config):
     const.ICON_CACHE_DIR.mkdir(parents=True, exist_ok=True)
     _LOGGER.debug(f"image path set to: {const.IMG_PATH}, icon path set to: {const.ICON_CACHE_DIR}")
 
+    # eigene Schriften einmal laden
+    await load_custom_fonts(hass)
+
 
 ###
 # ab hier die Dienste
@@ -272,6 +319,7 @@ async def async_setup(hass: HomeAssistant, config):
         t_color = call.data.get("t_color", None)
         bg_color = call.data.get("bg_color", None)
         rotation = call.data.get("rotation", None)
+        font = call.data.get("font", None)
 
         # device registry lookup
         serial_number = hass.data[const.DOMAIN]["device_id_map"][device_id].get("serial_number")
@@ -279,9 +327,9 @@ async def async_setup(hass: HomeAssistant, config):
             _LOGGER.error(f"no serial_number found in device mapping for device-id {device_id}")
             return
 
-        _LOGGER.debug(f"values given: device={device_id}, serial-number={serial_number}, text={text}, xs={xs}, ys={ys}, xe={xe}, ye={ye}, font-size={font_size}, t-color={t_color}, bg-color={bg_color}, rotation={rotation}")
+        _LOGGER.debug(f"values given: device={device_id}, serial-number={serial_number}, text={text}, xs={xs}, ys={ys}, xe={xe}, ye={ye}, font-size={font_size}, t-color={t_color}, bg-color={bg_color}, rotation={rotation}, font={font}")
 
-        await write_text(hass, serial_number, text, xs, ys, xe, ye, font_size = font_size, t_color = t_color, bg_color = bg_color, rotation = rotation)
+        await write_text(hass, serial_number, text, xs, ys, xe, ye, font_size = font_size, t_color = t_color, bg_color = bg_color, rotation = rotation, font = font)
 
     hass.services.async_register(const.DOMAIN, "write_text", handle_send_text)
 
@@ -555,6 +603,8 @@ async def async_setup(hass: HomeAssistant, config):
         v_shift = call.data.get("v_shift")
         scale_size = call.data.get("scale_size")
         rotation = call.data.get("rotation")
+        show_seconds = call.data.get("show_seconds", False)
+        s_color = call.data.get("ss_color")
 
         # device registry lookup
         serial_number = hass.data[const.DOMAIN]["device_id_map"][device_id].get("serial_number")
@@ -562,9 +612,9 @@ async def async_setup(hass: HomeAssistant, config):
             _LOGGER.error(f"no serial_number found in device mapping for device-id {device_id}")
             return
 
-        _LOGGER.debug(f"values given: device={device_id}, serial-number={serial_number}, scale-color={sc_color}, scale-frame-color={scf_color}, hour-color={h_color}, minute-color={m_color}, offset={offset_hours}, h-shift={h_shift}, v-shift={v_shift}, scale-size={scale_size}, rotation={rotation}")
+        _LOGGER.debug(f"values given: device={device_id}, serial-number={serial_number}, scale-color={sc_color}, scale-frame-color={scf_color}, hour-color={h_color}, minute-color={m_color}, offset={offset_hours}, h-shift={h_shift}, v-shift={v_shift}, scale-size={scale_size}, rotation={rotation}, show-seconds={show_seconds}, second-color={s_color}")
 
-        await start_analog_clock(hass, serial_number, sc_color = sc_color, scf_color = scf_color, h_color = h_color, m_color = m_color, offset_hours = offset_hours, h_shift = h_shift, v_shift = v_shift, scale_size = scale_size, rotation = rotation)
+        await start_analog_clock(hass, serial_number, sc_color = sc_color, scf_color = scf_color, h_color = h_color, m_color = m_color, offset_hours = offset_hours, h_shift = h_shift, v_shift = v_shift, scale_size = scale_size, rotation = rotation, show_seconds = show_seconds, s_color = s_color)
 
     hass.services.async_register(const.DOMAIN, "start_analog_clock", handle_start_analog_clock)
 
@@ -589,6 +639,7 @@ async def async_setup(hass: HomeAssistant, config):
         offset_hours = call.data.get("offset")
         digit_size = call.data.get("digit_size")
         rotation = call.data.get("rotation", None)
+        show_seconds = call.data.get("show_seconds", False)
 
         # device registry lookup
         serial_number = hass.data[const.DOMAIN]["device_id_map"][device_id].get("serial_number")
@@ -596,9 +647,9 @@ async def async_setup(hass: HomeAssistant, config):
             _LOGGER.error(f"no serial_number found in device mapping for device-id {device_id}")
             return
 
-        _LOGGER.debug(f"values given: device={device_id}, serial-number={serial_number}, xs={xs}, ys={ys}, background-color={bg_color}, digit-color={d_color}, offset={offset_hours}, digit-size={digit_size},  rotation={rotation}")
+        _LOGGER.debug(f"values given: device={device_id}, serial-number={serial_number}, xs={xs}, ys={ys}, background-color={bg_color}, digit-color={d_color}, offset={offset_hours}, digit-size={digit_size},  rotation={rotation}, show-seconds={show_seconds}")
 
-        await start_digital_clock(hass, serial_number, xs = xs, ys = ys, bg_color = bg_color, d_color = d_color, cf_color = cf_color, cf_width = cf_width, offset_hours = offset_hours, digit_size = digit_size, rotation = rotation)
+        await start_digital_clock(hass, serial_number, xs = xs, ys = ys, bg_color = bg_color, d_color = d_color, cf_color = cf_color, cf_width = cf_width, offset_hours = offset_hours, digit_size = digit_size, rotation = rotation, show_seconds = show_seconds)
 
     hass.services.async_register(const.DOMAIN, "start_digital_clock", handle_start_digital_clock)
 
@@ -614,7 +665,8 @@ async def async_setup(hass: HomeAssistant, config):
             _LOGGER.error("missing mandatory device id")
             return
 
-        rotation = call.data.get("rotation", None)
+        offset_hours = call.data.get("offset")
+        h_shift = call.data.get("h_shift")
 
         # device registry lookup
         serial_number = hass.data[const.DOMAIN]["device_id_map"][device_id].get("serial_number")
@@ -622,11 +674,11 @@ async def async_setup(hass: HomeAssistant, config):
             _LOGGER.error(f"no serial_number found in device mapping for device-id {device_id}")
             return
 
-        _LOGGER.debug(f"values given: device={device_id}, serial-number={serial_number}, rotation={rotation}")
+        _LOGGER.debug(f"values given: device={device_id}, serial-number={serial_number}, offset={offset_hours}, h-shift={h_shift}")
 
-        await start_rheinturm(hass, serial_number, rotation = rotation)
+        await start_rheinturm(hass, serial_number, offset_hours = offset_hours, h_shift = h_shift)
 
-#    hass.services.async_register(const.DOMAIN, "start_rheinturm", handle_start_rheinturm)
+    hass.services.async_register(const.DOMAIN, "start_rheinturm", handle_start_rheinturm)
 
     # --------------------------------------------------------
     # Service: Show Icon
@@ -994,6 +1046,154 @@ async def async_setup(hass: HomeAssistant, config):
     hass.services.async_register(const.DOMAIN, "draw_line_chart", handle_draw_line_chart)
 
 
+    # --------------------------------------------------------
+    # Service: draw batch
+    # --------------------------------------------------------
+    async def handle_draw_batch(call: ServiceCall) -> ServiceResponse:
+        _LOGGER.debug("called service to draw a batch of primitives")
+
+        device_id = call.data.get("display", None)
+        if device_id is None:
+            _LOGGER.error("missing mandatory device id")
+            return {}
+
+        items = call.data.get("items", [])
+
+        # device registry lookup
+        serial_number = hass.data[const.DOMAIN]["device_id_map"][device_id].get("serial_number")
+        if not serial_number:
+            _LOGGER.error(f"no serial_number found in device mapping for device-id {device_id}")
+            return {}
+
+        _LOGGER.debug(f"values given: device={device_id}, serial-number={serial_number}, items={len(items)}")
+
+        return await draw_batch(hass, serial_number, items)
+
+    hass.services.async_register(const.DOMAIN, "draw_batch", handle_draw_batch, supports_response=SupportsResponse.OPTIONAL)
+
+
+    # --------------------------------------------------------
+    # Service: register widget
+    # --------------------------------------------------------
+    async def handle_register_widget(call: ServiceCall):
+        _LOGGER.debug("called service to register a widget")
+
+        device_id = call.data.get("display", None)
+        if device_id is None:
+            _LOGGER.error("missing mandatory device id")
+            return
+
+        name = call.data.get("name", None)
+        if name is None:
+            _LOGGER.error("missing mandatory widget name")
+            return
+
+        w_type  = call.data.get("widget_type", "text")
+        xs      = call.data.get("x_start")
+        ys      = call.data.get("y_start")
+        xe      = call.data.get("x_end")
+        ye      = call.data.get("y_end")
+        options = call.data.get("options", None)
+        value   = call.data.get("value", None)
+        entity  = call.data.get("entity_id", None)
+
+        # device registry lookup
+        serial_number = hass.data[const.DOMAIN]["device_id_map"][device_id].get("serial_number")
+        if not serial_number:
+            _LOGGER.error(f"no serial_number found in device mapping for device-id {device_id}")
+            return
+
+        _LOGGER.debug(f"values given: device={device_id}, serial-number={serial_number}, name={name}, type={w_type}, x-start={xs}, y-start={ys}, x-end={xe}, y-end={ye}, options={options}, value={value}, entity-id={entity}")
+
+        await register_widget(hass, serial_number, name, w_type, xs, ys, xe, ye, options=options, value=value, entity_id=entity)
+
+    hass.services.async_register(const.DOMAIN, "register_widget", handle_register_widget)
+
+
+    # --------------------------------------------------------
+    # Service: update widget
+    # --------------------------------------------------------
+    async def handle_update_widget(call: ServiceCall):
+        _LOGGER.debug("called service to update a widget")
+
+        device_id = call.data.get("display", None)
+        if device_id is None:
+            _LOGGER.error("missing mandatory device id")
+            return
+
+        name = call.data.get("name", None)
+        if name is None:
+            _LOGGER.error("missing mandatory widget name")
+            return
+
+        value = call.data.get("value", None)
+
+        # device registry lookup
+        serial_number = hass.data[const.DOMAIN]["device_id_map"][device_id].get("serial_number")
+        if not serial_number:
+            _LOGGER.error(f"no serial_number found in device mapping for device-id {device_id}")
+            return
+
+        _LOGGER.debug(f"values given: device={device_id}, serial-number={serial_number}, name={name}, value={value}")
+
+        await update_widget(hass, serial_number, name, value)
+
+    hass.services.async_register(const.DOMAIN, "update_widget", handle_update_widget)
+
+
+    # --------------------------------------------------------
+    # Service: remove widget
+    # --------------------------------------------------------
+    async def handle_remove_widget(call: ServiceCall):
+        _LOGGER.debug("called service to remove a widget")
+
+        device_id = call.data.get("display", None)
+        if device_id is None:
+            _LOGGER.error("missing mandatory device id")
+            return
+
+        name = call.data.get("name", None)
+        if name is None:
+            _LOGGER.error("missing mandatory widget name")
+            return
+
+        # device registry lookup
+        serial_number = hass.data[const.DOMAIN]["device_id_map"][device_id].get("serial_number")
+        if not serial_number:
+            _LOGGER.error(f"no serial_number found in device mapping for device-id {device_id}")
+            return
+
+        _LOGGER.debug(f"values given: device={device_id}, serial-number={serial_number}, name={name}")
+
+        await remove_widget(hass, serial_number, name)
+
+    hass.services.async_register(const.DOMAIN, "remove_widget", handle_remove_widget)
+
+
+    # --------------------------------------------------------
+    # Service: Übertragung kalibrieren
+    # --------------------------------------------------------
+    async def handle_calibrate_transfer(call: ServiceCall) -> ServiceResponse:
+        _LOGGER.debug("called service to calibrate the transfer")
+
+        device_id = call.data.get("display", None)
+        if device_id is None:
+            _LOGGER.error("missing mandatory device id")
+            return {}
+
+        # device registry lookup
+        serial_number = hass.data[const.DOMAIN]["device_id_map"][device_id].get("serial_number")
+        if not serial_number:
+            _LOGGER.error(f"no serial_number found in device mapping for device-id {device_id}")
+            return {}
+
+        _LOGGER.debug(f"values given: device={device_id}, serial-number={serial_number}")
+
+        return await calibrate_transfer(hass, serial_number)
+
+    hass.services.async_register(const.DOMAIN, "calibrate_transfer", handle_calibrate_transfer, supports_response=SupportsResponse.OPTIONAL)
+
+
     # --------------------------------------------------------
     #   T H E   E N D  !
     # --------------------------------------------------------
@@ -1022,6 +1222,15 @@ async def post_startup(hass: HomeAssistant, entry):
         _LOGGER.debug(f"successfully opened serial-port {device_path}")
 
         device["serial_port"] = serial_port
+        device["framer"]      = PacketFramer()
+        device["transport"]   = SerialTransport(
+            hass,
+            serial_number,
+            serial_port,
+            on_data = lambda data: _handle_serial_data(hass, serial_number, data),
+            on_lost = lambda exc: _handle_serial_lost(hass, serial_number),
+        )
+        device["transport"].start()
         device["state"]       = "ready"
 
         hass.bus.async_fire("weact_display", {"have fun with the new display at": hass.data[const.DOMAIN]["devices"][serial_number]["device_path"]})
@@ -1030,7 +1239,6 @@ async def post_startup(hass: HomeAssistant, entry):
         _LOGGER.error(f"Error while initializing display: {e}")
         return False
 
-    await start_serial_reader_thread(hass, serial_number)
     await asyncio.sleep(0.1)  # kleinen Yield geben
     await set_orientation(hass, serial_number, int(device.get("orientation_value")), force = True)
     await set_brightness(hass, serial_number, int(device.get("brightness")))
@@ -1039,56 +1247,46 @@ async def post_startup(hass: HomeAssistant, entry):
         await enable_humiture_reports(hass, serial_number)
     await read_who_am_i(hass, serial_number)
     await read_firmware_version(hass, serial_number)
+    apply_tuning(hass, serial_number, entry.options.get("tuning"))
     await display_selftest(hass, serial_number)
     width  = device.get("width")
     height = device.get("height")
     background_color = device.get("background_color")
     _LOGGER.debug(f"painting initial background ({background_color})")
     await draw_rectangle(hass, serial_number, xs=0, ys=0, xe=width-1, ye=height-1, rf_width=0, rf_color=background_color, f_color=background_color)
+    await draw_widgets(hass, serial_number)
     await setup_screencare(hass, serial_number)
 
     _LOGGER.info(f"post-startup done for serial {serial_number} on {device_path}, WeAct Display {model} is now waiting for some commands")
 
 
-async def start_serial_reader_thread(hass, serial_number):
-    _LOGGER.debug(f"starting serial-reader-thread for serial {serial_number}")
-    device = hass.data[const.DOMAIN]["devices"][serial_number]
-    _LOGGER.debug(f"device={device}")
-    device_path = device["device_path"]
-    serial_port = device["serial_port"]
-
-    if device_path is None:
-        _LOGGER.error(f"No device-path for {serial_number}")
-        return
- 
-    def reader():
-        _LOGGER.debug(f"enabling serial reader for serial-number {serial_number}")
-
-        while True:
-            try:
-                data = serial_port.read(64)   # blockiert bis timeout oder Daten
-                if not data:
-                    continue  # Timeout → ruhig weiter
+#************************************************************************
+# called by the transport on the event loop for every chunk received,
+# the framer cuts the chunks into complete packets
+#************************************************************************
+def _handle_serial_data(hass, serial_number, data):
+    _LOGGER.debug(f"RX [{serial_number}]: {data.hex(' ')}")                       # Zeige rohe Daten an (Hex + ASCII)
 
-                _LOGGER.debug(f"RX [{serial_number}]: {data.hex(' ')}")                       # Zeige rohe Daten an (Hex + ASCII)
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+    framer = device["framer"]
 
-                if not parse_packet(hass, serial_number, packet=data):
-                    _LOGGER.warning(f"could not parse the packet {data.hex(' ')} from {device_path}")
+    for packet in framer.feed(data):
+        if not parse_packet(hass, serial_number, packet=packet):
+            _LOGGER.warning(f"could not parse the packet {packet.hex(' ')} from {device.get("device_path")}")
 
-            except serial.SerialException:
-                _LOGGER.warning(f"WeAct Display {serial_number} disconnected")
-                hass.data[const.DOMAIN]["devices"][serial_number]["online"] = False
-                hass.data[const.DOMAIN]["devices"][serial_number]["state"] = "port error"
-                break
+    device["rx_packets"] = framer.packets
+    device["rx_resyncs"] = framer.resyncs
 
-            except Exception as e:
-                _LOGGER.error(f"Thread error for serial-port {device_path}: {e}")
-                break
 
-        _LOGGER.warning(f"serial reader stopped for serial-port {device_path} (This should only be reached while unloading !!)")
- 
-    t = threading.Thread(target=reader, daemon=True)
-    t.start()
+#************************************************************************
+# called by the transport once the serial port is gone
+#************************************************************************
+def _handle_serial_lost(hass, serial_number):
+    device = hass.data[const.DOMAIN]["devices"].get(serial_number)
+    if device is None:
+        return
+    device["online"] = False
+    device["state"] = "port error"
 
 
 async def setup_screencare(hass, serial_number):
@@ -1140,17 +1338,12 @@ async def run_screencare(hass, serial_number):
     entry_id = device.get("entry_id")
     entry = hass.config_entries.async_get_entry(entry_id)
 
-    # backup ziehen
-    shadow = device.get("shadow")
-    backup = shadow.copy()
-
-    # screencare
+    # screencare, geht am Schattenbild vorbei direkt an das Display
     for i in range(6):
         await generate_random(hass, serial_number, suppress_delete=True)
         await asyncio.sleep(6)
 
-    # restore
-    device["shadow"] = backup
-    await send_screen(hass, serial_number)
+    # restore, das Schattenbild ist unverändert
+    await send_screen(hass, serial_number, full = True)
 
     _LOGGER.debug(f"screencare finished for serial {serial_number}")
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import struct
+import time
+
+import custom_components.weact_display.const as const
+from .encoder import encode_rgb565
+from .render import async_render, async_render_job
+
+_LOGGER = logging.getLogger(__name__)
+
+
+#************************************************************************
+#        C A L I B R A T E  T R A N S F E R
+#************************************************************************
+# measures the sustained bitmap throughput of a display for combinations
+# of stripe size and header pause and keeps the fastest one that works.
+#
+# the test bitmap is the current screen content, so nothing visible
+# changes. A combination counts as working if the display still answers
+# WHO_AM_I right after the transfer; if it does not, the display has
+# lost track of the data and the screen is repaired with safe values.
+# Smaller pauses are only tried as long as the larger ones worked.
+#
+# the result is stored in the options of the config entry together with
+# model and firmware version and applied to all later transfers
+#************************************************************************
+# m: hass
+# m: serial_number
+# r: dictionary with the chosen values and all measurements
+#************************************************************************
+async def calibrate_transfer(hass, serial_number):
+    from .commands import _query, send_bitmap_565, send_screen
+
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+
+    if not device.get("transport"):
+        _LOGGER.warning(f"Display {serial_number} not connected")
+        return {}
+
+    entry = hass.config_entries.async_get_entry(device.get("entry_id"))
+    if not entry:
+        _LOGGER.error(f"no config entry found for serial {serial_number}")
+        return {}
+
+    _LOGGER.info(f"calibrating the transfer for serial {serial_number}, model {device.get("model")}, firmware {device.get("firmware_version")}")
+
+    # Panel auf den Stand des Schattenbilds bringen
+    shadow = device["shadow"]
+    await send_screen(hass, serial_number)
+    width, height = shadow.size
+    box = (0, 0, width, height)
+    data_888 = await async_render(hass, serial_number, shadow.image.tobytes)
+    data_565 = await async_render_job(hass, encode_rgb565, data_888, width, height)
+
+    who_am_i = struct.pack("<BB", const.CMD_WHO_AM_I, 0x0A)
+
+    measurements = []
+    best = None
+    for header_pause in const.CALIBRATION_HEADER_PAUSES:
+        pause_ok = False
+        for stripe_bytes in const.CALIBRATION_STRIPE_BYTES:
+            start = time.monotonic()
+            sent = await send_bitmap_565(hass, serial_number, *box, data_565, stripe_bytes = stripe_bytes, header_pause = header_pause, fastlz = False)
+            elapsed = time.monotonic() - start
+            answered = sent and await _query(hass, serial_number, who_am_i, const.CMD_WHO_AM_I, retries = 0) is not None
+
+            result = {
+                "stripe_bytes": stripe_bytes,
+                "header_pause": header_pause,
+                "throughput": round(len(data_565) / elapsed) if elapsed > 0 else 0,
+                "ok": answered,
+            }
+            measurements.append(result)
+            _LOGGER.debug(f"calibration of {serial_number}: {result}")
+
+            if not answered:
+                # Display hat sich verschluckt: mit sicheren Werten neu aufbauen
+                await asyncio.sleep(const.CALIBRATION_RECOVERY)
+                await send_bitmap_565(hass, serial_number, *box, data_565, stripe_bytes = const.BITMAP_STRIPE_BYTES, header_pause = const.HEADER_PAUSE, fastlz = False)
+                continue
+
+            pause_ok = True
+            if best is None or result["throughput"] > best["throughput"]:
+                best = result
+
+        if not pause_ok:
+            break                                              # kürzere Pausen klappen dann erst recht nicht
+
+    if best is None:
+        _LOGGER.warning(f"calibration of {serial_number} found no working combination, keeping the defaults")
+        return {"measurements": measurements}
+
+    tuning = {
+        "model": device.get("model"),
+        "firmware_version": device.get("firmware_version"),
+        "stripe_bytes": best["stripe_bytes"],
+        "header_pause": best["header_pause"],
+        "throughput": best["throughput"],
+    }
+
+    hass.config_entries.async_update_entry(entry, options={**entry.options, "tuning": tuning})
+    apply_tuning(hass, serial_number, tuning)
+
+    _LOGGER.info(f"calibration of {serial_number} done: stripes of {tuning["stripe_bytes"]} bytes, header pause {tuning["header_pause"]} s, {tuning["throughput"]} bytes/s")
+
+    return {**tuning, "measurements": measurements}
+
+
+#************************************************************************
+#        A P P L Y  T U N I N G
+#************************************************************************
+# uses stored calibration values for the transfers of a display,
+# but only if they were measured with the same model and firmware
+#************************************************************************
+# m: hass
+# m: serial_number
+# m: tuning, dictionary as stored by calibrate_transfer(), may be None
+# r: True if applied
+#************************************************************************
+def apply_tuning(hass, serial_number, tuning):
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+
+    if not tuning:
+        return False
+
+    if tuning.get("model") != device.get("model") or tuning.get("firmware_version") != device.get("firmware_version"):
+        _LOGGER.info(f"stored calibration of {serial_number} was made for {tuning.get("model")} with firmware {tuning.get("firmware_version")}, using the defaults")
+        return False
+
+    device["stripe_bytes"] = tuning["stripe_bytes"]
+    device["header_pause"] = tuning["header_pause"]
+    device["throughput"]   = tuning.get("throughput")
+
+    _LOGGER.debug(f"applied calibration to {serial_number}: stripes of {device["stripe_bytes"]} bytes, header pause {device["header_pause"]} s")
+
+    return True
@@ -2,12 +2,16 @@ import asyncio, struct, logging
 import subprocess
 import time
 import os
-from PIL import Image, ImageDraw, ImageFont, ImageColor
+from PIL import Image, ImageDraw, ImageColor
 import math
 from datetime import datetime, timedelta
+from functools import lru_cache
 from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.core import HomeAssistant
 import custom_components.weact_display.const as const
+from .fonts import get_font, text_bbox
+from .models import DISPLAY_MODELS
+from .render import async_render, async_render_job
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -21,27 +25,27 @@ _LOGGER = logging.getLogger(__name__)
 # m: serial_number
 #************************************************************************
 async def stop_clock(hass, serial_number):
+    from .commands import send_screen
+
     _LOGGER.debug(f"stopping any running clock for serial {serial_number}...")
 
     device = hass.data[const.DOMAIN]["devices"][serial_number]
     clock_mode = device.get("clock_mode")
     clock_handle = device.get("clock_handle")
-    bg_color = device.get("background_color")
 
     _LOGGER.debug(f"actually running clock-mode is {clock_mode}")
 
     if clock_handle is not None:
-        if device["clock_mode"] == "analog":
-            await show_analog_clock(hass, serial_number, sc_color = bg_color, h_color = bg_color, m_color = bg_color, scf_color = bg_color)
-            _LOGGER.debug(f"deleted last analog drawing")
-        if device["clock_mode"] == "digital":
-            await show_digital_clock(hass, serial_number, xs = None, ys = None, digit_size = None, rotation = 0, d_color = bg_color, bg_color = bg_color, cf_color = bg_color, cf_width = 0, offset_hours = None, am_pm = False)
-            _LOGGER.debug(f"deleted last digital drawing")
-        if device["clock_mode"] == "rheinturm":
-            await delete_rheinturm(hass, serial_number)
-            _LOGGER.debug(f"deleted last rheinturm drawing")
+        # Uhr-Ebene leeren, darunter liegende Ebenen kommen wieder zum Vorschein
+        shadow = device.get("shadow")
+        await async_render(hass, serial_number, shadow.clear_layer, const.LAYER_CLOCK)
+        await send_screen(hass, serial_number)
+        _LOGGER.debug(f"deleted last {clock_mode} drawing")
         clock_handle()
         device["clock_handle"] = None
+        device["digital_clock"] = None
+        device["analog_clock"] = None
+        device["rheinturm"] = None
         device["clock_mode"] = "idle"
         _LOGGER.debug(f"deleted clock_handle")
 
@@ -77,16 +81,23 @@ async def start_analog_clock(hass, serial_number, **kwargs):
 
     await show_analog_clock(hass, serial_number, **kwargs)
 
-    async def _task():
+    # mit Sekundenzeiger jede Sekunde, sonst jede Minute
+    if kwargs.get("show_seconds"):
+        interval = timedelta(seconds=1)
+        seconds_to_wait = 1 - datetime.now().microsecond / 1000000
+    else:
+        interval = timedelta(minutes=1)
         seconds_to_wait = 60 - datetime.now().second
-        _LOGGER.debug(f"need to wait {seconds_to_wait} seconds for the next minute")
+
+    async def _task():
+        _LOGGER.debug(f"need to wait {seconds_to_wait} seconds for the next update")
         await asyncio.sleep(seconds_to_wait)
         await show_analog_clock(hass, serial_number, **kwargs)
-        device["clock_handle"] = async_track_time_interval(hass, _update_analog, timedelta(minutes=1))
+        device["clock_handle"] = async_track_time_interval(hass, _update_analog, interval)
     asyncio.create_task(_task())
 
     _LOGGER.debug(f"set clock-mode from {clock_mode} to {device["clock_mode"]}")
-    _LOGGER.info("Analog clock update scheduled every minute")
+    _LOGGER.info(f"Analog clock update scheduled every {interval.total_seconds():.0f} seconds")
 
 
 #************************************************************************
@@ -117,44 +128,65 @@ async def start_digital_clock(hass, serial_number, **kwargs):
 
     await show_digital_clock(hass, serial_number, **kwargs)
 
-    async def _task():
+    # mit Sekunden jede Sekunde, sonst jede Minute
+    if kwargs.get("show_seconds"):
+        interval = timedelta(seconds=1)
+        seconds_to_wait = 1 - datetime.now().microsecond / 1000000
+    else:
+        interval = timedelta(minutes=1)
         seconds_to_wait = 60 - datetime.now().second
-        _LOGGER.debug(f"need to wait {seconds_to_wait} seconds for the next minute")
+
+    async def _task():
+        _LOGGER.debug(f"need to wait {seconds_to_wait} seconds for the next update")
         await asyncio.sleep(seconds_to_wait)
         await show_digital_clock(hass, serial_number, **kwargs)
-        device["clock_handle"] = async_track_time_interval(hass, _update_digital, timedelta(minutes=1))
+        device["clock_handle"] = async_track_time_interval(hass, _update_digital, interval)
     asyncio.create_task(_task())
 
     _LOGGER.debug(f"set clock-mode from {clock_mode} to {device["clock_mode"]}")
-    _LOGGER.info("Digital clock update scheduled every minute")
+    _LOGGER.info(f"Digital clock update scheduled every {interval.total_seconds():.0f} seconds")
 
-async def _start_rheinturm_clock(hass, serial_number, **kwargs):
+#************************************************************************
+#        S T A R T  R H E I N T U R M
+#************************************************************************
+# starts the rheinturm light clock, updated every second
+#************************************************************************
+# m: hass
+# m: serial_number
+# m: kwargs
+#************************************************************************
+async def start_rheinturm(hass, serial_number, **kwargs):
 
     async def _update_rheinturm(now):
         await show_rheinturm(hass, serial_number, **kwargs)
 
-    clock_mode = hass.data[const.DOMAIN]["devices"][serial_number].get("clock_mode")
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+
+    clock_mode = device.get("clock_mode")
     if clock_mode != "idle":
-        _LOGGER.debug(f"Clock for {serial_number} already running: {clock_mode}, stopping first")
+        _LOGGER.debug(f"Clock for {serial_number} already running as {clock_mode}, stopping first")
         await stop_clock(hass, serial_number)
 
-    hass.data[const.DOMAIN]["devices"][serial_number]["clock_mode"] = "rheinturm"
-    entity = hass.data[const.DOMAIN]["devices"][serial_number].get("clock_select_entity")
+    device["clock_mode"] = "rheinturm"
+    entity = device.get("clock_select_entity")
     if entity:
         entity.refresh_from_data()
 
     await show_rheinturm(hass, serial_number, **kwargs)
 
+    # die Sekundenlampen laufen immer mit
+    interval = timedelta(seconds=1)
+    seconds_to_wait = 1 - datetime.now().microsecond / 1000000
+
     async def _task():
-        seconds_to_wait = 60 - datetime.now().second
-        _LOGGER.debug(f"need to wait {seconds_to_wait} seconds for the next minute")
+        _LOGGER.debug(f"need to wait {seconds_to_wait} seconds for the next update")
         await asyncio.sleep(seconds_to_wait)
         await show_rheinturm(hass, serial_number, **kwargs)
-        hass.data[const.DOMAIN]["devices"][serial_number]["clock_handle"] = async_track_time_interval(hass, _update_rheinturm, timedelta(minutes=1))
+        device["clock_handle"] = async_track_time_interval(hass, _update_rheinturm, interval)
     asyncio.create_task(_task())
 
-    _LOGGER.debug(f"set clock-mode from {clock_mode} to {hass.data[const.DOMAIN]["devices"][serial_number]["clock_mode"]}")
-    _LOGGER.info("Rheinturm update scheduled every second")
+    _LOGGER.debug(f"set clock-mode from {clock_mode} to {device["clock_mode"]}")
+    _LOGGER.info(f"Rheinturm update scheduled every {interval.total_seconds():.0f} seconds")
 
 
 #************************************************************************
@@ -173,8 +205,10 @@ async def _start_rheinturm_clock(hass, serial_number, **kwargs):
 # o: horizontal-shift
 # o: vertical-shift
 # o: rotation
+# o: show-seconds, adds a second hand, updated every second
+# o: second-color
 #************************************************************************
-async def show_analog_clock(hass, serial_number, sc_color = None, h_color = None, m_color = None, scf_color = None, offset_hours = None, scale_size = None, h_shift = None, v_shift = None, rotation = None):
+async def show_analog_clock(hass, serial_number, sc_color = None, h_color = None, m_color = None, scf_color = None, offset_hours = None, scale_size = None, h_shift = None, v_shift = None, rotation = None, show_seconds = False, s_color = None):
     _LOGGER.debug(f"analog clock for serial {serial_number}...")
 
     from .commands import normalize_color, send_screen
@@ -247,60 +281,142 @@ async def show_analog_clock(hass, serial_number, sc_color = None, h_color = None
     else:
         m_color = normalize_color(m_color)
 
-    _LOGGER.debug(f"colors after normalize: scale={sc_color}, scale-frame={scf_color}, hours={h_color}, minutes={m_color}")
-
-    # Instanzbild holen
-    img = device.get("shadow")
-    draw = ImageDraw.Draw(img)
-
-    _LOGGER.debug("read image from instance")
-
-    # Kreis und 4 Striche malen
-    draw.ellipse((0 + h_shift, 0 + v_shift, scale_size - 1 + h_shift, scale_size - 1 + v_shift), fill = sc_color, outline = scf_color, width = 3)                            # Äußerer Kreis
-    draw.line((scale_size // 2 - 1 + h_shift, 2 + v_shift, scale_size // 2 - 1 + h_shift, 6 + v_shift), fill = scf_color, width = 3)                                          # 12
-    draw.line((scale_size - 1 + h_shift, scale_size // 2 - 1 + v_shift, scale_size - 5 + h_shift, scale_size // 2 - 1 + v_shift), fill = scf_color, width = 1)                # 3
-    draw.line((scale_size // 2 - 1 + h_shift, scale_size - 1 + v_shift, scale_size // 2 - 1 + h_shift, scale_size - 5 + v_shift), fill = scf_color, width = 1)                # 6
-    draw.line((2 + h_shift, scale_size // 2 - 1 + v_shift, 6 + h_shift, scale_size // 2 - 1 + v_shift), fill = scf_color, width = 1)                                          # 9
+    if s_color is None:
+        s_color = (255, 255, 0)
+    else:
+        s_color = normalize_color(s_color)
 
-    _LOGGER.debug("drew the scale")
+    _LOGGER.debug(f"colors after normalize: scale={sc_color}, scale-frame={scf_color}, hours={h_color}, minutes={m_color}, seconds={s_color}")
 
     # aktuelle Zeit holen
     now = datetime.now() + timedelta(hours=offset_hours)
     hour = now.hour
     minute = now.minute
+    second = now.second
 
-    # Zeiger-Endpunkte berechnen und einzeichnen
+    # Zeiger-Endpunkte berechnen
     cx = scale_size // 2 - 1 + h_shift
     cy = scale_size // 2 - 1 + v_shift
     hour_length = int(scale_size / 3.6)
     minute_length = int(scale_size / 2.3)
+    second_length = int(scale_size / 2.2)
     hour_angle = (hour % 12) * 30 + (minute / 60) * 30 - 90 + rotation
     minute_angle = minute * 6 - 90 + rotation
+    second_angle = second * 6 - 90 + rotation
 
     hx = int(cx + hour_length * math.cos(math.radians(hour_angle)))
     hy = int(cy + hour_length * math.sin(math.radians(hour_angle)))
     mx = int(cx + minute_length * math.cos(math.radians(minute_angle)))
     my = int(cy + minute_length * math.sin(math.radians(minute_angle)))
-    draw.line((cx, cy, mx, my), fill = m_color, width = scale_size // 40)             # Minutenzeiger
-    draw.line((cx, cy, hx, hy), fill = h_color, width = scale_size // 25)             # Stundenzeiger
-    _LOGGER.debug(f"center: cx={cx}, cy={cy}, pointers endpoints: hx={hx}, hy={hy}, mx={mx}, my={my}")
-
-    # Mittelpunkt zeichnen
+    sx = int(cx + second_length * math.cos(math.radians(second_angle)))
+    sy = int(cy + second_length * math.sin(math.radians(second_angle)))
+    _LOGGER.debug(f"center: cx={cx}, cy={cy}, pointers endpoints: hx={hx}, hy={hy}, mx={mx}, my={my}, sx={sx}, sy={sy}")
+
+    # Zeiger in Zeichenreihenfolge: (Endpunkte, Farbe, Breite)
+    hands = [
+        ((cx, cy, mx, my), m_color, scale_size // 40),                   # Minutenzeiger
+        ((cx, cy, hx, hy), h_color, scale_size // 25),                   # Stundenzeiger
+    ]
+    if show_seconds:
+        hands.append(((cx, cy, sx, sy), s_color, max(1, scale_size // 120)))       # Sekundenzeiger
+
+    # Mittelpunkt
     point_size = scale_size // 25
-    xs=cx - (point_size // 2) + h_shift
-    ys=cy - (point_size // 2) + v_shift
-    xe=cx + (point_size // 2) + h_shift
-    ye=cy + (point_size // 2) + v_shift
-    draw.ellipse((xs, ys, xe, ye), fill = scf_color)                                  # punkt in der Mitte
+    xs=cx - (point_size // 2)                                         # cx/cy enthalten die Verschiebung schon
+    ys=cy - (point_size // 2)
+    xe=cx + (point_size // 2)
+    ye=cy + (point_size // 2)
     _LOGGER.debug(f"middle point circumstances: point-size={point_size}, xs={xs}, ys={ys}, xe={xe}, ye={ye}")
 
+    boxes = [_hand_box(line, width) for line, color, width in hands] + [(xs, ys, xe, ye)]
+
+    # steht das Zifferblatt schon da, werden nur die Flächen der alten und neuen Zeiger erneuert
+    layout_key = (scale_size, sc_color, scf_color, h_color, m_color, s_color, h_shift, v_shift, rotation, show_seconds, device.get("orientation_value"))
+    last = device.get("analog_clock")
+    if last is not None and last["key"] == layout_key:
+        if last["boxes"] == boxes:
+            _LOGGER.debug(f"hands of the analog clock of {serial_number} did not move")
+            return
+        restore = [box for box in last["boxes"] if box not in boxes] + [box for box in boxes if box not in last["boxes"]]
+    else:
+        restore = None
+
+    dial = await async_render_job(hass, _analog_dial, scale_size, sc_color, scf_color)
+
+    # Instanzbild holen
+    shadow = device.get("shadow")
+
+    def _draw():
+        layer = shadow.layer(const.LAYER_CLOCK)
+
+        if restore is None:
+            if last is not None:
+                shadow.clear_layer(const.LAYER_CLOCK)          # altes Zifferblatt an anderer Stelle oder in anderer Größe
+            layer.paste(dial, (h_shift, v_shift))
+            shadow.mark_dirty(0 + h_shift, 0 + v_shift, scale_size - 1 + h_shift, scale_size - 1 + v_shift, const.LAYER_CLOCK)
+            _LOGGER.debug("pasted the scale")
+        else:
+            # alte Zeiger mit dem Zifferblatt überdecken, ohne Maske auch die Transparenz außerhalb des Kreises
+            for bxs, bys, bxe, bye in last["boxes"]:
+                crop = (bxs - h_shift, bys - v_shift, bxe - h_shift + 1, bye - v_shift + 1)
+                layer.paste(dial.crop(crop), (bxs, bys))
+            for box in restore:
+                shadow.mark_dirty(*box, const.LAYER_CLOCK)
+            _LOGGER.debug(f"restored {len(last["boxes"])} hand boxes from the scale")
+
+        # alle Zeiger neu, da das Wiederherstellen auch Teile der stehengebliebenen überdeckt haben kann
+        draw = shadow.draw(const.LAYER_CLOCK)
+        for line, color, width in hands:
+            draw.line(line, fill = color, width = width)
+        draw.ellipse((xs, ys, xe, ye), fill = scf_color)                                  # punkt in der Mitte
+        shadow.mark_dirty(xs, ys, xe, ye, const.LAYER_CLOCK)
+
+    await async_render(hass, serial_number, _draw)
+    device["analog_clock"] = {"key": layout_key, "boxes": boxes}
+
     await send_screen(hass, serial_number)
 
 
+#************************************************************************
+# bounding box of a hand (inclusive), widened by its line width
+#************************************************************************
+def _hand_box(line, width):
+    x0, y0, x1, y1 = line
+    pad = width // 2 + 1
+    return (min(x0, x1) - pad, min(y0, y1) - pad, max(x0, x1) + pad, max(y0, y1) + pad)
+
+
+#************************************************************************
+# the dial of the analog clock without hands, rendered once per
+# (size, colors) and pasted at the shift position. Outside of the circle
+# the raster is transparent, the layers below stay visible there
+#************************************************************************
+@lru_cache(maxsize = const.CLOCK_SPRITE_CACHE_SIZE)
+def _analog_dial(scale_size, sc_color, scf_color):
+    dial = Image.new("RGBA", (scale_size, scale_size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(dial)
+
+    # Kreis und 4 Striche malen
+    draw.ellipse((0, 0, scale_size - 1, scale_size - 1), fill = sc_color, outline = scf_color, width = 3)                            # Äußerer Kreis
+    draw.line((scale_size // 2 - 1, 2, scale_size // 2 - 1, 6), fill = scf_color, width = 3)                                          # 12
+    draw.line((scale_size - 1, scale_size // 2 - 1, scale_size - 5, scale_size // 2 - 1), fill = scf_color, width = 1)                # 3
+    draw.line((scale_size // 2 - 1, scale_size - 1, scale_size // 2 - 1, scale_size - 5), fill = scf_color, width = 1)                # 6
+    draw.line((2, scale_size // 2 - 1, 6, scale_size // 2 - 1), fill = scf_color, width = 1)                                          # 9
+
+    return dial
+
+
 #************************************************************************
 #        D I G I T A L  C L O C K
 #************************************************************************
 # shows the digital clock
+#
+# the digits and the colon come from a sprite sheet rendered once per
+# (size, colors, font). Every digit has a cell of the same width, so
+# the cells never move. As long as the clock stays in place only the
+# cells whose character changed are pasted into the clock layer and
+# sent, usually one or two digits; frame and colons are drawn only when
+# the clock is drawn completely (first time, other position or colors)
 #************************************************************************
 # m: hass
 # m: serial_number
@@ -314,8 +430,9 @@ async def show_analog_clock(hass, serial_number, sc_color = None, h_color = None
 # o: clock-frame-width
 # o: offset-hours
 # o: am/pm
+# o: show-seconds, HH:MM:SS instead of HH:MM
 #************************************************************************
-async def show_digital_clock(hass, serial_number, xs = None, ys = None, digit_size = None, rotation = None, d_color = (0, 255, 255), bg_color = (0, 0, 0), cf_color = (0, 255, 255), cf_width = None, offset_hours = None, am_pm = False):
+async def show_digital_clock(hass, serial_number, xs = None, ys = None, digit_size = None, rotation = None, d_color = (0, 255, 255), bg_color = (0, 0, 0), cf_color = (0, 255, 255), cf_width = None, offset_hours = None, am_pm = False, show_seconds = False):
     _LOGGER.debug(f"digital clock for serial {serial_number}...")
 
     from .commands import normalize_color, send_screen
@@ -356,24 +473,10 @@ async def show_digital_clock(hass, serial_number, xs = None, ys = None, digit_si
 
     # check digit_size
     if digit_size is None:
-        digit_size = int(d_width / 2.8)
-        min(digit_size, d_height)
+        digit_size = int(d_width / (4.2 if show_seconds else 2.8))
+        digit_size = min(digit_size, d_height)
         _LOGGER.debug(f"calculated digit-size to {digit_size} px as no value was given (display-width={d_width}, display-height={d_height})")
 
-    # dimensions check
-    dc_width = int(digit_size * 2.6) + 2 + cf_width
-    dc_height = int(digit_size) + 2 + cf_width              
-    _LOGGER.debug(f"dimensions after check: digit-size={digit_size}, digital-clock-height={dc_height}, digital-clock-width={dc_width}")
-
-    # positions check
-    if xs is None:
-        xs = int((d_width // 2) - (dc_width // 2))
-        _LOGGER.debug(f"calculated xs to {xs} as no value was given")
-    if ys is None:
-        ys = int((d_height // 2) - (dc_height // 2))
-        _LOGGER.debug(f"calculated ys to {ys} as no value was given")
-    _LOGGER.debug(f"positions after check: xs={xs}, ys={ys}")
-
     # aktuelle Zeit holen
     now = datetime.now() + timedelta(hours=offset_hours)
     hour = now.hour
@@ -383,35 +486,66 @@ async def show_digital_clock(hass, serial_number, xs = None, ys = None, digit_si
         if hour == 0:
             hour = 12
     time_str = f"{hour:02d}:{minute:02d}"
+    if show_seconds:
+        time_str += f":{now.second:02d}"
 
     _LOGGER.debug(f"time-string={time_str}")
 
-    try:
-        font = ImageFont.load_default(size = digit_size)
-    except Exception as e:
-        font = ImageFont.load_default()
-        _LOGGER.error(f"[{const.DOMAIN}] could not load TTF due to: {e}")
+    sheet = await async_render_job(hass, _digit_sheet, digit_size, d_color, bg_color)
 
-    # Textgröße messen
-    dummy_img = Image.new("RGB", (1, 1))
-    dummy_draw = ImageDraw.Draw(dummy_img)
-    bbox = dummy_draw.textbbox((0, 0), time_str, font=font)
-    text_w = bbox[2] - bbox[0]
-    text_h = bbox[3] - bbox[1]
+    # dimensions check
+    cells = sheet.layout(time_str)
+    dc_width = cells[-1][1] + cells[-1][2] + 2 + 2 * cf_width
+    dc_height = sheet.cell_height + 2 + 2 * cf_width
+    _LOGGER.debug(f"dimensions after check: digit-size={digit_size}, digital-clock-height={dc_height}, digital-clock-width={dc_width}")
 
-    _LOGGER.debug(f"bbox: 0={bbox[0]}, 1={bbox[1]}, 2={bbox[2]}, 3={bbox[3]}")
-    _LOGGER.debug(f"text_w=[2]-[0]={text_w}, text_h=[3]-[1]={text_h}")
+    # positions check
+    if xs is None:
+        xs = int((d_width // 2) - (dc_width // 2))
+        _LOGGER.debug(f"calculated xs to {xs} as no value was given")
+    if ys is None:
+        ys = int((d_height // 2) - (dc_height // 2))
+        _LOGGER.debug(f"calculated ys to {ys} as no value was given")
+    _LOGGER.debug(f"positions after check: xs={xs}, ys={ys}")
 
     # Instanzbild holen
-    img = device.get("shadow")
-    draw = ImageDraw.Draw(img)
-    _LOGGER.debug("read image from instance")
-
-    draw.rectangle((xs, ys, xs + dc_width - 1, ys + dc_height - 1), fill = bg_color, outline=cf_color, width=cf_width)
-    _LOGGER.debug("drew the frame")
+    shadow = device.get("shadow")
+
+    # steht die Uhr schon so da, werden nur die geänderten Ziffern ersetzt
+    layout_key = (xs, ys, digit_size, d_color, bg_color, cf_color, cf_width, len(time_str), device.get("orientation_value"))
+    last = device.get("digital_clock")
+    if last is not None and last["key"] == layout_key:
+        shown = last["shown"]
+        changed = [cell for cell, old in zip(cells, shown) if cell[0] != old]
+    else:
+        changed = None
+
+    cx = xs + cf_width + 1
+    cy = ys + cf_width + 1
+
+    def _draw():
+        if changed is None:
+            if last is not None:
+                shadow.clear_layer(const.LAYER_CLOCK)          # alte Uhr an anderer Stelle oder in anderer Größe
+            draw = shadow.draw(const.LAYER_CLOCK)
+            draw.rectangle((xs, ys, xs + dc_width - 1, ys + dc_height - 1), fill = bg_color, outline=cf_color, width=cf_width)
+            shadow.mark_dirty(xs, ys, xs + dc_width - 1, ys + dc_height - 1, const.LAYER_CLOCK)
+            _LOGGER.debug("drew the frame")
+            todo = cells
+        else:
+            todo = changed
+
+        for char, x, width in todo:
+            shadow.paste(sheet.glyph(char), (cx + x, cy), layer = const.LAYER_CLOCK)
+
+        _LOGGER.debug(f"pasted {len(todo)} of {len(cells)} cells into the image")
+
+    if changed == []:
+        _LOGGER.debug(f"nothing changed on the digital clock of {serial_number}")
+        return
 
-    draw.text((xs, ys - int(digit_size * 0.2)), time_str, fill=d_color, font=font)
-    _LOGGER.debug("wrote the time into the image")
+    await async_render(hass, serial_number, _draw)
+    device["digital_clock"] = {"key": layout_key, "shown": time_str}
 
     # bild ggf drehen
 #    img = img.rotate(rotation, expand=True)
@@ -419,12 +553,97 @@ async def show_digital_clock(hass, serial_number, xs = None, ys = None, digit_si
 
     await send_screen(hass, serial_number)
 
-async def show_rheinturm(hass, serial_port, rotation = 0):
+
+#************************************************************************
+# sprite sheet of the digital clock: one image with a cell for each of
+# "0123456789:", all digits have the width of the widest one
+#************************************************************************
+class DigitSheet:
+    CHARS = "0123456789:"
+
+    def __init__(self, digit_size, d_color, bg_color, font = None):
+        face = get_font(digit_size, font)
+
+        # gemeinsame Ober- und Unterkante aller Zeichen
+        boxes = {char: text_bbox(char, digit_size, font) for char in self.CHARS}
+        top = min(box[1] for box in boxes.values())
+        bottom = max(box[3] for box in boxes.values())
+
+        digit_width = max(math.ceil(face.getlength(char)) for char in "0123456789")
+        self.widths = {char: digit_width for char in "0123456789"}
+        self.widths[":"] = max(1, math.ceil(face.getlength(":")))
+        self.cell_height = bottom - top
+
+        self.image = Image.new("RGBA", (sum(self.widths.values()), self.cell_height), bg_color + (255,))
+        draw = ImageDraw.Draw(self.image)
+
+        self.boxes = {}
+        x = 0
+        for char in self.CHARS:
+            width = self.widths[char]
+            offset = (width - face.getlength(char)) / 2
+            draw.text((x + offset, -top), char, fill = d_color, font = face)
+            self.boxes[char] = (x, 0, x + width, self.cell_height)
+            x += width
+
+        self._glyphs = {char: self.image.crop(box) for char, box in self.boxes.items()}
+
+    def glyph(self, char):
+        return self._glyphs[char]
+
+    # r: list of (char, x offset, width) for a time string
+    def layout(self, text):
+        cells = []
+        x = 0
+        for char in text:
+            cells.append((char, x, self.widths[char]))
+            x += self.widths[char]
+        return cells
+
+
+@lru_cache(maxsize = const.CLOCK_SPRITE_CACHE_SIZE)
+def _digit_sheet(digit_size, d_color, bg_color, font = None):
+    return DigitSheet(digit_size, d_color, bg_color, font)
+
+
+#************************************************************************
+#        R H E I N T U R M
+#************************************************************************
+# shows the light clock of the Rheinturm in Düsseldorf: lamps on the
+# shaft of the tower, from the top tens and ones of the hours, minutes
+# and seconds, counted from the bottom of each group, red lamps between
+# the groups
+#
+# the tower is drawn once (first time, other position or orientation),
+# after that only the lamps switched on or off since the last second
+# are drawn and sent. A lamp switched off has the color of the shaft,
+# so the lamps going off at a rollover form rectangles of one color and
+# go out as fills.
+#
+# wire budget per second (12 bytes per fill, bitmaps 10 bytes header
+# plus 2 bytes per pixel), measured on 480x320:
+#   usual second           one lamp on                        12-24 bytes
+#   every 10 seconds       s1 off, one s10 lamp on            36-48 bytes
+#   every hour             up to 38 lamps off or on           ~280 bytes
+# (~330 bytes in portrait). On small displays (160x80) the lamps have no
+# gap between them, a tile with lamps going off and on is no rectangle
+# of one color any more and goes out as bitmap: up to ~3 kB at an hour
+# rollover, 24 bytes per usual second.
+# the bytes of each tick are kept as rheinturm_bytes, ticks above the
+# rheinturm_budget of the model (models.py) are logged
+#************************************************************************
+# m: hass
+# m: serial_number
+# o: offset-hours
+# o: horizontal-shift
+#************************************************************************
+async def show_rheinturm(hass, serial_number, offset_hours = None, h_shift = None):
     _LOGGER.debug(f"rheinturm for serial {serial_number}...")
 
-    from .commands import set_orientation, normalize_color, send_bitmap
+    from .commands import send_screen
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
 
-    clock_mode = hass.data[const.DOMAIN]["devices"][serial_number].get("clock_mode")
+    clock_mode = device.get("clock_mode")
     if clock_mode != "rheinturm":
         _LOGGER.info(f"Why to show clock for {serial_number} if not running? Seems I struggled in fast changes...! actual mode is {clock_mode}, stopping for safety")
         await stop_clock(hass, serial_number)
@@ -432,25 +651,132 @@ async def show_rheinturm(hass, serial_port, rotation = 0):
     else:
         _LOGGER.debug(f"verified running the same clock-mode we are updating the display {serial_number} for: {clock_mode}")
 
-    # check for first call
-      # draw the tower
-      
-      # set all digits to off
-    
+    d_width = device.get("width")
+    d_height = device.get("height")
 
-    # get now()
+    if offset_hours is None:
+        offset_hours = 0
+        _LOGGER.debug(f"set offset-hours to {offset_hours} as no parameter is given")
+    if h_shift is None:
+        h_shift = 0
+        _LOGGER.debug(f"set h-shift to {h_shift} as no parameter is given")
 
-    # time to digits
+    # calculate need dimensions
+    tower = await async_render_job(hass, _rheinturm_tower, d_height)
+    t_width = tower.image.width
+    xs = (d_width - t_width) // 2 + h_shift
+    if xs < 0 or xs + t_width > d_width:
+        _LOGGER.debug(f"horizontal position shift {h_shift} out of expected range. Changed to 0.")
+        xs = (d_width - t_width) // 2
+    _LOGGER.debug(f"tower dimensions: width={t_width}, height={d_height}, xs={xs}, lamp-pitch={tower.pitch}")
 
-    # draw digits
-   
-    # draw seconds
-    
-    # check for s = 0
-      # draw hour and minute
-      
-    # check rotation
+    # aktuelle Zeit in Lampen umrechnen
+    now = datetime.now() + timedelta(hours=offset_hours)
+    digits = {
+        "h10": now.hour // 10,   "h1": now.hour % 10,
+        "m10": now.minute // 10, "m1": now.minute % 10,
+        "s10": now.second // 10, "s1": now.second % 10,
+    }
+    lit = frozenset((group, i) for group, count in const.RHEINTURM_GROUPS for i in range(digits[group]))
+
+    # steht der Turm schon da, werden nur die umgeschalteten Lampen gezeichnet
+    layout_key = (xs, d_height, device.get("orientation_value"))
+    last = device.get("rheinturm")
+    if last is not None and last["key"] == layout_key:
+        changed = lit ^ last["lit"]
+        if not changed:
+            _LOGGER.debug(f"no lamp of the rheinturm of {serial_number} changed")
+            return
+    else:
+        changed = None
 
-    # calculate need dimensions
-    
+    # Instanzbild holen
+    shadow = device.get("shadow")
+
+    def _draw():
+        draw = shadow.draw(const.LAYER_CLOCK)
+
+        if changed is None:
+            if last is not None:
+                shadow.clear_layer(const.LAYER_CLOCK)          # alter Turm an anderer Stelle oder in anderer Größe
+            shadow.layer(const.LAYER_CLOCK).paste(tower.image, (xs, 0))
+            shadow.mark_dirty(xs, 0, xs + t_width - 1, d_height - 1, const.LAYER_CLOCK)
+            _LOGGER.debug("pasted the tower")
+            todo = lit
+        else:
+            todo = changed
+
+        for lamp in todo:
+            lxs, lys, lxe, lye = tower.lamps[lamp]
+            box = (xs + lxs, lys, xs + lxe, lye)
+            draw.rectangle(box, fill = const.RHEINTURM_LAMP_COLOR if lamp in lit else const.RHEINTURM_TOWER_COLOR)
+            if changed is not None:
+                shadow.mark_dirty(*box, const.LAYER_CLOCK)
+
+        _LOGGER.debug(f"drew {len(todo)} lamps, {len(lit)} are on")
+
+    await async_render(hass, serial_number, _draw)
+    device["rheinturm"] = {"key": layout_key, "lit": lit}
 
+    transport = device.get("transport")
+    written = transport.bytes_written if transport else 0
+
+    await send_screen(hass, serial_number)
+
+    if transport:
+        sent = transport.bytes_written - written
+        device["rheinturm_bytes"] = sent
+        budget = DISPLAY_MODELS.get(device.get("model"), {}).get("rheinturm_budget")
+        if changed is not None and budget and sent > budget:
+            _LOGGER.warning(f"rheinturm of {serial_number} sent {sent} bytes for {len(changed)} lamps, more than the budget of {budget} bytes")
+
+
+#************************************************************************
+# the tower with all lamps switched off, rendered once per display
+# height. Antenna, cabin and the tapered shaft, transparent around it.
+# lamps maps (group, n) to the box of the n-th lamp of a group counted
+# from the bottom, relative to the image
+#************************************************************************
+class RheinturmTower:
+
+    def __init__(self, height):
+        w_bottom = max(8, height // 9)
+        w_top = max(6, w_bottom * 2 // 3)
+        width = w_bottom * 2 + 4
+        cx = width // 2
+
+        antenna_end = height * 14 // 100
+        cabin_end = height * 24 // 100
+
+        self.image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(self.image)
+
+        color = const.RHEINTURM_TOWER_COLOR
+        draw.line((cx, 0, cx, antenna_end), fill = color, width = max(1, w_top // 4))                                                  # Antenne
+        draw.polygon(((cx - w_top // 2, cabin_end), (cx + w_top // 2, cabin_end), (cx + w_bottom // 2, height - 1), (cx - w_bottom // 2, height - 1)), fill = color)       # Schaft
+        draw.ellipse((0, antenna_end, width - 1, cabin_end), fill = color)                                                              # Kanzel
+
+        # Lampen von oben nach unten, ein Abstand pro Lampe und Trennlampe
+        cells = sum(count for group, count in const.RHEINTURM_GROUPS) + len(const.RHEINTURM_GROUPS) - 1
+        top = cabin_end + 2
+        bottom = height - 3
+        self.pitch = max(1, (bottom - top + 1) // cells)
+        lamp_height = self.pitch - 1 if self.pitch >= 3 else self.pitch
+        lamp_width = max(2, w_top - 4)
+        lxs = cx - lamp_width // 2
+        lxe = lxs + lamp_width - 1
+
+        self.lamps = {}
+        y = bottom - cells * self.pitch + 1
+        for n, (group, count) in enumerate(const.RHEINTURM_GROUPS):
+            for i in reversed(range(count)):
+                self.lamps[(group, i)] = (lxs, y, lxe, y + lamp_height - 1)
+                y += self.pitch
+            if n < len(const.RHEINTURM_GROUPS) - 1:
+                draw.rectangle((lxs, y, lxe, y + lamp_height - 1), fill = const.RHEINTURM_SEPARATOR_COLOR)
+                y += self.pitch
+
+
+@lru_cache(maxsize = const.CLOCK_SPRITE_CACHE_SIZE)
+def _rheinturm_tower(height):
+    return RheinturmTower(height)
@@ -16,16 +16,19 @@ import random
 import subprocess
 import serial
 import time
-import zlib  # V1
 
 import custom_components.weact_display.const as const
-from PIL import Image, ImageDraw, ImageFont, ImageColor
+from PIL import Image, ImageDraw, ImageColor
 from datetime import datetime, timedelta
 from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers.event import async_track_time_interval
 from pathlib import Path
+from .encoder import DEFAULT_ENCODER, encode_rgb565, rgb565_color
+from .fastlz import fastlz_compress
+from .fonts import get_font, text_bbox
 from .iconutils import load_icon
 from .models import DISPLAY_MODELS
+from .render import async_render, async_render_job
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -99,54 +102,252 @@ def normalize_color(value):
 #************************************************************************
 #        S E N D  S C R E E N
 #************************************************************************
-# sends the saved shadow image to the display
+# sends the changed parts of the saved shadow image to the display
+#
+# latest wins: there is only one flush running per display. Calls that
+# arrive while a transfer is in flight only wait for the next flush,
+# their changes are collected in the dirty regions of the shadow image
+# and go out together as soon as the link is free again; the next frame
+# is already prepared while the current one is on the wire.
+# Intermediate states of the shadow image are never transmitted
 #************************************************************************
 # m: hass
 # m: serial_number
+# o: full, sends the whole shadow image, default = False
 #************************************************************************
-async def send_screen(hass, serial_number):
+async def send_screen(hass, serial_number, full = False):
     _LOGGER.debug(f"flushing the display for serial-number={serial_number}")
 
     device = hass.data[const.DOMAIN]["devices"][serial_number]
 
-    width = device.get("width")
-    height = device.get("height")
+    shadow = device.get("shadow")
+    if full:
+        shadow.mark_all()
+
+    # alle Aufrufe bis zum Start des nächsten Durchlaufs warten auf denselben Flush
+    waiter = device.get("flush_waiter")
+    if waiter is None:
+        waiter = hass.loop.create_future()
+        device["flush_waiter"] = waiter
+    else:
+        device["frames_coalesced"] = device.get("frames_coalesced", 0) + 1
+        _LOGGER.debug(f"flush for {serial_number} already pending, changes are sent with it")
+    device["flush_event"].set()                                # läuft gerade ein Frame, wird der nächste schon vorbereitet
 
-    img = device.get("shadow")
-    i_width, i_height = img.size
-    img_bytes = img.tobytes()       # Bild extrahieren, ergibt z.B. 160 * 80 * 3 = 38400 Bytes (RGB888)
+    task = device.get("flush_task")
+    if task is None or task.done():
+        device["flush_task"] = hass.loop.create_task(_flush_loop(hass, serial_number))
 
-    px = i_width * i_height
-    rgb888 = px * 3  # anzahl bytes RGB888 (8 + 8 + 8 = 24 bit = 3 byte pro pixel)
-    _LOGGER.debug(f"image size is {i_width}x{i_height}={px} px, RGB888={rgb888} bytes")
-    hex_str = " ".join(f"{b:02X}" for b in img_bytes[:40])
-    _LOGGER.debug(f"prepared {len(img_bytes)} image bytes for {serial_number}: {hex_str} [...]")
+    await asyncio.shield(waiter)
+
+
+#************************************************************************
+# runs as long as flushes are requested, each round takes all dirty
+# regions collected so far as one frame and wakes up the callers
+# waiting for it once the frame is on the panel
+#
+# pipelined: while frame N is on the wire, frame N+1 is already compared
+# and encoded in a worker, so the link does not idle during the encoding.
+# Frames still go out one after the other and in order
+#************************************************************************
+async def _flush_loop(hass, serial_number):
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+    shadow = device.get("shadow")
+    event = device["flush_event"]
+    transmit = None
+    waiter = None
+
+    try:
+        while device.get("flush_waiter") is not None or transmit is not None:
+            if device.get("flush_waiter") is None:
+                # auf neue Änderungen oder das Ende der laufenden Übertragung warten
+                event.clear()
+                requested = hass.loop.create_task(event.wait())
+                try:
+                    await asyncio.wait({transmit, requested}, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    requested.cancel()
+                if transmit.done():
+                    _transmit_done(hass, serial_number, transmit)
+                    transmit = None
+                continue
+
+            waiter = device["flush_waiter"]
+            device["flush_waiter"] = None                      # ab jetzt ankommende Änderungen gehen in den nächsten Frame
+
+            await async_render(hass, serial_number, shadow.composite)
+            async with device["render_lock"]:
+                frame = shadow.snapshot()                      # nie mitten in einen Zeichenjob hinein
+            if frame is None:
+                _LOGGER.debug(f"nothing changed in the shadow image of {serial_number}, nothing to send")
+            else:
+                try:
+                    await async_render_job(hass, frame.prepare)
+                except Exception as e:
+                    _LOGGER.error(f"error while preparing a frame for {serial_number}: {e}")
+                    shadow.done(frame)
+                    shadow.fail(frame)
+                    frame = None
+
+            # der vorige Frame muss raus sein, bevor dieser übernommen und gesendet wird
+            if transmit is not None:
+                await transmit
+                _transmit_done(hass, serial_number, transmit)
+                transmit = None
+
+            if frame is None:
+                if not waiter.done():
+                    waiter.set_result(None)
+                continue
+
+            shadow.commit(frame)
+            transmit = hass.loop.create_task(_transmit_frame(hass, serial_number, frame, waiter))
+    except Exception as e:
+        _LOGGER.error(f"flush loop of {serial_number} stopped: {e}")
+        shadow.forget_sent()                                   # was schon übernommen war, ist ungewiss
+        shadow.mark_all()
+    finally:
+        if transmit is not None and not transmit.done():
+            transmit.cancel()                                  # beim Entladen nicht weitersenden
+
+        # niemand wartet auf einen Flush, der nicht mehr kommt. Den Waiter einer
+        # laufenden Übertragung gibt diese selbst frei, sofern sie schon gestartet war
+        for pending in (waiter, device.get("flush_waiter")):
+            if pending is not None and not pending.done():
+                pending.set_result(None)
+        device["flush_waiter"] = None
+
+
+#************************************************************************
+# a frame that left parts to newer content needs a follow-up flush,
+# even if nobody calls send_screen() anymore
+#************************************************************************
+def _transmit_done(hass, serial_number, transmit):
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+
+    if transmit.result() and device.get("flush_waiter") is None:
+        device["flush_waiter"] = hass.loop.create_future()
+
+
+#************************************************************************
+# transmits one prepared frame, only the tiles that really changed
+#************************************************************************
+# m: hass
+# m: serial_number
+# m: frame, ShadowFrame, prepared and committed
+# m: waiter, future of the callers waiting for this frame
+# r: True if parts were cancelled and have to be sent again
+#************************************************************************
+async def _transmit_frame(hass, serial_number, frame, waiter):
+    shadow = hass.data[const.DOMAIN]["devices"][serial_number].get("shadow")
 
     try:
-        await send_bitmap(hass, serial_number, 0, 0, width, height, bytes(img_bytes))  # original
+        return await _send_frame(hass, serial_number, frame)
     except Exception as e:
-        _LOGGER.error(f"error while sending the content: {e}")
+        _LOGGER.error(f"error while flushing the display {serial_number}: {e}")
+        shadow.fail(frame)
+        return False
+    finally:
+        shadow.done(frame)
+        if not waiter.done():
+            waiter.set_result(None)
+
 
-    # Save the image, maybe later only if debugging is set
+async def _send_frame(hass, serial_number, frame):
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+    shadow = device.get("shadow")
+
+    # nur Kacheln senden, die sich gegenüber dem Panelinhalt wirklich geändert haben,
+    # einfarbige Kacheln werden per CMD_FULL gefüllt
+    fills, regions = frame.fills, frame.regions
+    device["tiles_total"] = frame.tiles_total
+    device["tiles_skipped"] = frame.tiles_skipped
+    device["tiles_filled"] = frame.tiles_filled
+    _LOGGER.debug(f"tile check for {serial_number}: {frame.tiles_skipped} of {frame.tiles_total} tiles unchanged and skipped, {frame.tiles_filled} tiles filled")
+
+    if not fills and not regions:
+        _LOGGER.debug(f"dirty regions of {serial_number} are identical to the panel content, nothing to send")
+        return False
+
+    img = frame.image
+    i_width, i_height = img.size
+    px = sum((xe - xs) * (ye - ys) for xs, ys, xe, ye in regions)
+    _LOGGER.debug(f"image size is {i_width}x{i_height}={i_width * i_height} px, {len(fills)} fills and {len(regions)} changed regions with {px} px to send: {regions}")
+
+    device["frames_sent"] = device.get("frames_sent", 0) + 1
+    cancelled = False
+
+    if fills:
+        try:
+            sent = await send_fills(hass, serial_number, fills)
+        except Exception as e:
+            _LOGGER.error(f"error while sending the fills: {e}")
+            sent = False
+
+        if not sent:
+            for box, color in fills:
+                shadow.cancel(frame, box, box)                 # beim nächsten Mal erneut versuchen
+            for region in regions:
+                shadow.cancel(frame, region, region)
+            return False
+
+    for index, region in enumerate(regions):
+        xs, ys, xe, ye = region
+        # Streifen für Streifen senden, damit ein von neueren Zeichnungen überholter Rest entfallen kann
+        stripe_rows = max(1, device.get("stripe_bytes", const.BITMAP_STRIPE_BYTES) // ((xe - xs) * 2))
+        for y in range(ys, ye, stripe_rows):
+            if shadow.covered((xs, y, xe, ye), after = frame.seq):
+                _LOGGER.debug(f"rest of region ({xs}, {y}, {xe}, {ye}) of {serial_number} is superseded by newer content, cancelling")
+                device["stripes_cancelled"] = device.get("stripes_cancelled", 0) + 1
+                shadow.cancel(frame, region, (xs, y, xe, ye))  # kommt mit einem der nächsten Frames vom aktuellen Schattenbild
+                cancelled = True
+                break
+
+            y_end = min(y + stripe_rows, ye)
+            data_565 = frame.region565((xs, y, xe, y_end))     # bereits kodiert in prepare()
+            try:
+                sent = await send_bitmap_565(hass, serial_number, xs, y, xe, y_end, data_565)
+            except Exception as e:
+                _LOGGER.error(f"error while sending the content: {e}")
+                sent = False
+
+            if not sent:
+                # Rest dieses und alle folgenden Bereiche beim nächsten Mal erneut versuchen
+                shadow.cancel(frame, region, (xs, y, xe, ye))
+                for rest in regions[index + 1:]:
+                    shadow.cancel(frame, rest, rest)
+                return False
+
+    # Debug-Abzug des ganzen Bildes nur bei Debug-Logging, bei 1-Hz-Uhren wäre das sonst
+    # jede Sekunde eine volle BMP-Datei für ein paar Bytes auf der Leitung
+    if _LOGGER.isEnabledFor(logging.DEBUG):
+        await hass.async_add_executor_job(_save_debug_image, serial_number, img)
+
+    return cancelled
+
+
+#************************************************************************
+# saves the frame as BMP to const.IMG_PATH for debugging and keeps only
+# the newest const.MAX_BMP_FILES files, runs in the executor
+#************************************************************************
+def _save_debug_image(serial_number, img):
     timestamp = datetime.now().strftime("%H%M%S")
     file_name = f"{serial_number}_{timestamp}.bmp"
     try:
         _LOGGER.debug(f"Saving image to {const.IMG_PATH}/{file_name}")
-        await asyncio.to_thread(lambda: img.save(const.IMG_PATH / file_name))
+        img.save(const.IMG_PATH / file_name)
     except Exception as e:
         _LOGGER.error(f"error while saving the image to {const.IMG_PATH}: {e}")
 
     # logrotate
     max_files = const.MAX_BMP_FILES
     try:
-        files = await hass.async_add_executor_job(
-            lambda: [
-                os.path.join(const.IMG_PATH, f)
-                for f in os.listdir(const.IMG_PATH)
-                if f.lower().endswith(".bmp")
-                and os.path.isfile(os.path.join(const.IMG_PATH, f))
-            ]
-        )
+        files = [
+            os.path.join(const.IMG_PATH, f)
+            for f in os.listdir(const.IMG_PATH)
+            if f.lower().endswith(".bmp")
+            and os.path.isfile(os.path.join(const.IMG_PATH, f))
+        ]
 
         _LOGGER.debug(f"found {len(files)} files in {const.IMG_PATH}/")
 
@@ -168,7 +369,11 @@ async def send_screen(hass, serial_number):
 #        B R I G H T N E S S
 #************************************************************************
 # changes the brightness of the display
-# and afterwards polls the actual brightness 
+# and afterwards confirms the actual brightness
+#
+# latest wins: calls arriving within const.BRIGHTNESS_DEBOUNCE seconds
+# (e.g. dragging the slider) only change the target, one brightness
+# command is sent for the final value. All callers wait for it
 #************************************************************************
 # m: hass
 # m: serial_number
@@ -185,6 +390,47 @@ async def set_brightness(hass, serial_number, target_brightness):
         _LOGGER.warning(f"Display {serial_number} not connected")
         return
 
+    device["brightness_target"] = target_brightness
+
+    waiter = device.get("brightness_waiter")
+    if waiter is None:
+        waiter = hass.loop.create_future()
+        device["brightness_waiter"] = waiter
+    else:
+        _LOGGER.debug(f"brightness change for {serial_number} already pending, target is now {target_brightness}")
+
+    task = device.get("brightness_task")
+    if task is None or task.done():
+        device["brightness_task"] = hass.loop.create_task(_brightness_loop(hass, serial_number))
+
+    await asyncio.shield(waiter)
+
+
+#************************************************************************
+# sends the latest brightness target as long as new targets arrive
+#************************************************************************
+async def _brightness_loop(hass, serial_number):
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+
+    while device.get("brightness_waiter") is not None:
+        await asyncio.sleep(const.BRIGHTNESS_DEBOUNCE)                  # Slider zur Ruhe kommen lassen
+
+        waiter = device["brightness_waiter"]
+        device["brightness_waiter"] = None
+        target_brightness = device["brightness_target"]
+
+        try:
+            await _send_brightness(hass, serial_number, target_brightness)
+        except Exception as e:
+            _LOGGER.error(f"error while setting the brightness of {serial_number}: {e}")
+        finally:
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+async def _send_brightness(hass, serial_number, target_brightness):
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+
     # entry-data lookup
     entry_id = device.get("entry_id")
     entry = hass.config_entries.async_get_entry(entry_id)
@@ -192,7 +438,7 @@ async def set_brightness(hass, serial_number, target_brightness):
         _LOGGER.error(f"no config entry found for serial {serial_number}")
         return
 
-    # Config aktualisieren, runtime wird durchs Polling erledigt
+    # Config aktualisieren, runtime wird durch die Antwort des Displays erledigt
     new_options = {
         **entry.options,
         "brightness": target_brightness,
@@ -211,34 +457,27 @@ async def set_brightness(hass, serial_number, target_brightness):
 
     _LOGGER.debug(f"having {len(packet)} Bytes for {serial_number}: {hex_str}")
 
-    await hass.async_add_executor_job(serial_port.write, packet)
+    await _send_command(hass, serial_number, packet)
 
     packet = struct.pack("<BB", 0x83, 0x0A)                   # Brightness Request
-    hex_str = " ".join(f"{b:02X}" for b in packet)
-
-    _LOGGER.debug(f"prepared polling with {len(packet)} Bytes for {serial_number}: {hex_str}")
-
-    timeout = 15    # Sekunden
-    start = time.monotonic()
-    while True:
-        # Helligkeit abfragen
-        _LOGGER.debug("requesting brightness...")
 
-        await hass.async_add_executor_job(serial_port.write, packet)
-        await asyncio.sleep(1)
-        current_brightness = device.get("brightness")
+    # fertig mit der ersten passenden Antwort, solange das Display noch überblendet nur wenige Nachfragen
+    for attempt in range(const.BRIGHTNESS_CONFIRM_ATTEMPTS):
+        reply = await _query(hass, serial_number, packet, const.CMD_READ_BRIGHTNESS)
+        current_brightness = reply[1] if reply else None
 
-        _LOGGER.debug(f"polled brightness for serial {serial_number}: target-brightness={target_brightness}, current-brightness={current_brightness}")
+        _LOGGER.debug(f"confirmed brightness for serial {serial_number}: target-brightness={target_brightness}, current-brightness={current_brightness}")
 
         if current_brightness == target_brightness:
             _LOGGER.info(f"Target brightness of {current_brightness} reached for serial {serial_number}")
-            break
+            return
 
-        if time.monotonic() - start > timeout:
-            _LOGGER.warning(f"brightness fade timeout reached for serial {serial_number}")
+        if reply is None:
             break
 
-    _LOGGER.debug("brightness done")
+        await asyncio.sleep(const.BRIGHTNESS_CONFIRM_INTERVAL)
+
+    _LOGGER.warning(f"brightness {target_brightness} not confirmed by serial {serial_number}")
 
 
 #************************************************************************
@@ -282,12 +521,11 @@ async def set_orientation(hass, serial_number, orientation_value, force = False)
         return
 
     # array-table [old][new]: [[0,2,3,1],[2,0,1,3],[1,3,0,2],[3,1,2,0]], see internal_struct.md for evidence
-    img = device.get("shadow")
+    shadow = device.get("shadow")
     _LOGGER.debug("read image from instance")
     rotations = const.ORIENTATION_CONVERSION_MAP[device.get("orientation_value")][orientation_value]
-    img = img.rotate(-90 * rotations, expand = True)
+    await async_render(hass, serial_number, shadow.rotate, -90 * rotations)
     _LOGGER.debug(f"rotated the BMP {rotations} times counterclockwise by 90° = {-90 * rotations}°")
-    device["shadow"] = img
     _LOGGER.debug("stored rotated image back into instance")
 
     device["orientation_value"] = orientation_value
@@ -318,7 +556,7 @@ async def set_orientation(hass, serial_number, orientation_value, force = False)
     hex_str = " ".join(f"{b:02X}" for b in packet)
     _LOGGER.debug(f"having {len(packet)} Bytes for {serial_number}: {hex_str}")
 
-    await hass.async_add_executor_job(serial_port.write, packet)
+    await _send_command(hass, serial_number, packet)
     await asyncio.sleep(0.1)
     await send_screen(hass, serial_number)
 
@@ -358,7 +596,7 @@ async def enable_humiture_reports(hass, serial_number, time_interval = None):
     hex_str = " ".join(f"{b:02X}" for b in packet)
     _LOGGER.debug(f"having {len(packet)} Bytes for {serial_number}: {hex_str}")
 
-    await hass.async_add_executor_job(serial_port.write, packet)
+    await _send_command(hass, serial_number, packet)
     await asyncio.sleep(0.1)
 
     _LOGGER.debug("enabled humiture report")
@@ -372,6 +610,7 @@ async def enable_humiture_reports(hass, serial_number, time_interval = None):
 #************************************************************************
 # m: hass
 # m: serial_number
+# r: firmware version, None if the display did not answer
 #************************************************************************
 async def read_firmware_version(hass, serial_number):
     _LOGGER.debug("requesting firmware version")
@@ -392,8 +631,10 @@ async def read_firmware_version(hass, serial_number):
     hex_str = " ".join(f"{b:02X}" for b in packet)
     _LOGGER.debug(f"having {len(packet)} Bytes for {serial_number}: {hex_str}")
 
-    await hass.async_add_executor_job(serial_port.write, packet)
-    await asyncio.sleep(0.1)
+    if await _query(hass, serial_number, packet, const.CMD_READ_FIRMWARE_VERSION) is None:
+        return None
+
+    return device.get("firmware_version")
 
 
 #************************************************************************
@@ -403,6 +644,7 @@ async def read_firmware_version(hass, serial_number):
 #************************************************************************
 # m: hass
 # m: serial_number
+# r: who-am-i description, None if the display did not answer
 #************************************************************************
 async def read_who_am_i(hass, serial_number):
     _LOGGER.debug("requesting who-am-i from display")
@@ -423,19 +665,34 @@ async def read_who_am_i(hass, serial_number):
     hex_str = " ".join(f"{b:02X}" for b in packet)
     _LOGGER.debug(f"having {len(packet)} Bytes for {serial_number}: {hex_str}")
 
-    await hass.async_add_executor_job(serial_port.write, packet)
-    await asyncio.sleep(0.1)
+    if await _query(hass, serial_number, packet, const.CMD_WHO_AM_I) is None:
+        return None
+
+    return device.get("who_am_i")
 
 
 #************************************************************************
 #        P A C K E T  P A R S E R
 #************************************************************************
-# parses the packets received from a display
+# parses the packets received from a display,
+# queries waiting for this answer get the packet as result
 #************************************************************************
 # m: packet-Bytes
 # r: True if packet could be parsed, False if any error occured
 #************************************************************************
 def parse_packet(hass, serial_number, packet: bytes):
+    if not _parse_packet(hass, serial_number, packet):
+        return False
+
+    pending = hass.data[const.DOMAIN]["devices"][serial_number].get("pending", {})
+    for future in pending.pop(packet[0], []):
+        if not future.done():
+            future.set_result(packet)
+
+    return True
+
+
+def _parse_packet(hass, serial_number, packet: bytes):
     # Mindestlänge: Start + Endbyte
     if not packet or len(packet) < 2:
         _LOGGER.info(f"Received an empty packet or packet-length < 2 Bytes from serial {serial_number}: Packet-length={len(packet)}, discarding packet bytes")
@@ -523,21 +780,28 @@ def parse_packet(hass, serial_number, packet: bytes):
             if len(packet) != 3:
                 return False
 
-            brightness = packet[1]
-            if not brightness:
-                return False
-
-            device["brightness"] = brightness
+            device["brightness"] = packet[1]                    # 0 ist eine gültige Helligkeit
 
             _LOGGER.info(f"received new brightness from serial {serial_number}: {device["brightness"]}")
 
             return True
 
+        # -----------------------------
+        # PARSE ORIENTATION (0x82)
+        # -----------------------------
+        elif cmd == 0x82:
+            if len(packet) != 3:
+                return False
+
+            _LOGGER.info(f"received orientation from serial {serial_number}: {packet[1]}")
+
+            return True
+
         # -----------------------------
         # PARSE UNKNOWN COMMAND
         # -----------------------------
         else:
-            _LOGGER.info(f"unrecognized answer from serial {serial_number}: {cmd.hex()}")
+            _LOGGER.info(f"unrecognized answer from serial {serial_number}: {cmd:02X}")
             return False
 
     except Exception as e:
@@ -557,21 +821,11 @@ def parse_packet(hass, serial_number, packet: bytes):
 # m: X end
 # m: Y end
 # m: data_888, RGB888-data
+# r: True if the bitmap went out, False if not
 #************************************************************************
 async def send_bitmap(hass, serial_number, xs, ys, xe, ye, data_888: bytes):
     _LOGGER.debug("finally sending bitmap...")
 
-    device = hass.data[const.DOMAIN]["devices"][serial_number]
-
-    #fastlz = device.get("fastlz", False)
-    #fastlz = True
-    fastlz = False              # mandatory NO !
-
-    serial_port = device.get("serial_port")           # check needed due to direct command
-    if not serial_port:
-        _LOGGER.warning(f"Display {serial_number} not connected")
-        return
-
     width = xe - xs
     height = ye - ys
     px = width * height
@@ -582,68 +836,225 @@ async def send_bitmap(hass, serial_number, xs, ys, xe, ye, data_888: bytes):
 
     # data: bytes oder bytearray mit RGB888 (R,G,B) Werten
     # erzeugt data_565: bytes in RGB565 little-endian
-    _LOGGER.debug(f"transforming from RGB888 to RGB565")
-    data_565 = bytearray()
-    for i in range(0, len(data_888), 3):
-        r = data_888[i]
-        g = data_888[i + 1]
-        b = data_888[i + 2]
-        # 8-Bit nach 5-6-5 Bit skalieren
-        rgb565 = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
-        # little-endian (LSB zuerst)
-        data_565.append(rgb565 & 0xFF)
-        data_565.append((rgb565 >> 8) & 0xFF)
+    _LOGGER.debug(f"transforming from RGB888 to RGB565 via {DEFAULT_ENCODER} encoder")
+    data_565 = await async_render_job(hass, encode_rgb565, data_888, width, height)
+
+    return await send_bitmap_565(hass, serial_number, xs, ys, xe, ye, data_565)
+
 
+#************************************************************************
+#        S E N D  B I T M A P  5 6 5
+#************************************************************************
+# sends RGB565 data that is already encoded, e.g. sliced from the RGB565
+# mirror of the shadow image
+#************************************************************************
+# m: hass
+# m: serial_number
+# m: X start
+# m: Y start
+# m: X end
+# m: Y end
+# m: data_565, RGB565 little-endian, bytes or memoryview
+# o: stripe_bytes, default = tuned value of the display
+# o: header_pause, default = tuned value of the display
+# o: fastlz, default = option of the display
+# r: True if sent, False if any error occured
+#************************************************************************
+async def send_bitmap_565(hass, serial_number, xs, ys, xe, ye, data_565, stripe_bytes = None, header_pause = None, fastlz = None) -> bool:
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+
+    if fastlz is None:
+        fastlz = device.get("fastlz", False)
+    if stripe_bytes is None:
+        stripe_bytes = device.get("stripe_bytes", const.BITMAP_STRIPE_BYTES)
+    if header_pause is None:
+        header_pause = device.get("header_pause", const.HEADER_PAUSE)
+
+    transport = device.get("transport")
+    if not transport:
+        _LOGGER.warning(f"Display {serial_number} not connected")
+        return False
+
+    width = xe - xs
+    if len(data_565) != width * (ye - ys) * 2:
+        raise ValueError(f"expected {width * (ye - ys) * 2} RGB565 bytes for {width}x{ye - ys} px, got {len(data_565)}")
+
+    # in Streifen aufteilen, jeder Streifen ist ein vollständiges Kommando mit eigenem Header,
+    # dazwischen kommen Steuerkommandos zum Zug
+    stripe_rows = max(1, stripe_bytes // (width * 2))
+    data_565 = memoryview(data_565)
+    stripes = []
+    for y in range(ys, ye, stripe_rows):
+        y_end = min(y + stripe_rows, ye)
+        stripes.append((y, y_end, data_565[(y - ys) * width * 2:(y_end - ys) * width * 2]))
+
+    # je Streifen entscheiden: FastLZ nur, wenn es sich für diesen Streifen lohnt,
+    # ein Foto-Streifen geht roh raus, ohne den Rest des Bildes mitzunehmen
+    compressed = [None] * len(stripes)
     if fastlz is True:
-        command = const.CMD_SET_BITMAP_FASTLZ
-        CHUNK_SIZE = width * 4
-        _LOGGER.debug(f"using FASTLZ for serial communication")
+        CHUNK_SIZE = width * 4                                   # FastLZ-Blockgröße
+        compressed = await async_render_job(
+            hass, lambda: [_compress_stripe(data, CHUNK_SIZE) for _, _, data in stripes]
+        )
+        packed = sum(1 for c in compressed if c is not None)
+        _LOGGER.debug(f"using FASTLZ for {packed} of {len(stripes)} stripes, {len(stripes) - packed} raw as compression does not pay off")
     else:
-        command = const.CMD_SET_BITMAP
-        CHUNK_SIZE = width * 2  # empirisch aus USB-Sniffing
         _LOGGER.debug(f"using classic data transmission speed for serial communication")
 
-    _LOGGER.debug(f"chunk size is {CHUNK_SIZE} bytes per write")
-
-    header = struct.pack("<BHHHHB", command, xs, ys, xe-1, ye-1, 0x0A)
+    # je Streifen ein kompletter Frame für den Transport: Header, Pause, dann alle Bilddaten am Stück
+    frames = []
+    for (y, y_end, data), packed in zip(stripes, compressed):
+        command = const.CMD_SET_BITMAP if packed is None else const.CMD_SET_BITMAP_FASTLZ
+        header = struct.pack("<BHHHHB", command, xs, y, xe-1, y_end-1, 0x0A)
+        frames.append([(header, header_pause), (data if packed is None else packed, 0)])
 
-    hex_str = " ".join(f"{b:02X}" for b in header)
-    _LOGGER.debug(f"need to send {len(header)} header bytes for {serial_number}: {hex_str}")
+    hex_str = " ".join(f"{b:02X}" for b in frames[0][0][0])
+    _LOGGER.debug(f"need to send {len(frames)} stripes for {serial_number}, first header: {hex_str}")
     hex_str = " ".join(f"{b:02X}" for b in data_565[:40])
     _LOGGER.debug(f"... and {len(data_565)} bitmap bytes as RGB565 for {serial_number}: {hex_str} [...]")
 
     if not await _wait_for_display(hass, serial_number):                 # Display sperren
         _LOGGER.error(f"seems that display {serial_number} is permanently blocked. Please restart integration")
-        return
+        return False
 
-    await hass.async_add_executor_job(serial_port.write, header)
-    _LOGGER.debug("header write done")
-    await hass.async_add_executor_job(serial_port.flush)
-    _LOGGER.debug("header flush done")
+    # der Display-Lock hält die Streifen eines Bitmaps in Reihenfolge zusammen
+    sent = True
+    try:
+        for segments in frames:
+            sent = await transport.async_send(segments, const.PRIORITY_BULK)
+            if not sent:
+                break
+    finally:
+        await _release_display(hass, serial_number)           # Display wieder freigeben
 
-    # Nun die Bilddaten in Blöcken senden
-    await asyncio.sleep(0.05)
-    j = 1
-    if fastlz is True:
-        compressed_len = 0
-        for i in range(0, len(data_565), CHUNK_SIZE):
-            chunk = data_565[i:i + CHUNK_SIZE]
-            compressed_chunk  = zlib.compress(chunk)
-            compressed_len   += len(compressed_chunk)
-            chunk_with_header = struct.pack("<HH", len(chunk), len(compressed_chunk[4:])) + compressed_chunk[4:]
-            await hass.async_add_executor_job(serial_port.write, chunk_with_header)
-            j += 1
-        _LOGGER.debug(f"Sent {compressed_len} bytes in {j} chunks of {CHUNK_SIZE} bytes")
-    else:
-        for i in range(0, len(data_565), CHUNK_SIZE):
-            chunk = data_565[i:i + CHUNK_SIZE]
-            await hass.async_add_executor_job(serial_port.write, chunk)
-            await hass.async_add_executor_job(serial_port.flush)
-            await asyncio.sleep(0.001)  # kleine Pause zwischen den Chunks
-            j += 1
-        _LOGGER.debug(f"Sent {len(data_565)} bytes in {j} chunks of {CHUNK_SIZE} bytes")
+    _LOGGER.debug(f"Sent {len(frames)} stripes with {sum(len(f[1][0]) for f in frames)} bitmap bytes for {serial_number}, success={sent}")
+
+    return sent
+
+
+#************************************************************************
+#        S E N D  F I L L S
+#************************************************************************
+# fills rectangles of one color each with CMD_FULL (0x04), 12 bytes per
+# rectangle instead of 2 bytes per pixel. All rectangles go out in one
+# write through the transport, behind the bitmaps already queued
+#************************************************************************
+# m: hass
+# m: serial_number
+# m: fills, list of ((xs, ys, xe, ye), (r, g, b)), end exclusive
+# r: True if sent, False if any error occured
+#************************************************************************
+async def send_fills(hass, serial_number, fills) -> bool:
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+
+    transport = device.get("transport")
+    if not transport:
+        _LOGGER.warning(f"Display {serial_number} not connected")
+        return False
+
+    segments = [(_fill_packet(xs, ys, xe, ye, color), 0) for (xs, ys, xe, ye), color in fills]
+
+    if not await _wait_for_display(hass, serial_number):                 # Display sperren
+        _LOGGER.error(f"seems that display {serial_number} is permanently blocked. Please restart integration")
+        return False
+
+    try:
+        sent = await transport.async_send(segments, const.PRIORITY_BULK)
+    finally:
+        await _release_display(hass, serial_number)           # Display wieder freigeben
+
+    _LOGGER.debug(f"Sent {len(segments)} fill rectangles for {serial_number}, success={sent}")
+
+    return sent
+
+
+#************************************************************************
+# builds one CMD_FULL packet, the end of the box is exclusive
+#************************************************************************
+def _fill_packet(xs, ys, xe, ye, color):
+    return struct.pack(
+        "<BHHHHHB",
+        0x04, xs, ys, xe - 1, ye - 1, rgb565_color(color), 0x0A
+    )
+
+
+#************************************************************************
+# compresses RGB565 data chunk by chunk with FastLZ level 1,
+# each chunk is prefixed with its raw and its compressed length
+#************************************************************************
+def _compress_chunks(data_565, chunk_size):
+    chunks = []
+    for i in range(0, len(data_565), chunk_size):
+        chunk = data_565[i:i + chunk_size]
+        compressed_chunk = fastlz_compress(chunk)
+        chunks.append(struct.pack("<HH", len(chunk), len(compressed_chunk)) + compressed_chunk)
+    return chunks
+
+
+#************************************************************************
+# compresses one stripe, None if FastLZ does not save enough of its
+# bytes (FASTLZ_MAX_RATIO) and the stripe has to go out raw
+#************************************************************************
+def _compress_stripe(data_565, chunk_size):
+    compressed = b"".join(_compress_chunks(data_565, chunk_size))
+    if len(compressed) > len(data_565) * const.FASTLZ_MAX_RATIO:
+        return None
+    return compressed
+
+
+#************************************************************************
+# writes one command packet through the transport of the display,
+# control commands go before all bitmaps waiting, commands changing the
+# screen content queue up behind them with const.PRIORITY_BULK
+#************************************************************************
+async def _send_command(hass, serial_number, packet, priority = const.PRIORITY_CONTROL) -> bool:
+    transport = hass.data[const.DOMAIN]["devices"][serial_number].get("transport")
+    if not transport:
+        _LOGGER.warning(f"Display {serial_number} not connected")
+        return False
+
+    return await transport.async_write(packet, priority)
+
+
+#************************************************************************
+# sends a query and waits for the matching answer of the display,
+# the answer is handed over by parse_packet()
+#************************************************************************
+# m: hass
+# m: serial_number
+# m: packet, the query
+# m: reply_cmd, command byte of the expected answer
+# o: timeout in seconds per attempt, default from const.QUERY_TIMEOUTS
+# o: retries after a timeout, default = const.QUERY_RETRIES
+# r: the answer packet, None if the display did not answer
+#************************************************************************
+async def _query(hass, serial_number, packet, reply_cmd, timeout = None, retries = None):
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+    pending = device.setdefault("pending", {})
+
+    if timeout is None:
+        timeout = const.QUERY_TIMEOUTS.get(reply_cmd, const.QUERY_TIMEOUT_DEFAULT)
+    if retries is None:
+        retries = const.QUERY_RETRIES
+
+    for attempt in range(retries + 1):
+        future = hass.loop.create_future()
+        pending.setdefault(reply_cmd, []).append(future)
+        try:
+            if not await _send_command(hass, serial_number, packet):
+                return None
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            _LOGGER.debug(f"no answer {reply_cmd:02X} from serial {serial_number} within {timeout} s (attempt {attempt + 1} of {retries + 1})")
+        finally:
+            waiting = pending.get(reply_cmd)
+            if waiting and future in waiting:
+                waiting.remove(future)
+
+    device["query_timeouts"] = device.get("query_timeouts", 0) + 1
+    _LOGGER.warning(f"display {serial_number} did not answer query {packet[0]:02X}")
 
-    await _release_display(hass, serial_number)               # Display wieder freigeben
+    return None
 
 
 async def _wait_for_display(hass, serial_number, timeout=5.0):
@@ -747,7 +1158,7 @@ async def show_bmp(hass, serial_number, xs = None, ys = None, filepath = None):
 
     _LOGGER.debug(f"Image will be placed at {xs}|{ys}")
 
-    shadow.paste(img, (xs, ys))
+    await async_render(hass, serial_number, shadow.paste, img, (xs, ys))
 
     _LOGGER.debug("pasted image into instance")
                         
@@ -777,24 +1188,17 @@ async def send_full_color(hass, serial_number, color):
     width = device.get("width")
     height = device.get("height")
 
-    r, g, b = color
-
-    # verschieben um aus RGB888 ein RGB565 zu machen
-    r >>= 3
-    g >>= 2
-    b >>= 3
-    rgb565 = ((r & 0x1F) << 11) | ((g & 0x3F) << 5) | (b & 0x1F)
-
-    packet = struct.pack(
-        "<BHHHHHB",
-        0x04, 0x0000, 0x0000, width - 1, height - 1, rgb565, 0x0A
-    )
+    packet = _fill_packet(0, 0, width, height, color)
 
     # das hier nachher in send_command verschieben
     hex_str = " ".join(f"{b:02X}" for b in packet)
     _LOGGER.debug(f"having {len(packet)} Bytes for {serial_number}: {hex_str}")
 
-    await hass.async_add_executor_job(serial_port.write, packet)
+    await _send_command(hass, serial_number, packet, const.PRIORITY_BULK)
+
+    # Panel zeigt nicht mehr den Inhalt des Schattenbilds, der nächste Flush sendet alles
+    device["shadow"].forget_sent()
+    device["shadow"].mark_all()
 
 
 #************************************************************************
@@ -818,16 +1222,24 @@ async def replace_bg_color(hass, serial_number, old_color):
     _LOGGER.debug(f"colors after normalize: old-color={old_color}, bg-color={bg_color}")
 
     # Schattenbild abholen
-    img = device.get("shadow")
-    _LOGGER.debug("fetched image from instance")
-
-    pixels = img.load()
-    i = 1
-    for y in range(img.height):
-        for x in range(img.width):
-            if pixels[x, y] == old_color:
-                pixels[x, y] = bg_color
-                i += 1
+    shadow = device.get("shadow")
+
+    def _replace():
+        img = shadow.layer(const.LAYER_CONTENT)
+        pixels = img.load()
+        old_rgba = old_color + (255,)
+        bg_rgba = bg_color + (255,)
+        i = 1
+        for y in range(img.height):
+            for x in range(img.width):
+                if pixels[x, y] == old_rgba:
+                    pixels[x, y] = bg_rgba
+                    i += 1
+        shadow.mark_dirty(0, 0, img.width - 1, img.height - 1)
+        shadow.clear_layer(const.LAYER_BACKGROUND, bg_color)     # freie Flächen bekommen die neue Farbe
+        return i
+
+    i = await async_render(hass, serial_number, _replace)
     _LOGGER.debug(f"replaced {i} background px for serial {serial_number}")
 
     await send_screen(hass, serial_number)
@@ -886,17 +1298,15 @@ async def generate_random(hass, serial_number, suppress_delete=False):
 
     _LOGGER.debug(f"generating random image with {width} x {height} pixel")
     try:
-        buf = bytearray()
-        for _ in range(width * height):
-            r = random.randint(0, 255)
-            g = random.randint(0, 255)
-            b = random.randint(0, 255)
-            buf += struct.pack("<BBB", r, g, b)
+        buf = await async_render_job(hass, random.randbytes, width * height * 3)       # RGB888, nicht auf dem Event-Loop
 
         hex_str = " ".join(f"{b:02X}" for b in buf[:40])
         _LOGGER.debug(f"generated {len(buf)} Bytes for {serial_number}: {hex_str} [...]")
 
         await send_bitmap(hass, serial_number, 0, 0, width, height, bytes(buf))
+        # Panel zeigt nicht mehr den Inhalt des Schattenbilds, der nächste Flush sendet alles
+        device["shadow"].forget_sent()
+        device["shadow"].mark_all()
     except Exception as e:
         _LOGGER.error(f"[{const.DOMAIN}] error while sending (or generating?) the image: {e}")
 
@@ -929,7 +1339,11 @@ async def show_init_screen(hass, serial_number):
     hex_str = " ".join(f"{b:02X}" for b in packet)
     _LOGGER.debug(f"having {len(packet)} Bytes for {serial_number}: {hex_str}")
 
-    await hass.async_add_executor_job(serial_port.write, packet)
+    await _send_command(hass, serial_number, packet, const.PRIORITY_BULK)
+
+    # Startbild ersetzt den Panelinhalt, der nächste Flush sendet alles
+    device["shadow"].forget_sent()
+    device["shadow"].mark_all()
 
     _LOGGER.debug("initial screen done")
 
@@ -947,10 +1361,11 @@ async def show_init_screen(hass, serial_number):
 # o: size, 32 px if no value given
 # o: icon-color, default = white (255, 255, 255)
 # o: rotation
+# o: flush, sends the screen afterwards, default = True
 #************************************************************************
 # rotate from: https://stackoverflow.com/questions/45179820/draw-text-on-an-angle-rotated-in-python
 #************************************************************************
-async def show_icon(hass, serial_number, i_name: str, xs, ys, i_size = 32, i_color = (255, 255, 255), rotation = 0):
+async def show_icon(hass, serial_number, i_name: str, xs, ys, i_size = 32, i_color = (255, 255, 255), rotation = 0, flush = True):
     _LOGGER.debug("show icon...")
 
     device = hass.data[const.DOMAIN]["devices"][serial_number]
@@ -972,11 +1387,12 @@ async def show_icon(hass, serial_number, i_name: str, xs, ys, i_size = 32, i_col
 
     _LOGGER.debug("read image from instance")
 
-    shadow.paste(icon, (xs, ys), icon)   # 3. Parameter geht nur wenn das Bild einen Alphakanal hat
+    await async_render(hass, serial_number, shadow.paste, icon, (xs, ys), icon)   # 3. Parameter geht nur wenn das Bild einen Alphakanal hat, markiert die Fläche als geändert
 
     _LOGGER.debug("pasted icon into instance")
     
-    await send_screen(hass, serial_number)
+    if flush:
+        await send_screen(hass, serial_number)
 
 
 #************************************************************************
@@ -992,8 +1408,9 @@ async def show_icon(hass, serial_number, i_name: str, xs, ys, i_size = 32, i_col
 # m: Y end
 # o: line-color, default = white (255, 255, 255)
 # o: line width, default = 1
+# o: flush, sends the screen afterwards, default = True
 #************************************************************************
-async def draw_line(hass, serial_number, xs, ys, xe, ye, l_color = (255, 255, 255), l_width = 1):
+async def draw_line(hass, serial_number, xs, ys, xe, ye, l_color = (255, 255, 255), l_width = 1, flush = True):
     _LOGGER.info("draw a line ...")
 
     device = hass.data[const.DOMAIN]["devices"][serial_number]
@@ -1003,17 +1420,20 @@ async def draw_line(hass, serial_number, xs, ys, xe, ye, l_color = (255, 255, 25
 
     _LOGGER.debug(f"l_color_after={l_color}")
 
-    img = device.get("shadow")
-    draw = ImageDraw.Draw(img)
-
-    _LOGGER.debug("read image from instance")
+    shadow = device.get("shadow")
 
     # Linie mit angepassten Koordinaten zeichnen
-    draw.line([(xs, ys), (xe, ye)], fill = l_color, width = l_width)
+    def _draw():
+        draw = shadow.draw()
+        draw.line([(xs, ys), (xe, ye)], fill = l_color, width = l_width)
+        shadow.mark_dirty(min(xs, xe) - l_width, min(ys, ye) - l_width, max(xs, xe) + l_width, max(ys, ye) + l_width)
+
+    await async_render(hass, serial_number, _draw)
 
     _LOGGER.debug("drew the line")
 
-    await send_screen(hass, serial_number)
+    if flush:
+        await send_screen(hass, serial_number)
     
 
 #************************************************************************
@@ -1030,8 +1450,9 @@ async def draw_line(hass, serial_number, xs, ys, xe, ye, l_color = (255, 255, 25
 # o: circle-color, default = white (255, 255, 255)
 # o: fill-color, default = red (255, 0, 0)
 # o: circle-frame width, default = 1
+# o: flush, sends the screen afterwards, default = True
 #************************************************************************
-async def draw_circle(hass, serial_number, xp, yp, r, e = None, c_color = (255, 255, 255), f_color = (255, 0, 0), cf_width = 0):
+async def draw_circle(hass, serial_number, xp, yp, r, e = None, c_color = (255, 255, 255), f_color = (255, 0, 0), cf_width = 0, flush = True):
     _LOGGER.info("draw a circle ...")
 
     device = hass.data[const.DOMAIN]["devices"][serial_number]
@@ -1062,17 +1483,20 @@ async def draw_circle(hass, serial_number, xp, yp, r, e = None, c_color = (255,
     _LOGGER.debug(f"calculated where to place the circle: xs={xs}, ys={ys}, xe={xe}, ye={ye}")
 
     # Schattenbild abholen
-    img = device.get("shadow")
-    draw = ImageDraw.Draw(img)
-
-    _LOGGER.debug("fetched image from instance")
+    shadow = device.get("shadow")
 
     # Kreis zeichnen
-    draw.ellipse((xs, ys, xe, ye), outline = c_color, width = cf_width, fill = f_color)
+    def _draw():
+        draw = shadow.draw()
+        draw.ellipse((xs, ys, xe, ye), outline = c_color, width = cf_width, fill = f_color)
+        shadow.mark_dirty(xs, ys, xe, ye)
+
+    await async_render(hass, serial_number, _draw)
 
     _LOGGER.debug("drew the circle")
 
-    await send_screen(hass, serial_number)
+    if flush:
+        await send_screen(hass, serial_number)
 
 
 #************************************************************************
@@ -1089,8 +1513,9 @@ async def draw_circle(hass, serial_number, xp, yp, r, e = None, c_color = (255,
 # o: rectangle-frame width, default = 1
 # o: rectangle-frame-color, default = white (255, 255, 255)
 # o: fill-color, default = None, if no value given, same as the frame color
+# o: flush, sends the screen afterwards, default = True
 #************************************************************************
-async def draw_rectangle(hass, serial_number, xs, ys, xe, ye, rf_width = 1, rf_color = (255, 255, 255), f_color = None):
+async def draw_rectangle(hass, serial_number, xs, ys, xe, ye, rf_width = 1, rf_color = (255, 255, 255), f_color = None, flush = True):
     _LOGGER.info("draw a rectangle ...")
 
     device = hass.data[const.DOMAIN]["devices"][serial_number]
@@ -1110,19 +1535,22 @@ async def draw_rectangle(hass, serial_number, xs, ys, xe, ye, rf_width = 1, rf_c
     _LOGGER.debug(f"colors after normalize: rectangle-frame-color={rf_color}, fill-color={f_color}")
 
     # Schattenbild abholen
-    img = device.get("shadow")
-    draw = ImageDraw.Draw(img)
-
-    _LOGGER.debug("fetched image from instance")
+    shadow = device.get("shadow")
 
     # Rahmen & Füllung zeichnen
-    draw.rectangle((xs, ys, xe, ye), width = rf_width, outline = rf_color)
-    _LOGGER.debug(f"drew rectangle with xs={xs}, ys={ys}, xe={xe}, ye={ye}, rf-width={rf_width}, rf-color={rf_color}")
-    if f_color is not None:
-        draw.rectangle((xs + rf_width, ys + rf_width, xe - rf_width, ye - rf_width), fill = f_color)
-        _LOGGER.debug(f"filled rectangle with rf-width={rf_width}, f-color={f_color}")
+    def _draw():
+        draw = shadow.draw()
+        draw.rectangle((xs, ys, xe, ye), width = rf_width, outline = rf_color)
+        shadow.mark_dirty(xs, ys, xe, ye)
+        _LOGGER.debug(f"drew rectangle with xs={xs}, ys={ys}, xe={xe}, ye={ye}, rf-width={rf_width}, rf-color={rf_color}")
+        if f_color is not None:
+            draw.rectangle((xs + rf_width, ys + rf_width, xe - rf_width, ye - rf_width), fill = f_color)
+            _LOGGER.debug(f"filled rectangle with rf-width={rf_width}, f-color={f_color}")
 
-    await send_screen(hass, serial_number)
+    await async_render(hass, serial_number, _draw)
+
+    if flush:
+        await send_screen(hass, serial_number)
 
 
 #************************************************************************
@@ -1141,8 +1569,9 @@ async def draw_rectangle(hass, serial_number, xs, ys, xe, ye, rf_width = 1, rf_c
 # o: triangle-color, default = white (255, 255, 255)
 # o: triangle-frame-color, default = None, if no value given, same as the border
 # o: triangle-frame width, default = None
+# o: flush, sends the screen afterwards, default = True
 #************************************************************************
-async def draw_triangle(hass, serial_number, xa, ya, xb, yb, xc, yc, t_color = None, tf_color = None, tf_width = None):
+async def draw_triangle(hass, serial_number, xa, ya, xb, yb, xc, yc, t_color = None, tf_color = None, tf_width = None, flush = True):
     _LOGGER.info("draw a triangle ...")
 
     device = hass.data[const.DOMAIN]["devices"][serial_number]
@@ -1164,19 +1593,23 @@ async def draw_triangle(hass, serial_number, xa, ya, xb, yb, xc, yc, t_color = N
     _LOGGER.debug(f"colors after normalize: triangle-color={t_color}, triangle-frame-color={tf_color} + triangle-frame-width={tf_width}")
 
     # Schattenbild abholen
-    img = device.get("shadow")
-    draw = ImageDraw.Draw(img)
-
-    _LOGGER.debug("fetched image from instance")
+    shadow = device.get("shadow")
 
     triangle_points = [(xa, ya),
                   (xb, yb),
                   (xc, yc)]
-    draw.polygon(triangle_points, fill = t_color, outline = tf_color, width = tf_width)
+
+    def _draw():
+        draw = shadow.draw()
+        draw.polygon(triangle_points, fill = t_color, outline = tf_color, width = tf_width)
+        shadow.mark_dirty(min(xa, xb, xc) - tf_width, min(ya, yb, yc) - tf_width, max(xa, xb, xc) + tf_width, max(ya, yb, yc) + tf_width)
+
+    await async_render(hass, serial_number, _draw)
 
     _LOGGER.debug(f"drew polygon points: {triangle_points}")
 
-    await send_screen(hass, serial_number)
+    if flush:
+        await send_screen(hass, serial_number)
 
 
 #************************************************************************
@@ -1198,12 +1631,18 @@ async def draw_triangle(hass, serial_number, xa, ya, xb, yb, xc, yc, t_color = N
 # o: background-color
 # o: text-color, default = white (255, 255, 255)
 # o: rotation
+# o: font, custom font name or font file, default font of PIL if not given
+# o: flush, sends the screen afterwards, default = True
 #************************************************************************
-async def write_text(hass, serial_number, text, xs, ys, xe, ye, font_size = 15, t_color = None, bg_color = None, rotation = 0):
-    _LOGGER.debug(f"writing some text with values given: serial-number={serial_number}, text={text}, xs={xs}, ys={ys}, xe={xe}, ye={ye}, font-size={font_size}, text-color={t_color}, background-color={bg_color}, rotation={rotation}")
+async def write_text(hass, serial_number, text, xs, ys, xe, ye, font_size = 15, t_color = None, bg_color = None, rotation = 0, font = None, flush = True):
+    _LOGGER.debug(f"writing some text with values given: serial-number={serial_number}, text={text}, xs={xs}, ys={ys}, xe={xe}, ye={ye}, font-size={font_size}, text-color={t_color}, background-color={bg_color}, rotation={rotation}, font={font}")
 
     device = hass.data[const.DOMAIN]["devices"][serial_number]
 
+    if font_size is None:
+        font_size = 15
+        _LOGGER.debug(f"set font-size to {font_size} as no parameter is given")
+
     # Konvertiere mögliche Stringfarben in RGB-Tupel
     if t_color is None:
         t_color = (255, 255, 255)
@@ -1244,22 +1683,28 @@ async def write_text(hass, serial_number, text, xs, ys, xe, ye, font_size = 15,
 #    width = abs(xe - xs + 1)
 #    height = abs(ye - ys + 1)
 
-    img = device.get("shadow")
-    draw = ImageDraw.Draw(img)
-
-    _LOGGER.debug("fetched image from instance")
+    shadow = device.get("shadow")
 
     # Text
-    font = ImageFont.load_default(size = font_size)
-    draw.rectangle((xs, ys, xe, ye), fill = bg_color)
-    draw.text((xs, ys), text, fill = t_color, font = font)
+    face = get_font(font_size, font)
+    bbox = text_bbox(text, font_size, font)
+
+    def _draw():
+        draw = shadow.draw()
+        draw.rectangle((xs, ys, xe, ye), fill = bg_color)
+        draw.text((xs, ys), text, fill = t_color, font = face)
+        shadow.mark_dirty(xs, ys, xe, ye)
+        shadow.mark_dirty(xs + bbox[0], ys + bbox[1], xs + bbox[2], ys + bbox[3])       # Text darf über das Rechteck hinausragen
+
+    await async_render(hass, serial_number, _draw)
     _LOGGER.debug("wrote text into the image")
 
     # bild ggf drehen
 #    img = img.rotate(rotation, expand=True)
 #    i_width, i_height = img.size
 
-    await send_screen(hass, serial_number)
+    if flush:
+        await send_screen(hass, serial_number)
 
 
 #************************************************************************
@@ -1282,8 +1727,9 @@ async def write_text(hass, serial_number, text, xs, ys, xe, ye, font_size = 15,
 # o: bar-outline, default = True
 # o: background-color
 # o: rotation, default = 90
+# o: flush, sends the screen afterwards, default = True
 #************************************************************************
-async def draw_progress_bar(hass, serial_number, xs, ys, xe, ye, bar_value=None, min_value=0, max_value=100, bf_width=1, bf_color=None, b_color=(255, 255, 255), bg_color=None, rotation = 90, show_value=False, val_appendix=""):
+async def draw_progress_bar(hass, serial_number, xs, ys, xe, ye, bar_value=None, min_value=0, max_value=100, bf_width=1, bf_color=None, b_color=(255, 255, 255), bg_color=None, rotation = 90, show_value=False, val_appendix="", flush = True):
     _LOGGER.debug(f"doing a progress with the values given: xs={xs}, ys={ys}, xe={xe}, ye={ye}, bar-value={bar_value}, min-value={min_value}, max-value={max_value}, bar-frame-width={bf_width}, bar-color={b_color}, bar-frame-color={bf_color}, background-color={bg_color}, rotation={rotation}, show-value={show_value}, value-appendix={val_appendix}")
 
     device = hass.data[const.DOMAIN]["devices"][serial_number]
@@ -1324,53 +1770,54 @@ async def draw_progress_bar(hass, serial_number, xs, ys, xe, ye, bar_value=None,
     _LOGGER.debug(f"fill-ratio={fill_ratio}, fill-width={fill_w}")
 
     # Bild aus der Instanz ziehen
-    img = device.get("shadow")
-    draw = ImageDraw.Draw(img)
+    shadow = device.get("shadow")
 
-    _LOGGER.debug("fetched image from instance")
+    def _draw():
+        draw = shadow.draw()
 
-    # Rahmen zeichnen
-    draw.rectangle((xs, ys, xs + bar_w, ys + bar_h), width = bf_width, outline = bf_color, fill = bg_color)
+        # Rahmen zeichnen
+        draw.rectangle((xs, ys, xs + bar_w, ys + bar_h), width = bf_width, outline = bf_color, fill = bg_color)
+        shadow.mark_dirty(xs, ys, xs + bar_w, ys + bar_h)
 
-    _LOGGER.debug(f"drew the frame")
+        _LOGGER.debug(f"drew the frame")
 
-    # Füllung zeichnen
-    draw.rectangle((xs + bf_width, ys + bf_width, xs + bf_width + fill_w, ys + bar_h - bf_width), fill=b_color)
+        # Füllung zeichnen
+        draw.rectangle((xs + bf_width, ys + bf_width, xs + bf_width + fill_w, ys + bar_h - bf_width), fill=b_color)
 
-    _LOGGER.debug(f"drew the bar")
+        _LOGGER.debug(f"drew the bar")
 
-    # ggf Wert einzeichnen
-    if show_value:
+        # ggf Wert einzeichnen
+        if show_value:
 #        value_str = f"{int(bar_value)}%" + val_appendix
-        value_str = f"{int(bar_value)}" + val_appendix
-        font_size = int(bar_h - bf_width - bf_width - 2)
-        try:
+            value_str = f"{int(bar_value)}" + val_appendix
+            font_size = int(bar_h - bf_width - bf_width - 2)
 #            font = ImageFont.truetype("DejaVuSans-Bold.ttf", int(bar_h * 0.5))                # warum hier ein Faktor von 0,5? Ich würde ja eher sagen -4, oder?
 #            font = ImageFont.truetype("DejaVuSans-Bold.ttf", int(bar_h - bf_width - bf_width - 2))                # warum hier ein Faktor von 0,5? Ich würde ja eher sagen -4, oder?
-            font = ImageFont.truetype("DejaVuSans-Bold.ttf", font_size)                # warum hier ein Faktor von 0,5? Ich würde ja eher sagen -4, oder?
-        except Exception:
-            font = ImageFont.load_default()
-
-        bbox = draw.textbbox((0, 0), value_str, font=font)
-        text_w = bbox[2] - bbox[0]
-        text_h = bbox[3] - bbox[1]
-        tx = (bar_w - text_w) // 2
-        ty = (bar_h - text_h) // 2
-
-        _LOGGER.debug(f"show_value for '{value_str}' is given: text-width={text_w} px, text-height={text_h} px, at x={tx}, y={ty}")
-
-        # Overlay: Wir schreiben zwei Versionen — überlagert, getrennt
-        # Erst die invertierte (über gefülltem Teil)
-        if fill_w > 0:
-            mask_img = Image.new("L", (bar_w, bar_h), 0)
-            mask_draw = ImageDraw.Draw(mask_img)
-            mask_draw.rectangle([0, 0, fill_w, bar_h], fill=255)
-            draw.text((tx, ty), value_str, font=font, fill=bg_color)
-            _LOGGER.debug(f"drew the filled bar text")
-        # Dann der Rest (noch nicht gefüllt)
-        if fill_w < bar_w:
-            draw.text((tx, ty), value_str, font=font, fill=b_color)
-            _LOGGER.debug(f"drew the unfilled bar text")
+            font = get_font(font_size, "DejaVuSans-Bold.ttf")                # warum hier ein Faktor von 0,5? Ich würde ja eher sagen -4, oder?
+
+            bbox = text_bbox(value_str, font_size, "DejaVuSans-Bold.ttf")
+            text_w = bbox[2] - bbox[0]
+            text_h = bbox[3] - bbox[1]
+            tx = (bar_w - text_w) // 2
+            ty = (bar_h - text_h) // 2
+
+            _LOGGER.debug(f"show_value for '{value_str}' is given: text-width={text_w} px, text-height={text_h} px, at x={tx}, y={ty}")
+            shadow.mark_dirty(*draw.textbbox((tx, ty), value_str, font=font))
+
+            # Overlay: Wir schreiben zwei Versionen — überlagert, getrennt
+            # Erst die invertierte (über gefülltem Teil)
+            if fill_w > 0:
+                mask_img = Image.new("L", (bar_w, bar_h), 0)
+                mask_draw = ImageDraw.Draw(mask_img)
+                mask_draw.rectangle([0, 0, fill_w, bar_h], fill=255)
+                draw.text((tx, ty), value_str, font=font, fill=bg_color)
+                _LOGGER.debug(f"drew the filled bar text")
+            # Dann der Rest (noch nicht gefüllt)
+            if fill_w < bar_w:
+                draw.text((tx, ty), value_str, font=font, fill=b_color)
+                _LOGGER.debug(f"drew the unfilled bar text")
+
+    await async_render(hass, serial_number, _draw)
 
     # --- Rotation (optional) ---
 #    img = img.rotate(rotation, expand=True)
@@ -1378,7 +1825,8 @@ async def draw_progress_bar(hass, serial_number, xs, ys, xe, ye, bar_value=None,
 
 #    _LOGGER.debug(f"rotated the image for {rotation} degrees")
 
-    await send_screen(hass, serial_number)
+    if flush:
+        await send_screen(hass, serial_number)
 
 
 #************************************************************************
@@ -1394,8 +1842,9 @@ async def draw_progress_bar(hass, serial_number, xs, ys, xe, ye, bar_value=None,
 # o: size
 # o: qr-color, default = white (255, 255, 255)
 # o: background-color
+# o: flush, sends the screen afterwards, default = True
 #************************************************************************
-async def generate_qr(hass, serial_number, data, xs, ys, size=None, qr_color=None, bg_color=None):
+async def generate_qr(hass, serial_number, data, xs, ys, size=None, qr_color=None, bg_color=None, flush=True):
     _LOGGER.info(f"generating a qr code")
     _LOGGER.debug(f"given values: data={data}, xs={xs}, ys={ys}, size={size}, qr-color={qr_color}, background-color={bg_color}")
 
@@ -1413,10 +1862,13 @@ async def generate_qr(hass, serial_number, data, xs, ys, size=None, qr_color=Non
     bg_color = normalize_color(bg_color)                     
     _LOGGER.debug(f"colors after normalize: qr-color={qr_color}, background-color={bg_color}")
 
-    qr = qrcode.QRCode(border=1, box_size=1, error_correction=qrcode.constants.ERROR_CORRECT_M)
-    qr.add_data(data)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color = qr_color, back_color = bg_color).convert("RGB")     # take a look at the colors, but they need to be in that order !
+    def _make_qr():
+        qr = qrcode.QRCode(border=1, box_size=1, error_correction=qrcode.constants.ERROR_CORRECT_M)
+        qr.add_data(data)
+        qr.make(fit=True)
+        return qr.make_image(fill_color = qr_color, back_color = bg_color).convert("RGB")     # take a look at the colors, but they need to be in that order !
+
+    img = await async_render_job(hass, _make_qr)
     _LOGGER.debug(f"produced QR code, fc=qr, bc=bg")
 
     # check boundaries
@@ -1439,17 +1891,18 @@ async def generate_qr(hass, serial_number, data, xs, ys, size=None, qr_color=Non
         _LOGGER.warning(f"At this Y-position ({ys}), the QR image ({size} px) would exceed the image width dimensions ({device.get("height")} px), cancelling !")
         return False
 
-    img = img.resize((qr_width * scale, qr_height * scale), Image.NEAREST)
+    img = await async_render_job(hass, img.resize, (qr_width * scale, qr_height * scale), Image.NEAREST)
     qr_width_resized, qr_height_resized = img.size
     _LOGGER.debug(f"dimensions after resize: qr-width={qr_width_resized}, qr-height={qr_height_resized}")
 
     shadow = device.get("shadow")
     _LOGGER.debug("read image from instance")
 
-    shadow.paste(img, (xs, ys))
+    await async_render(hass, serial_number, shadow.paste, img, (xs, ys))
     _LOGGER.debug(f"pasted QR code into image")
     
-    await send_screen(hass, serial_number)
+    if flush:
+        await send_screen(hass, serial_number)
 
 
 #************************************************************************
@@ -1470,8 +1923,9 @@ async def generate_qr(hass, serial_number, data, xs, ys, size=None, qr_color=Non
 # o: bg_color
 # o: mark_points
 # o: show_axis
+# o: flush, sends the screen afterwards, default = True
 #************************************************************************
-async def draw_line_chart(hass, serial_number, xs, ys, xe, ye, line_values, line_width=None, line_color=None, axis_color=None, bg_color=None, mark_points=None, show_axis=None, ground_to_zero=None):
+async def draw_line_chart(hass, serial_number, xs, ys, xe, ye, line_values, line_width=None, line_color=None, axis_color=None, bg_color=None, mark_points=None, show_axis=None, ground_to_zero=None, flush=True):
     _LOGGER.info(f"drawing a line chart")
     _LOGGER.debug(f"given values: xs={xs}, ys={ys}, xe={xe}, ye={ye}, line-values={line_values}, line-width={line_width}, line-color={line_color}, axis-color={axis_color}, background-color={bg_color}, mark-points={mark_points}, show-axis={show_axis}, ground-to-zero={ground_to_zero}")
 
@@ -1532,24 +1986,120 @@ async def draw_line_chart(hass, serial_number, xs, ys, xe, ye, line_values, line
     _LOGGER.debug(f"accumulated points: {line_chart_points}")
 
     # Schattenbild abholen
-    img = device.get("shadow")
-    draw = ImageDraw.Draw(img)
-    _LOGGER.debug("fetched image from instance")
+    shadow = device.get("shadow")
+
+    def _draw():
+        draw = shadow.draw()
+        draw.line(line_chart_points, fill=line_color, width=line_width)
+        shadow.mark_dirty(xs - line_width - 2, ys - line_width - 2, xe + line_width + 2, ye + line_width + 2)       # inkl. Punkte und Achsen
+        _LOGGER.debug(f"drew line chart points: {line_chart_points}")
 
-    draw.line(line_chart_points, fill=line_color, width=line_width)
-    _LOGGER.debug(f"drew line chart points: {line_chart_points}")
+        if mark_points is True:
+            for px, py in line_chart_points:
+                draw.ellipse((px - 2, py - 2, px + 2, py + 2), fill=line_color)
+            _LOGGER.debug(f"marked points")
 
-    if mark_points is True:
-        for px, py in line_chart_points:
-            draw.ellipse((px - 2, py - 2, px + 2, py + 2), fill=line_color)
-        _LOGGER.debug(f"marked points")
+        if show_axis is True:
+            draw.line((xs, ys, xs, ye), fill=axis_color)           # Y-Axis
+            draw.line((xs, ye, xe, ye), fill=axis_color)           # X-Axis
+            _LOGGER.debug(f"drew axis")
 
-    if show_axis is True:
-        draw.line((xs, ys, xs, ye), fill=axis_color)           # Y-Axis
-        draw.line((xs, ye, xe, ye), fill=axis_color)           # X-Axis
-        _LOGGER.debug(f"drew axis")
+    await async_render(hass, serial_number, _draw)
 
+    if flush:
+        await send_screen(hass, serial_number)
+
+
+#************************************************************************
+#        D R A W  B A T C H
+#************************************************************************
+# draws a list of primitives into the shadow image, one after the other,
+# and flushes the screen once at the end instead of after every primitive
+#
+# every item is a dictionary with "type" (name of the service) and the
+# same fields the single service takes, e.g.
+#   {"type": "draw_line", "xs_position": 0, "ys_position": 0, ...}
+# items that fail are logged and skipped, the others are drawn anyway
+#************************************************************************
+# m: hass
+# m: serial_number
+# m: items, list of dictionaries
+# r: dictionary with number of primitives drawn, errors and timings
+#************************************************************************
+async def draw_batch(hass, serial_number, items):
+    _LOGGER.info(f"drawing a batch of {len(items)} primitives")
+
+    errors = []
+    drawn = 0
+
+    start = time.monotonic()
+    for index, item in enumerate(items):
+        item = dict(item)
+        primitive = item.pop("type", None)
+        if primitive not in BATCH_PRIMITIVES:
+            _LOGGER.warning(f"batch item {index} has an unknown type {primitive}, skipping")
+            errors.append({"index": index, "type": primitive, "error": "unknown type"})
+            continue
+
+        func, fields = BATCH_PRIMITIVES[primitive]
+        unknown = [key for key in item if key not in fields]
+        if unknown:
+            _LOGGER.warning(f"batch item {index} ({primitive}) has unknown fields {unknown}, skipping")
+            errors.append({"index": index, "type": primitive, "error": f"unknown fields {unknown}"})
+            continue
+
+        try:
+            await func(hass, serial_number, **{fields[key]: value for key, value in item.items()}, flush = False)
+            drawn += 1
+        except Exception as e:
+            _LOGGER.error(f"error while drawing batch item {index} ({primitive}): {e}")
+            errors.append({"index": index, "type": primitive, "error": str(e)})
+
+    rendered = time.monotonic()
     await send_screen(hass, serial_number)
+    sent = time.monotonic()
+
+    _LOGGER.debug(f"batch of {serial_number}: {drawn} of {len(items)} primitives drawn in {(rendered - start) * 1000:.1f} ms, sent in {(sent - rendered) * 1000:.1f} ms")
+
+    return {
+        "primitives": drawn,
+        "errors": errors,
+        "render_ms": round((rendered - start) * 1000, 1),
+        "transfer_ms": round((sent - rendered) * 1000, 1),
+    }
+
+
+# service fields of each primitive -> parameter names of its function
+BATCH_PRIMITIVES = {
+    "write_text": (write_text, {
+        "text": "text", "x_start": "xs", "y_start": "ys", "x_end": "xe", "y_end": "ye",
+        "font_size": "font_size", "t_color": "t_color", "bg_color": "bg_color", "rotation": "rotation", "font": "font"}),
+    "show_icon": (show_icon, {
+        "icon_name": "i_name", "icon_color": "i_color", "xs": "xs", "ys": "ys", "icon_size": "i_size", "rotation": "rotation"}),
+    "draw_circle": (draw_circle, {
+        "x_position": "xp", "y_position": "yp", "radius": "r", "ellipse": "e",
+        "c_color": "c_color", "f_color": "f_color", "cf_width": "cf_width"}),
+    "draw_rectangle": (draw_rectangle, {
+        "x_start": "xs", "y_start": "ys", "x_end": "xe", "y_end": "ye",
+        "rf_width": "rf_width", "rf_color": "rf_color", "f_color": "f_color"}),
+    "draw_triangle": (draw_triangle, {
+        "x_a": "xa", "y_a": "ya", "x_b": "xb", "y_b": "yb", "x_c": "xc", "y_c": "yc",
+        "t_color": "t_color", "tf_color": "tf_color", "tf_width": "tf_width"}),
+    "draw_line": (draw_line, {
+        "xs_position": "xs", "ys_position": "ys", "xe_position": "xe", "ye_position": "ye",
+        "l_color": "l_color", "l_width": "l_width"}),
+    "draw_progress_bar": (draw_progress_bar, {
+        "x_start": "xs", "y_start": "ys", "x_end": "xe", "y_end": "ye",
+        "bar_min": "min_value", "bar_value": "bar_value", "bar_max": "max_value",
+        "bf_width": "bf_width", "b_color": "b_color", "bf_color": "bf_color", "bg_color": "bg_color",
+        "rotation": "rotation", "show_value": "show_value"}),
+    "generate_qr": (generate_qr, {
+        "data": "data", "xs": "xs", "ys": "ys", "size": "size", "qr_color": "qr_color", "bg_color": "bg_color"}),
+    "draw_line_chart": (draw_line_chart, {
+        "x_start": "xs", "y_start": "ys", "x_end": "xe", "y_end": "ye", "line_values": "line_values",
+        "line_width": "line_width", "line_color": "line_color", "axis_color": "axis_color", "bg_color": "bg_color",
+        "mark_points": "mark_points", "show_axis": "show_axis", "ground_to_zero": "ground_to_zero"}),
+}
 
 
 async def _async_update_firmware_device(hass, serial_number, firmware_version):
@@ -38,3 +38,72 @@ CMD_READ_SERIAL_NUMBER     = 0xC3
 # array-table [old][new]:, see internal_struct.md for evidence
 ORIENTATION_CONVERSION_MAP_060_061 = [ [0,2,3,1], [2,0,1,3], [1,3,0,2], [3,1,2,0] ]               # von 0.6.0 bis 0.6.1
 ORIENTATION_CONVERSION_MAP         = [ [0,2,1,3], [2,0,3,1], [3,1,0,2], [1,3,2,0] ]               # von 0.6.2 bis ...
+
+# dirty rectangles of the shadow image
+DIRTY_MERGE_SLACK_PX       = 4096            # merge two dirty boxes if the union costs at most that many extra pixels
+DIRTY_FULL_SCREEN_RATIO    = 0.6             # send the whole screen if at least 60% of it is dirty anyway
+TILE_SIZE                  = 16              # tile edge in px for comparing against the last transmitted image
+
+# layers of the shadow image, lowest first
+LAYER_BACKGROUND           = "background"    # opaque, background color
+LAYER_CONTENT              = "content"       # everything drawn by the services
+LAYER_CLOCK                = "clock"         # analog, digital and rheinturm clock
+LAYER_OVERLAY              = "overlay"       # temporary things on top of everything
+SHADOW_LAYERS              = (LAYER_BACKGROUND, LAYER_CONTENT, LAYER_CLOCK, LAYER_OVERLAY)
+
+# FastLZ transmission
+FASTLZ_MAX_RATIO           = 0.8             # send a stripe raw if FastLZ does not save at least 20% of its bytes
+
+# serial transport
+TRANSPORT_HIGH_WATER       = 64 * 1024       # bytes in the output buffer before senders have to wait
+TRANSPORT_LOW_WATER        = 16 * 1024       # senders continue below this
+TRANSPORT_READ_SIZE        = 256             # bytes read at once when the port is readable
+HEADER_PAUSE               = 0.05            # seconds to wait after a bitmap header before sending the data
+BITMAP_STRIPE_BYTES        = 64 * 1024       # bitmaps are split into stripes of at most that many pixel bytes
+
+# transfer calibration, candidates in the order they are tried
+CALIBRATION_HEADER_PAUSES  = [0.05, 0.02, 0.01, 0.005, 0]
+CALIBRATION_STRIPE_BYTES   = [16 * 1024, 32 * 1024, 64 * 1024, 128 * 1024]
+CALIBRATION_RECOVERY       = 1.0             # seconds to wait before repairing the screen after a failed candidate
+
+# rendering into the shadow images
+RENDER_WORKERS             = 2               # threads drawing into shadow images, one job per display at a time
+LOOP_MONITOR_INTERVAL      = 0.5             # seconds between two measurements of the event loop delay
+LOOP_LAG_WARNING           = 0.1             # log event loop delays above this many seconds
+
+# fonts
+FONT_DIR                   = "weact_display/fonts"   # custom TTF/OTF files, relative to the config directory
+FONT_CACHE_SIZE            = 32              # faces kept per (font, size)
+TEXT_METRICS_CACHE_SIZE    = 1024            # text sizes kept per (text, size, font)
+CLOCK_SPRITE_CACHE_SIZE    = 4               # digit sprite sheets and analog dials kept per (size, colors)
+
+# widgets bound to entities
+WIDGET_DEBOUNCE            = 0.5             # seconds to collect state changes before the widgets are drawn
+WIDGET_MIN_INTERVAL        = 2.0             # seconds between two widget flushes of one display
+WIDGET_STORE_VERSION       = 1               # version of the store with the last widget values
+WIDGET_SAVE_DELAY          = 10              # seconds to collect widget values before the store is written
+
+# rheinturm light clock, lamp groups from the top of the shaft to the bottom
+RHEINTURM_GROUPS           = (("h10", 2), ("h1", 9), ("m10", 5), ("m1", 9), ("s10", 5), ("s1", 9))
+RHEINTURM_TOWER_COLOR      = (140, 140, 150) # concrete, also the color of a lamp switched off
+RHEINTURM_LAMP_COLOR       = (255, 236, 160) # lamp switched on
+RHEINTURM_SEPARATOR_COLOR  = (255, 0, 0)     # red lamps between the groups
+
+# priorities of the frames written to a display, lower goes first
+PRIORITY_CONTROL           = 0               # orientation, brightness, humiture, queries
+PRIORITY_BULK              = 1               # bitmaps and fills
+
+# queries answered by the display, timeout in seconds per answer
+QUERY_TIMEOUTS = {
+    CMD_WHO_AM_I: 1.0,
+    CMD_READ_ORIENTATION: 1.0,
+    CMD_READ_BRIGHTNESS: 1.0,
+    CMD_READ_FIRMWARE_VERSION: 1.0,
+}
+QUERY_TIMEOUT_DEFAULT      = 1.0             # for answers not listed above
+QUERY_RETRIES              = 2               # further attempts after a timeout
+
+# brightness
+BRIGHTNESS_DEBOUNCE        = 0.3             # seconds without new target before the brightness is sent
+BRIGHTNESS_CONFIRM_ATTEMPTS = 3              # brightness queries while the display may still be fading
+BRIGHTNESS_CONFIRM_INTERVAL = 0.5            # seconds between these queries
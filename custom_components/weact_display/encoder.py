@@ -0,0 +1,133 @@
+import logging
+
+from PIL import Image, ImageChops
+
+try:
+    import numpy as np                                                 # optional, HA core ships it anyway
+except ImportError:
+    np = None
+
+_LOGGER = logging.getLogger(__name__)
+
+# lookup tables for the PIL encoder, split every RGB565 pixel into its high and its low byte
+#   high byte: RRRRRGGG
+#   low byte:  GGGBBBBB
+_LUT_HIGH_R = [v & 0xF8 for v in range(256)]
+_LUT_HIGH_G = [v >> 5 for v in range(256)]
+_LUT_LOW_G  = [(v & 0x1C) << 3 for v in range(256)]
+_LUT_LOW_B  = [v >> 3 for v in range(256)]
+
+
+#************************************************************************
+#        E N C O D E  R G B 5 6 5  ( R E F E R E N C E )
+#************************************************************************
+# converts RGB888 into RGB565 little-endian, pixel by pixel
+# slow, but the reference all other encoders need to match byte by byte
+#************************************************************************
+# m: data_888, RGB888-data
+# m: width
+# m: height
+# r: RGB565-data, 2 bytes per pixel, LSB first
+#************************************************************************
+def encode_rgb565_reference(data_888, width, height) -> bytes:
+    data_565 = bytearray()
+    for i in range(0, len(data_888), 3):
+        r = data_888[i]
+        g = data_888[i + 1]
+        b = data_888[i + 2]
+        # 8-Bit nach 5-6-5 Bit skalieren
+        rgb565 = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
+        # little-endian (LSB zuerst)
+        data_565.append(rgb565 & 0xFF)
+        data_565.append((rgb565 >> 8) & 0xFF)
+
+    return bytes(data_565)
+
+
+#************************************************************************
+#        E N C O D E  R G B 5 6 5  ( P I L )
+#************************************************************************
+# converts RGB888 into RGB565 little-endian within PIL (C-speed)
+# Pillow has no packer for RGB565, so both bytes of a pixel are built
+# as "L" bands via lookup tables and interleaved as "LA" (low, high)
+#************************************************************************
+# m: data_888, RGB888-data
+# m: width
+# m: height
+# r: RGB565-data, 2 bytes per pixel, LSB first
+#************************************************************************
+def encode_rgb565_pil(data_888, width, height) -> bytes:
+    img = Image.frombuffer("RGB", (width, height), bytes(data_888), "raw", "RGB", 0, 1)
+    r, g, b = img.split()
+
+    high = ImageChops.add(r.point(_LUT_HIGH_R), g.point(_LUT_HIGH_G))             # bits do not overlap, no clipping
+    low  = ImageChops.add(g.point(_LUT_LOW_G), b.point(_LUT_LOW_B))
+
+    return Image.merge("LA", (low, high)).tobytes()
+
+
+#************************************************************************
+#        E N C O D E  R G B 5 6 5  ( N U M P Y )
+#************************************************************************
+# converts RGB888 into RGB565 little-endian with a numpy bit-shift kernel
+#************************************************************************
+# m: data_888, RGB888-data
+# m: width
+# m: height
+# r: RGB565-data, 2 bytes per pixel, LSB first
+#************************************************************************
+def encode_rgb565_numpy(data_888, width, height) -> bytes:
+    px = np.frombuffer(data_888, dtype=np.uint8).reshape(-1, 3).astype(np.uint16)
+    rgb565 = ((px[:, 0] & 0xF8) << 8) | ((px[:, 1] & 0xFC) << 3) | (px[:, 2] >> 3)
+
+    return rgb565.astype("<u2").tobytes()
+
+
+ENCODERS = {
+    "reference": encode_rgb565_reference,
+    "pil": encode_rgb565_pil,
+}
+if np is not None:
+    ENCODERS["numpy"] = encode_rgb565_numpy
+
+# fastest available first
+DEFAULT_ENCODER = "numpy" if "numpy" in ENCODERS else "pil"
+
+
+#************************************************************************
+#        E N C O D E  R G B 5 6 5
+#************************************************************************
+# converts RGB888 into RGB565 little-endian with the chosen encoder
+#************************************************************************
+# m: data_888, RGB888-data
+# m: width
+# m: height
+# o: encoder, name from ENCODERS, default = fastest available
+# r: RGB565-data, 2 bytes per pixel, LSB first
+#************************************************************************
+def encode_rgb565(data_888, width, height, encoder = None) -> bytes:
+    if encoder is None:
+        encoder = DEFAULT_ENCODER
+
+    func = ENCODERS.get(encoder)
+    if func is None:
+        _LOGGER.warning(f"unknown RGB565 encoder {encoder}, using {DEFAULT_ENCODER}")
+        func = ENCODERS[DEFAULT_ENCODER]
+
+    if len(data_888) != width * height * 3:
+        raise ValueError(f"expected {width * height * 3} RGB888 bytes for {width}x{height} px, got {len(data_888)}")
+
+    return func(data_888, width, height)
+
+
+#************************************************************************
+#        R G B 5 6 5  C O L O R
+#************************************************************************
+# converts one RGB888 color tupel into its RGB565 value
+#************************************************************************
+# m: color, (r, g, b)
+# r: RGB565 value as integer
+#************************************************************************
+def rgb565_color(color) -> int:
+    r, g, b = color
+    return ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
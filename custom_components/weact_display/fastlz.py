@@ -0,0 +1,128 @@
+#************************************************************************
+# FastLZ level 1 compressor, as used by CMD_SET_BITMAP_FASTLZ (0x15)
+# port of fastlz1_compress() from https://github.com/ariya/FastLZ (MIT)
+#
+# block format (level 1, first byte has its upper 3 bits cleared):
+#   000LLLLL                     literal run, L+1 bytes follow (max 32)
+#   LLLOOOOO OOOOOOOO            match, copy L+2 bytes from distance O+1
+#   111OOOOO LLLLLLLL OOOOOOOO   long match, copy L+9 bytes from distance O+1
+#************************************************************************
+
+_MAX_COPY     = 32
+_MAX_LEN      = 264                   # 256 + 8
+_MAX_DISTANCE = 8192
+_HASH_LOG     = 13
+_HASH_MASK    = (1 << _HASH_LOG) - 1
+
+
+def _hash(seq):
+    return ((seq * 2654435769) >> (32 - _HASH_LOG)) & _HASH_MASK
+
+
+def _literals(out, data, start, runs):
+    while runs >= _MAX_COPY:
+        out.append(_MAX_COPY - 1)
+        out += data[start:start + _MAX_COPY]
+        start += _MAX_COPY
+        runs -= _MAX_COPY
+    if runs > 0:
+        out.append(runs - 1)
+        out += data[start:start + runs]
+
+
+def _match(out, length, distance):
+    distance -= 1
+    while length > _MAX_LEN - 2:
+        out.append((7 << 5) + (distance >> 8))
+        out.append(_MAX_LEN - 2 - 7 - 2)
+        out.append(distance & 255)
+        length -= _MAX_LEN - 2
+    if length < 7:
+        out.append((length << 5) + (distance >> 8))
+        out.append(distance & 255)
+    else:
+        out.append((7 << 5) + (distance >> 8))
+        out.append(length - 7)
+        out.append(distance & 255)
+
+
+def _match_length(data, ref, ip, bound):
+    # compare in slices first, RGB565 data has long runs
+    start = ip
+    step = 64
+    while ip + step <= bound and data[ref:ref + step] == data[ip:ip + step]:
+        ref += step
+        ip += step
+    while ip < bound:
+        if data[ref] != data[ip]:
+            ip += 1
+            break
+        ref += 1
+        ip += 1
+    return ip - start
+
+
+#************************************************************************
+#        F A S T L Z  C O M P R E S S
+#************************************************************************
+# compresses one block with FastLZ level 1
+#************************************************************************
+# m: data, bytes
+# r: compressed block
+#************************************************************************
+def fastlz_compress(data) -> bytes:
+    data = bytes(data)
+    length = len(data)
+    out = bytearray()
+
+    if length < 4:
+        _literals(out, data, 0, length)
+        return bytes(out)
+
+    ip_bound = length - 4                 # because readu32
+    ip_limit = length - 12 - 1
+    htab = [0] * (1 << _HASH_LOG)
+
+    # we start with literal copy
+    anchor = 0
+    ip = 2
+    while ip < ip_limit:
+        # find a match
+        while True:
+            seq = data[ip] | (data[ip + 1] << 8) | (data[ip + 2] << 16)
+            h = _hash(seq)
+            ref = htab[h]
+            htab[h] = ip
+            distance = ip - ref
+            if distance < _MAX_DISTANCE:
+                cmp = data[ref] | (data[ref + 1] << 8) | (data[ref + 2] << 16)
+            else:
+                cmp = 0x1000000
+            if ip >= ip_limit:
+                break
+            ip += 1
+            if seq == cmp:
+                break
+        if ip >= ip_limit:
+            break
+        ip -= 1
+
+        if ip > anchor:
+            _literals(out, data, anchor, ip - anchor)
+
+        match_len = _match_length(data, ref + 3, ip + 3, ip_bound)
+        _match(out, match_len, distance)
+
+        # update the hash at match boundary
+        ip += match_len
+        seq = data[ip] | (data[ip + 1] << 8) | (data[ip + 2] << 16) | (data[ip + 3] << 24)
+        htab[_hash(seq & 0xFFFFFF)] = ip
+        ip += 1
+        htab[_hash(seq >> 8)] = ip
+        ip += 1
+
+        anchor = ip
+
+    _literals(out, data, anchor, length - anchor)
+
+    return bytes(out)
@@ -0,0 +1,109 @@
+import io
+import logging
+from functools import lru_cache
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFont
+
+import custom_components.weact_display.const as const
+
+_LOGGER = logging.getLogger(__name__)
+
+# Name (Dateiname ohne Endung) -> Inhalt der TTF/OTF-Datei, einmal beim Start gelesen
+_CUSTOM_FONTS = {}
+
+# nur zum Messen, es wird nie hineingezeichnet
+_MEASURE = ImageDraw.Draw(Image.new("1", (1, 1)))
+
+
+#************************************************************************
+#        F O N T S
+#************************************************************************
+# one font registry for all text drawn by the integration (write_text,
+# progress bar, digital clock, widgets).
+#
+# faces are kept in an LRU per (font, size), text sizes in an LRU per
+# (text, font, size), so a clock or widget drawing the same strings
+# again and again neither loads the font file nor measures anew.
+#
+# font is
+#   None                    the default font of PIL in the given size
+#   name of a custom font   file <config>/weact_display/fonts/<name>.ttf|otf
+#   file name or path       any font FreeType finds, e.g. DejaVuSans-Bold.ttf
+#************************************************************************
+
+
+#************************************************************************
+# reads all custom fonts from the config directory, called once at startup
+#************************************************************************
+# m: hass
+#************************************************************************
+async def load_custom_fonts(hass):
+    font_dir = Path(hass.config.path(const.FONT_DIR))
+
+    fonts = await hass.async_add_executor_job(_read_font_dir, font_dir)
+
+    _CUSTOM_FONTS.clear()
+    _CUSTOM_FONTS.update(fonts)
+    _load_font.cache_clear()
+    text_bbox.cache_clear()
+
+    _LOGGER.debug(f"loaded {len(fonts)} custom fonts from {font_dir}: {sorted(fonts)}")
+
+
+def _read_font_dir(font_dir):
+    fonts = {}
+    if not font_dir.is_dir():
+        return fonts
+
+    for path in sorted(font_dir.iterdir()):
+        if path.suffix.lower() not in (".ttf", ".otf"):
+            continue
+        try:
+            data = path.read_bytes()
+            ImageFont.truetype(io.BytesIO(data), 10)                    # einmal öffnen, kaputte Dateien gleich erkennen
+        except Exception as e:
+            _LOGGER.warning(f"could not load font {path}: {e}")
+            continue
+        fonts[path.stem] = data
+    return fonts
+
+
+#************************************************************************
+# returns the face of a font in a size, cached
+#************************************************************************
+# m: size in px
+# o: font, see above
+#************************************************************************
+def get_font(size, font = None):
+    return _load_font(font or "", int(size))
+
+
+@lru_cache(maxsize = const.FONT_CACHE_SIZE)
+def _load_font(font, size):
+    if font in _CUSTOM_FONTS:
+        return ImageFont.truetype(io.BytesIO(_CUSTOM_FONTS[font]), size)
+
+    if font:
+        try:
+            return ImageFont.truetype(font, size)
+        except OSError as e:
+            _LOGGER.warning(f"could not load font {font} in size {size}, using the default font: {e}")
+
+    try:
+        return ImageFont.load_default(size = size)
+    except Exception as e:
+        _LOGGER.error(f"[{const.DOMAIN}] could not load TTF due to: {e}")
+        return ImageFont.load_default()
+
+
+#************************************************************************
+# returns the bounding box of a text drawn at (0, 0), cached
+#************************************************************************
+# m: text
+# m: size in px
+# o: font, see above
+#************************************************************************
+@lru_cache(maxsize = const.TEXT_METRICS_CACHE_SIZE)
+def text_bbox(text, size, font = None):
+    return _MEASURE.textbbox((0, 0), text, font = get_font(size, font))
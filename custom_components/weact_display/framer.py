@@ -0,0 +1,92 @@
+import logging
+import re
+
+import custom_components.weact_display.const as const
+
+_LOGGER = logging.getLogger(__name__)
+
+# answers with a fixed length, including command byte and 0x0A
+PACKET_LENGTHS = {
+    const.CMD_HUMITURE_REPORT: 6,                  # [0x86] [T_low] [T_high] [H_low] [H_high] [0A]
+    const.CMD_READ_BRIGHTNESS: 3,                  # [0x83] [brightness] [0A]
+    const.CMD_READ_ORIENTATION: 3,                 # [0x82] [orientation] [0A]
+}
+
+# answers carrying a string, terminated by 0x0A
+PACKET_STRINGS = {
+    const.CMD_WHO_AM_I,
+    const.CMD_READ_FIRMWARE_VERSION,
+    const.CMD_READ_SERIAL_NUMBER,
+}
+
+MAX_STRING_LENGTH = 64                             # longer strings are no strings but garbage
+
+_START = re.compile(b"[" + b"".join(re.escape(bytes([c])) for c in sorted({*PACKET_LENGTHS, *PACKET_STRINGS})) + b"]")
+
+
+#************************************************************************
+#        P A C K E T  F R A M E R
+#************************************************************************
+# cuts the byte stream received from a display into complete packets,
+# no matter how the reads split or concatenate them.
+# Searching is done with find() and a regex over the buffer, never
+# byte by byte in python. Bytes that do not fit are skipped up to the
+# next possible command byte and counted as resync
+#************************************************************************
+class PacketFramer:
+
+    def __init__(self):
+        self._buf = bytearray()
+        self.packets = 0
+        self.resyncs = 0
+        self.dropped = 0                           # bytes skipped while resyncing
+
+    #************************************************************************
+    # adds received bytes and returns all packets completed by them
+    #************************************************************************
+    # m: data, bytes as read from the port
+    # r: list of complete packets (bytes), each ending with 0x0A
+    #************************************************************************
+    def feed(self, data):
+        buf = self._buf
+        buf += data
+
+        packets = []
+        pos = 0
+        end = len(buf)
+        while pos < end:
+            cmd = buf[pos]
+
+            length = PACKET_LENGTHS.get(cmd)
+            if length is not None:
+                if end - pos < length:
+                    break                          # Rest kommt mit dem nächsten read
+                if buf[pos + length - 1] == 0x0A:
+                    packets.append(bytes(buf[pos:pos + length]))
+                    pos += length
+                    continue
+
+            elif cmd in PACKET_STRINGS:
+                stop = buf.find(b"\n", pos + 1, pos + MAX_STRING_LENGTH)
+                if stop >= 0:
+                    packets.append(bytes(buf[pos:stop + 1]))
+                    pos = stop + 1
+                    continue
+                if end - pos < MAX_STRING_LENGTH:
+                    break                          # Rest kommt mit dem nächsten read
+
+            # kein gültiges Paket an dieser Stelle: bis zum nächsten möglichen Kommando-Byte überspringen
+            match = _START.search(buf, pos + 1)
+            skip_to = match.start() if match else end
+            _LOGGER.debug(f"resync, skipping {skip_to - pos} bytes: {bytes(buf[pos:skip_to]).hex(' ')}")
+            self.resyncs += 1
+            self.dropped += skip_to - pos
+            pos = skip_to
+
+        del buf[:pos]
+        self.packets += len(packets)
+
+        return packets
+
+    def reset(self):
+        self._buf.clear()
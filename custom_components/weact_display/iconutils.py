@@ -7,6 +7,7 @@ import math
 import logging
 from svgpathtools import parse_path
 import custom_components.weact_display.const as const
+from .render import async_render_job
 from typing import Tuple, Optional, List, Dict
 import xml.etree.ElementTree as ET
 from picosvg.svg import SVG
@@ -98,6 +99,14 @@ async def load_icon(hass, i_name: str, i_size = 32, i_color = (255, 255, 255), r
     tree = await loop.run_in_executor(None, _read)
     root = tree.getroot()
 
+    # Rastern in den Render-Executor, nicht auf dem Event-Loop
+    return await async_render_job(hass, _rasterize_icon, root, i_size, i_color, rotation)
+
+
+#************************************************************************
+# rasterizes the paths of a parsed SVG into an RGBA image of i_size
+#************************************************************************
+def _rasterize_icon(root, i_size, i_color, rotation):
     # collect viewBox to scale correctly
     minx, miny, vbw, vbh = _parse_viewbox(root)
 
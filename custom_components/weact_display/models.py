@@ -1,15 +1,19 @@
 # describes the supported and known models from WeAct Studio
 # width and height are proposed in landscape mode
+# rheinturm_budget: bytes per second tick of the rheinturm, the worst
+# case (hour rollover, both orientations) plus a margin, more is logged
 
 DISPLAY_MODELS = {
     "FS 0.96 Inch": {
         "large": 160,
         "small": 80,
         "humiture": False,
+        "rheinturm_budget": 3200,
     },
     "FS V1": {
         "large": 480,
         "small": 320,
         "humiture": True,
+        "rheinturm_budget": 384,
     }
 }
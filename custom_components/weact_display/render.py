@@ -0,0 +1,101 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import custom_components.weact_display.const as const
+
+_LOGGER = logging.getLogger(__name__)
+
+
+#************************************************************************
+#        R E N D E R
+#************************************************************************
+# runs a drawing job for the shadow image of a display in the render
+# executor of the integration instead of on the event loop.
+#
+# jobs of one display run one after the other (render_lock), jobs of
+# different displays run in parallel up to const.RENDER_WORKERS.
+# The flush loop takes its snapshot under the same lock, so it never
+# copies a half-drawn shadow image
+#************************************************************************
+# m: hass
+# m: serial_number
+# m: func, called as func(*args) in a worker thread
+# r: return value of func
+#************************************************************************
+async def async_render(hass, serial_number, func, *args):
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+
+    async with device["render_lock"]:
+        start = time.monotonic()
+        result = await async_render_job(hass, func, *args)
+        elapsed = time.monotonic() - start
+
+    device["render_ms"] = round(elapsed * 1000, 1)
+    device["render_max_ms"] = max(device["render_ms"], device.get("render_max_ms", 0))
+
+    return result
+
+
+#************************************************************************
+# runs a job that does not touch any shadow image (e.g. rasterizing an
+# icon) in the render executor, without waiting for a display
+#************************************************************************
+async def async_render_job(hass, func, *args):
+    return await hass.loop.run_in_executor(_get_executor(hass), func, *args)
+
+
+def _get_executor(hass):
+    domain_data = hass.data[const.DOMAIN]
+
+    executor = domain_data.get("render_executor")
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers = const.RENDER_WORKERS, thread_name_prefix = "weact_render")
+        domain_data["render_executor"] = executor
+    return executor
+
+
+#************************************************************************
+# stops the render executor, running jobs are finished in their threads
+#************************************************************************
+def shutdown_render_executor(hass):
+    executor = hass.data[const.DOMAIN].pop("render_executor", None)
+    if executor is not None:
+        executor.shutdown(wait = False)
+
+
+#************************************************************************
+#        L O O P  M O N I T O R
+#************************************************************************
+# measures how long the event loop is blocked: a timer asks to be called
+# every const.LOOP_MONITOR_INTERVAL seconds, the delay it is actually
+# called with is the time the loop was busy with something else.
+# The last and the largest delay go into hass.data[DOMAIN]
+#************************************************************************
+# m: hass
+# r: function to stop the monitor
+#************************************************************************
+def start_loop_monitor(hass):
+    domain_data = hass.data[const.DOMAIN]
+    loop = hass.loop
+    handle = None
+
+    def _tick(expected):
+        nonlocal handle
+        lag = max(0.0, loop.time() - expected)
+        domain_data["loop_lag_ms"] = round(lag * 1000, 1)
+        domain_data["loop_lag_max_ms"] = max(domain_data["loop_lag_ms"], domain_data.get("loop_lag_max_ms", 0))
+        if lag > const.LOOP_LAG_WARNING:
+            _LOGGER.debug(f"event loop was blocked for {lag * 1000:.0f} ms")
+
+        expected = loop.time() + const.LOOP_MONITOR_INTERVAL
+        handle = loop.call_at(expected, _tick, expected)
+
+    def _stop():
+        if handle is not None:
+            handle.cancel()
+
+    expected = loop.time() + const.LOOP_MONITOR_INTERVAL
+    handle = loop.call_at(expected, _tick, expected)
+
+    return _stop
@@ -1,7 +1,7 @@
 from homeassistant.components.select import SelectEntity
 from homeassistant.helpers.entity import DeviceInfo
 from .commands import set_orientation
-from .clock import stop_clock, start_analog_clock, start_digital_clock
+from .clock import stop_clock, start_analog_clock, start_digital_clock, start_rheinturm
 import custom_components.weact_display.const as const
 import logging
 
@@ -62,7 +62,7 @@ class Select_Orientation(SelectEntity):
 class Select_ClockMode(SelectEntity):
     _attr_has_entity_name = True
     _attr_name = "Clock Mode"
-    _attr_options = ["idle", "digital", "analog"]
+    _attr_options = ["idle", "digital", "analog", "rheinturm"]
 
     def __init__(self, hass, serial_number):
         self.serial_number = serial_number
@@ -81,7 +81,7 @@ class Select_ClockMode(SelectEntity):
         elif option == "digital":
             await start_digital_clock(self.hass, self.serial_number)
         elif option == "rheinturm":
-            start_rheinturm(self.hass, self.serial_number)
+            await start_rheinturm(self.hass, self.serial_number)
         elif option == "idle":
             await stop_clock(self.hass, self.serial_number)
 
@@ -163,6 +163,28 @@ class WeActDisplaySensor(SensorEntity):
             attr["dbg_orientation_value"]    = data.get("orientation_value")
             attr["dbg_humiture"]             = data.get("humiture")
             attr["dbg_fastlz"]               = data.get("fastlz")
+            attr["dbg_tiles_total"]          = data.get("tiles_total")
+            attr["dbg_tiles_skipped"]        = data.get("tiles_skipped")
+            attr["dbg_tiles_filled"]         = data.get("tiles_filled")
+            attr["dbg_frames_sent"]          = data.get("frames_sent")
+            attr["dbg_frames_coalesced"]     = data.get("frames_coalesced")
+            attr["dbg_stripes_cancelled"]    = data.get("stripes_cancelled")
+            attr["dbg_rx_packets"]           = data.get("rx_packets")
+            attr["dbg_rx_resyncs"]           = data.get("rx_resyncs")
+            attr["dbg_query_timeouts"]       = data.get("query_timeouts")
+            attr["dbg_render_ms"]            = data.get("render_ms")
+            attr["dbg_render_max_ms"]        = data.get("render_max_ms")
+            attr["dbg_widget_coalesced"]     = data.get("widget_coalesced")
+            attr["dbg_rheinturm_bytes"]      = data.get("rheinturm_bytes")
+            attr["dbg_loop_lag_ms"]          = self._hass.data[const.DOMAIN].get("loop_lag_ms")
+            attr["dbg_loop_lag_max_ms"]      = self._hass.data[const.DOMAIN].get("loop_lag_max_ms")
+            transport = data.get("transport")
+            if transport:
+                attr["dbg_queue_depth"]      = transport.queue_depth
+                attr["dbg_wait_control_ms"]  = round(transport.wait_last.get(const.PRIORITY_CONTROL, 0) * 1000)
+                attr["dbg_wait_control_max_ms"] = round(transport.wait_max.get(const.PRIORITY_CONTROL, 0) * 1000)
+                attr["dbg_wait_bulk_ms"]     = round(transport.wait_last.get(const.PRIORITY_BULK, 0) * 1000)
+                attr["dbg_wait_bulk_max_ms"] = round(transport.wait_max.get(const.PRIORITY_BULK, 0) * 1000)
             attr["dbg_entry_id"]             = data.get("entry_id")
             attr["dbg_device_id"]            = data.get("device_id")
             attr["dbg_start_time"]           = data.get("start_time")
@@ -0,0 +1,534 @@
+import logging
+
+from PIL import Image, ImageChops, ImageDraw
+
+import custom_components.weact_display.const as const
+from .encoder import encode_rgb565
+
+_LOGGER = logging.getLogger(__name__)
+
+
+#************************************************************************
+#        S H A D O W  I M A G E
+#************************************************************************
+# holds the RGB888 shadow image of a display and remembers which
+# rectangles have been touched since the last transmission
+#
+# the image is composited from named layers (const.SHADOW_LAYERS, lowest
+# first), each an RGBA raster with its own dirty regions. Drawing goes
+# into a layer, composite() rebuilds only the regions changed in any
+# layer from all layers, so removing e.g. the clock shows again what is
+# below it in the layers underneath
+#
+# coordinates given to mark_dirty() are inclusive, like ImageDraw uses them,
+# boxes returned by pop_dirty() are exclusive at the end (xs, ys, xe, ye),
+# like send_bitmap() expects them
+#
+# additionally it keeps a copy of what is on the panel once all frames
+# handed out have been transmitted (sent), so unchanged tiles of a dirty
+# region can be skipped and changed tiles of one single color can be
+# filled instead of uploaded
+#
+# snapshot() hands out the dirty state as a ShadowFrame, drawing goes on
+# in the layers meanwhile. The RGB565 mirror is double-buffered: the two
+# buffers are used by the frames in turn and each one is only encoded
+# for the regions that changed since it was used last
+#************************************************************************
+class ShadowImage:
+
+    def __init__(self, width, height, color = (0, 0, 0)):
+        self.image = Image.new("RGB", (width, height), color)          # Ergebnis aller Ebenen
+        self.sent = None                                       # None = panel content unknown
+        self._layers = {name: Image.new("RGBA", (width, height), (0, 0, 0, 0)) for name in const.SHADOW_LAYERS}
+        self._layers[const.LAYER_BACKGROUND].paste(tuple(color) + (255,), (0, 0, width, height))      # unterste Ebene ist deckend
+        self._layer_dirty = {name: [] for name in const.SHADOW_LAYERS}
+        self._dirty = []                                       # composited, waiting for the next frame
+        self._mirrors = [bytearray(width * height * 2), bytearray(width * height * 2)]
+        self._stale = [[(0, 0, width, height)], [(0, 0, width, height)]]       # noch nicht in den Spiegel kodiert
+        self._next_mirror = 0
+        self._frames = {}                                      # seq -> boxes of frames not yet transmitted
+        self._seq = 0
+
+    @property
+    def size(self):
+        return self.image.size
+
+    @property
+    def width(self):
+        return self.image.width
+
+    @property
+    def height(self):
+        return self.image.height
+
+    @property
+    def has_dirty(self) -> bool:
+        return bool(self._dirty) or any(self._layer_dirty.values())
+
+    def layer(self, layer = const.LAYER_CONTENT):
+        return self._layers[layer]
+
+    def draw(self, layer = const.LAYER_CONTENT):
+        return ImageDraw.Draw(self._layers[layer])
+
+    #************************************************************************
+    # marks a rectangle of a layer as changed, coordinates are inclusive
+    # and may be given in any order or exceed the image, they are clipped
+    #************************************************************************
+    def mark_dirty(self, xs, ys, xe, ye, layer = const.LAYER_CONTENT):
+        box = self._clip(xs, ys, xe, ye)
+        if box is None:
+            _LOGGER.debug(f"dirty box ({xs}, {ys}, {xe}, {ye}) is outside of the image, ignoring")
+            return
+
+        self._layer_dirty[layer].append(box)
+
+    def _clip(self, xs, ys, xe, ye):
+        x0 = max(0, int(min(xs, xe)))
+        y0 = max(0, int(min(ys, ye)))
+        x1 = min(self.image.width, int(max(xs, xe)) + 1)
+        y1 = min(self.image.height, int(max(ys, ye)) + 1)
+
+        if x0 >= x1 or y0 >= y1:
+            return None
+        return (x0, y0, x1, y1)
+
+    #************************************************************************
+    # sends the whole composited image with the next frame
+    #************************************************************************
+    def mark_all(self):
+        self._dirty = [(0, 0, self.image.width, self.image.height)]
+
+    def paste(self, img, xy, mask = None, layer = const.LAYER_CONTENT):
+        xs, ys = xy
+        self._layers[layer].paste(img, (xs, ys), mask)
+        self.mark_dirty(xs, ys, xs + img.width - 1, ys + img.height - 1, layer)
+
+    #************************************************************************
+    # makes a layer transparent again, only the area it covered is
+    # composited anew. The lowest layer is filled with the given color
+    #************************************************************************
+    def clear_layer(self, layer, color = (0, 0, 0)):
+        img = self._layers[layer]
+
+        if layer == const.LAYER_BACKGROUND:
+            img.paste(tuple(color) + (255,), (0, 0, img.width, img.height))
+            self._layer_dirty[layer].append((0, 0, img.width, img.height))
+            return
+
+        bbox = img.getchannel("A").getbbox()
+        if bbox is None:
+            return                                             # war schon leer
+        img.paste((0, 0, 0, 0), bbox)
+        self._layer_dirty[layer].append(bbox)
+
+    #************************************************************************
+    # rotates all layers (expand), the panel content is unknown afterwards
+    #************************************************************************
+    def rotate(self, angle):
+        for name, img in self._layers.items():
+            self._layers[name] = img.rotate(angle, expand = True)
+            self._layer_dirty[name] = []
+
+        width, height = self._layers[const.LAYER_BACKGROUND].size
+        if (width, height) != self.image.size:
+            self._mirrors = [bytearray(width * height * 2), bytearray(width * height * 2)]
+            self.image = Image.new("RGB", (width, height))
+        self._stale = [[(0, 0, width, height)], [(0, 0, width, height)]]
+        self._layer_dirty[const.LAYER_BACKGROUND].append((0, 0, width, height))
+        self.forget_sent()
+
+    #************************************************************************
+    # rebuilds the regions changed in any layer from all layers and hands
+    # them over to the next frame. Runs in the render executor
+    #************************************************************************
+    # r: merged boxes composited, end exclusive
+    #************************************************************************
+    def composite(self):
+        width, height = self.image.size
+        changed = []
+        for name in const.SHADOW_LAYERS:
+            changed.extend(self._layer_dirty[name])
+            self._layer_dirty[name] = []
+
+        boxes = merge_boxes(changed, width, height)
+        for box in boxes:
+            result = self._layers[const.LAYER_BACKGROUND].crop(box)
+            for name in const.SHADOW_LAYERS[1:]:
+                result.alpha_composite(self._layers[name].crop(box))
+            self.image.paste(result.convert("RGB"), box[:2])
+
+        self._dirty.extend(boxes)
+        return boxes
+
+    #************************************************************************
+    # the panel shows something we did not send from here (full color,
+    # random pixels, init screen, rotation). Tiles can no longer be
+    # compared until a frame covers the whole screen again, callers that
+    # replaced the whole panel content mark_all() as well
+    #************************************************************************
+    def forget_sent(self):
+        self.sent = None
+
+    #************************************************************************
+    # True if newer drawings than the given frame cover the given box
+    # (end exclusive) completely, so its content is outdated. Newer are the
+    # dirty regions collected so far (composited or not) and the frames
+    # handed out later
+    #************************************************************************
+    def covered(self, box, after = 0):
+        xs, ys, xe, ye = box
+        newer = list(self._dirty)
+        for boxes in list(self._layer_dirty.values()):
+            newer.extend(boxes)                                # noch nicht zusammengesetzt, aber schon gezeichnet
+        for seq, boxes in list(self._frames.items()):
+            if seq > after:
+                newer.extend(boxes)
+
+        clipped = [
+            (max(xs, b[0]), max(ys, b[1]), min(xe, b[2]), min(ye, b[3]))
+            for b in newer
+            if b[0] < xe and b[2] > xs and b[1] < ye and b[3] > ys
+        ]
+        return _union_area(clipped) >= _area(box)
+
+    #************************************************************************
+    # returns the merged dirty rectangles and forgets them
+    #************************************************************************
+    def pop_dirty(self):
+        boxes = merge_boxes(self._dirty, self.image.width, self.image.height)
+        self._dirty = []
+        for stale in self._stale:
+            stale.extend(boxes)
+        return boxes
+
+    #************************************************************************
+    # takes the dirty regions and a copy of the image as a new frame,
+    # None if nothing changed. The frame has to be prepared (in a worker),
+    # committed and finally released with done()
+    #************************************************************************
+    def snapshot(self):
+        boxes = self.pop_dirty()
+        if not boxes:
+            return None
+
+        width, height = self.image.size
+        mirror = self._next_mirror
+        self._next_mirror ^= 1
+        stale = merge_boxes(self._stale[mirror], width, height)
+        self._stale[mirror] = []
+
+        self._seq += 1
+        frame = ShadowFrame(
+            self._seq,
+            boxes,
+            self.image.copy(),
+            self.sent.copy() if self.sent is not None else None,
+            self._mirrors[mirror],
+            stale,
+        )
+        self._frames[frame.seq] = boxes
+        return frame
+
+    #************************************************************************
+    # takes over the content of a prepared frame as panel content, before
+    # it is transmitted, so the next frame is compared against it.
+    # What was there before is kept to undo cancelled parts
+    #************************************************************************
+    def commit(self, frame):
+        boxes = [box for box, color in frame.fills] + frame.regions
+        width, height = self.image.size
+
+        if self.sent is None:
+            # nur ein Frame über den ganzen Bildschirm macht den Panelinhalt bekannt
+            if _union_area(boxes) >= width * height:
+                self.sent = frame.image.copy()
+            return
+
+        frame.previous = {box: self.sent.crop(box) for box in boxes}
+        for box in boxes:
+            self.sent.paste(frame.image.crop(box), box[:2])
+
+    #************************************************************************
+    # part of a region or fill (end exclusive) of a committed frame did not go out,
+    # the panel still shows the content from before. It is sent again
+    # from the current image with the next frame
+    #************************************************************************
+    def cancel(self, frame, region, box):
+        xs, ys, xe, ye = box
+        previous = frame.previous.get(region) if frame.previous else None
+        if previous is None:
+            self.forget_sent()                                 # Frame hat den Panelinhalt erst bekannt gemacht
+        elif self.sent is not None:
+            self.sent.paste(previous.crop((xs - region[0], ys - region[1], xe - region[0], ye - region[1])), (xs, ys))
+        self._dirty.append(box)                                # Bild ist schon zusammengesetzt
+
+    #************************************************************************
+    # a transfer failed, nobody knows what the panel shows now
+    #************************************************************************
+    def fail(self, frame):
+        width, height = self.image.size
+        self._stale = [[(0, 0, width, height)], [(0, 0, width, height)]]
+        self.forget_sent()
+        self.mark_all()
+
+    def done(self, frame):
+        self._frames.pop(frame.seq, None)
+
+
+#************************************************************************
+#        S H A D O W  F R A M E
+#************************************************************************
+# one snapshot of the shadow image on its way to the panel.
+# prepare() does the expensive part and touches nothing but the frame
+# itself, so it runs in a worker while the previous frame is on the wire
+#************************************************************************
+class ShadowFrame:
+
+    def __init__(self, seq, boxes, image, sent, buffer565, stale):
+        self.seq = seq
+        self.boxes = boxes                                     # dirty regions, end exclusive
+        self.image = image                                     # copy of the shadow image
+        self.sent = sent                                       # copy of the panel content to compare with
+        self.buffer565 = buffer565
+        self.stale = stale                                     # regions to encode into buffer565
+        self.previous = None
+        self.fills = []
+        self.regions = []
+        self.tiles_total = 0
+        self.tiles_skipped = 0
+        self.tiles_filled = 0
+
+    #************************************************************************
+    # brings the RGB565 mirror up to date and finds the changed tiles,
+    # single-color tiles as fills, the rest as regions
+    #************************************************************************
+    def prepare(self):
+        _encode565(self.image, self.buffer565, self.stale)
+        self.fills, self.regions, checked, changed, bitmap = _changed_regions(self.image, self.sent, self.boxes)
+        self.tiles_total = checked
+        self.tiles_skipped = checked - changed
+        self.tiles_filled = changed - bitmap
+        self.sent = None                                       # nicht mehr gebraucht
+        return self
+
+    #************************************************************************
+    # returns the RGB565 data of a box (end exclusive) from the mirror,
+    # full-width boxes are a zero-copy view, otherwise the rows are joined
+    #************************************************************************
+    def region565(self, box):
+        xs, ys, xe, ye = box
+        stride = self.image.width * 2
+        view = memoryview(self.buffer565)
+
+        if xs == 0 and xe == self.image.width:
+            return view[ys * stride:ye * stride]
+
+        row = (xe - xs) * 2
+        return b"".join(view[y * stride + xs * 2:y * stride + xs * 2 + row] for y in range(ys, ye))
+
+
+#************************************************************************
+# encodes the given boxes of the image into the RGB565 buffer
+#************************************************************************
+def _encode565(image, buffer565, boxes):
+    stride = image.width * 2
+    for xs, ys, xe, ye in boxes:
+        data = encode_rgb565(image.crop((xs, ys, xe, ye)).tobytes(), xe - xs, ye - ys)
+        if xs == 0 and xe == image.width:
+            buffer565[ys * stride:ye * stride] = data
+            continue
+
+        row = (xe - xs) * 2
+        for y in range(ys, ye):
+            start = y * stride + xs * 2
+            offset = (y - ys) * row
+            buffer565[start:start + row] = data[offset:offset + row]
+
+
+#************************************************************************
+# compares the given boxes tile by tile with the panel content and
+# returns the rectangles made of tiles that really changed.
+# Changed tiles of one single color are returned separately, per color,
+# so they can be sent as CMD_FULL instead of bitmap data. So are the
+# changed pixels of a tile if they form a rectangle of one color
+#************************************************************************
+# m: image, the new content
+# m: sent, the panel content, None if unknown
+# m: boxes, list of (xs, ys, xe, ye), end exclusive
+# r: fills, list of ((xs, ys, xe, ye), (r, g, b))
+# r: regions, list of (xs, ys, xe, ye) to send as bitmap
+# r: number of tiles checked, changed and changed but not single-colored
+#************************************************************************
+def _changed_regions(image, sent, boxes):
+    width, height = image.size
+    tile = const.TILE_SIZE
+
+    changed = {}                                               # Kachel -> Rechteck der geänderten Pixel darin
+    checked = set()
+    for xs, ys, xe, ye in boxes:
+        tx0, ty0 = xs // tile, ys // tile
+        tx1, ty1 = (xe - 1) // tile, (ye - 1) // tile
+        tiles = [(tx, ty) for ty in range(ty0, ty1 + 1) for tx in range(tx0, tx1 + 1) if (tx, ty) not in checked]
+        checked.update(tiles)
+
+        if sent is None:
+            for tx, ty in tiles:
+                changed[(tx, ty)] = (tx * tile, ty * tile, min((tx + 1) * tile, width), min((ty + 1) * tile, height))
+            continue
+
+        # ganzen Bereich in einem Rutsch vergleichen, dann nur noch die Kacheln innerhalb der Differenz
+        aligned = (tx0 * tile, ty0 * tile, min((tx1 + 1) * tile, width), min((ty1 + 1) * tile, height))
+        diff = ImageChops.difference(image.crop(aligned), sent.crop(aligned))
+        bbox = diff.getbbox()
+        if bbox is None:
+            continue
+
+        for tx, ty in tiles:
+            x0 = tx * tile - aligned[0]
+            y0 = ty * tile - aligned[1]
+            x1 = x0 + tile
+            y1 = y0 + tile
+            if x1 <= bbox[0] or y1 <= bbox[1] or x0 >= bbox[2] or y0 >= bbox[3]:
+                continue
+            part = diff.crop((x0, y0, x1, y1)).getbbox()
+            if part is not None:
+                ox, oy = aligned[0] + x0, aligned[1] + y0
+                changed[(tx, ty)] = (ox + part[0], oy + part[1], ox + part[2], oy + part[3])
+
+    # einfarbige Kacheln nach Farbe sammeln, ist nur der geänderte Teil einer Kachel einfarbig
+    # (z.B. eine Lampe der Rheinturm-Uhr), wird nur dieser gefüllt. Der Rest geht als Bitmap
+    uniform = {}
+    partial = []
+    bitmap = set()
+    for (tx, ty), part in changed.items():
+        box = (tx * tile, ty * tile, min((tx + 1) * tile, width), min((ty + 1) * tile, height))
+        extrema = image.crop(box).getextrema()
+        if all(lo == hi for lo, hi in extrema):
+            uniform.setdefault(tuple(lo for lo, hi in extrema), set()).add((tx, ty))
+            continue
+
+        extrema = image.crop(part).getextrema()
+        if part != box and all(lo == hi for lo, hi in extrema):
+            partial.append((part, tuple(lo for lo, hi in extrema)))
+        else:
+            bitmap.add((tx, ty))
+
+    fills = [
+        (box, color)
+        for color, tiles in uniform.items()
+        for box in _tiles_to_boxes(tiles, tile, width, height)
+    ] + partial
+    regions = merge_boxes(_tiles_to_boxes(bitmap, tile, width, height), width, height)
+
+    return fills, regions, len(checked), len(changed), len(bitmap)
+
+
+#************************************************************************
+# joins changed tiles into rectangles: first horizontal runs per tile row,
+# then runs with the same columns in consecutive rows
+#************************************************************************
+def _tiles_to_boxes(tiles, tile, width, height):
+    rows = {}
+    for tx, ty in tiles:
+        rows.setdefault(ty, []).append(tx)
+
+    open_runs = {}                                             # (tx_start, tx_end) -> (ty_start, ty_end)
+    done = []
+    for ty in sorted(rows):
+        runs = []
+        txs = sorted(rows[ty])
+        start = prev = txs[0]
+        for tx in txs[1:]:
+            if tx != prev + 1:
+                runs.append((start, prev))
+                start = tx
+            prev = tx
+        runs.append((start, prev))
+
+        still_open = {}
+        for run in runs:
+            span = open_runs.pop(run, None)
+            if span is not None and span[1] == ty - 1:
+                still_open[run] = (span[0], ty)
+            else:
+                if span is not None:
+                    done.append((run, span))
+                still_open[run] = (ty, ty)
+        done.extend(open_runs.items())
+        open_runs = still_open
+    done.extend(open_runs.items())
+
+    return [
+        (tx0 * tile, ty0 * tile, min((tx1 + 1) * tile, width), min((ty1 + 1) * tile, height))
+        for (tx0, tx1), (ty0, ty1) in done
+    ]
+
+
+def _area(box):
+    return (box[2] - box[0]) * (box[3] - box[1])
+
+
+def _union(a, b):
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+#************************************************************************
+# area covered by overlapping rectangles, via coordinate compression
+#************************************************************************
+def _union_area(boxes):
+    if not boxes:
+        return 0
+
+    xs = sorted({x for b in boxes for x in (b[0], b[2])})
+    area = 0
+    for x0, x1 in zip(xs, xs[1:]):
+        spans = sorted((b[1], b[3]) for b in boxes if b[0] <= x0 and b[2] >= x1)
+        covered = 0
+        top = None
+        for y0, y1 in spans:
+            if top is None or y0 > top:
+                covered += y1 - y0
+                top = y1
+            elif y1 > top:
+                covered += y1 - top
+                top = y1
+        area += covered * (x1 - x0)
+    return area
+
+
+#************************************************************************
+#        M E R G E  B O X E S
+#************************************************************************
+# merges overlapping or nearby rectangles as long as the union does not
+# transmit much more pixels than the single rectangles would do.
+# If most of the screen is dirty anyway, the whole screen is returned
+#************************************************************************
+# m: boxes, list of (xs, ys, xe, ye), end exclusive
+# m: width of the image
+# m: height of the image
+# r: merged list of boxes
+#************************************************************************
+def merge_boxes(boxes, width, height):
+    boxes = list(dict.fromkeys(boxes))                        # doppelte raus, Reihenfolge bleibt
+    if not boxes:
+        return []
+
+    merged = True
+    while merged and len(boxes) > 1:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                union = _union(boxes[i], boxes[j])
+                if _area(union) <= _area(boxes[i]) + _area(boxes[j]) + const.DIRTY_MERGE_SLACK_PX:
+                    boxes[i] = union
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+
+    if sum(_area(b) for b in boxes) >= width * height * const.DIRTY_FULL_SCREEN_RATIO:
+        return [(0, 0, width, height)]
+
+    return boxes
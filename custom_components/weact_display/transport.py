@@ -0,0 +1,246 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+
+import custom_components.weact_display.const as const
+
+_LOGGER = logging.getLogger(__name__)
+
+
+#************************************************************************
+#        S E R I A L  T R A N S P O R T
+#************************************************************************
+# both directions of one display on the event loop, no threads:
+# the fd of the opened serial port is switched to non-blocking and
+# watched with loop.add_reader() / loop.add_writer()
+#
+# outgoing data is written directly as long as the kernel takes it, the
+# rest waits in an output buffer until the fd becomes writable again.
+# Senders wait while the buffer is above the high-water mark
+#
+# a frame is a list of segments (data, pause): consecutive segments
+# without pause go into the buffer in one go, after a segment with pause
+# the buffer is drained completely and the sender sleeps for that many
+# seconds. Frames never interleave with each other
+#
+# frames are scheduled by priority (const.PRIORITY_*, lower first) and
+# in order of arrival within one priority. A frame is always written
+# completely, so control commands get in between the stripes of a
+# bitmap (see send_bitmap_565), never in the middle of one
+#************************************************************************
+class SerialTransport:
+
+    def __init__(self, hass, serial_number, serial_port, on_data, on_lost = None):
+        self._hass = hass
+        self._loop = hass.loop
+        self._serial_number = serial_number
+        self._serial_port = serial_port
+        self._on_data = on_data                                # called with every chunk read
+        self._on_lost = on_lost                                # called once if the port is gone
+        self._fd = None
+        self._out = bytearray()
+        self._writing = False                                  # add_writer() active
+        self._busy = False                                     # a frame is being written
+        self._waiting = []                                     # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self.wait_last = {}                                    # priority -> seconds the last frame waited
+        self.wait_max = {}                                     # priority -> longest wait so far
+        self._can_write = asyncio.Event()                      # buffer below high-water mark
+        self._drained = asyncio.Event()                        # buffer empty
+        self._can_write.set()
+        self._drained.set()
+        self._running = False
+        self.bytes_written = 0
+        self.bytes_read = 0
+
+    @property
+    def buffered(self) -> int:
+        return len(self._out)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiting)
+
+    def start(self):
+        _LOGGER.debug(f"starting serial transport for serial {self._serial_number}")
+        self._fd = self._serial_port.fileno()
+        os.set_blocking(self._fd, False)
+        self._loop.add_reader(self._fd, self._read_ready)
+        self._running = True
+
+    #************************************************************************
+    # stops watching the fd, wakes up all waiting senders and closes the port
+    #************************************************************************
+    async def async_stop(self):
+        if not self._running:
+            return
+        self._close()
+        _LOGGER.debug(f"serial transport for serial {self._serial_number} stopped")
+
+    #************************************************************************
+    # writes one frame and waits until it is handed over to the kernel
+    #************************************************************************
+    # m: segments, list of (bytes, pause in seconds)
+    # o: priority, default = const.PRIORITY_BULK
+    # r: True if written, False if any error occured
+    #************************************************************************
+    async def async_send(self, segments, priority = const.PRIORITY_BULK) -> bool:
+        if not self._running:
+            _LOGGER.warning(f"transport for serial {self._serial_number} is not running, dropping frame")
+            return False
+
+        await self._acquire(priority)
+        try:
+            for data, pause in segments:
+                if not await self._write(data):
+                    return False
+                if pause:
+                    if not await self._drain(full = True):
+                        return False
+                    await asyncio.sleep(pause)
+
+            return await self._drain(full = True)
+        finally:
+            self._release()
+
+    #************************************************************************
+    # writes one command packet before all bulk frames waiting
+    #************************************************************************
+    # m: packet, bytes
+    # o: priority, default = const.PRIORITY_CONTROL
+    # r: True if written, False if any error occured
+    #************************************************************************
+    async def async_write(self, packet, priority = const.PRIORITY_CONTROL) -> bool:
+        return await self.async_send([(packet, 0)], priority)
+
+    async def _acquire(self, priority):
+        start = time.monotonic()
+        if self._busy or self._waiting:
+            future = self._loop.create_future()
+            entry = (priority, next(self._seq), future)
+            heapq.heappush(self._waiting, entry)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self._release()                            # war schon dran, weitergeben
+                else:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                raise
+        self._busy = True
+
+        waited = time.monotonic() - start
+        self.wait_last[priority] = waited
+        self.wait_max[priority] = max(waited, self.wait_max.get(priority, 0))
+
+    def _release(self):
+        self._busy = False
+        while self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                self._busy = True                              # direkt übergeben, niemand kann sich vordrängeln
+                future.set_result(None)
+                return
+
+    async def _write(self, data) -> bool:
+        if not await self._drain():
+            return False
+
+        data = memoryview(data)
+        if not self._out:
+            # Puffer leer: direkt schreiben, so viel der Kernel nimmt
+            try:
+                n = os.write(self._fd, data)
+            except (BlockingIOError, InterruptedError):
+                n = 0
+            except OSError as e:
+                self._connection_lost(e)
+                return False
+            self.bytes_written += n
+            data = data[n:]
+
+        if data:
+            self._out += data
+            self._drained.clear()
+            if len(self._out) > const.TRANSPORT_HIGH_WATER:
+                self._can_write.clear()
+            if not self._writing:
+                self._loop.add_writer(self._fd, self._write_ready)
+                self._writing = True
+
+        return True
+
+    async def _drain(self, full = False) -> bool:
+        await (self._drained.wait() if full else self._can_write.wait())
+        return self._running
+
+    def _write_ready(self):
+        try:
+            n = os.write(self._fd, self._out)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            self._connection_lost(e)
+            return
+
+        self.bytes_written += n
+        del self._out[:n]
+
+        if len(self._out) <= const.TRANSPORT_LOW_WATER:
+            self._can_write.set()
+        if not self._out:
+            self._loop.remove_writer(self._fd)
+            self._writing = False
+            self._drained.set()
+
+    def _read_ready(self):
+        try:
+            data = os.read(self._fd, const.TRANSPORT_READ_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            self._connection_lost(e)
+            return
+
+        if not data:
+            self._connection_lost(None)                        # EOF, Gerät abgezogen
+            return
+
+        self.bytes_read += len(data)
+        try:
+            self._on_data(data)
+        except Exception as e:
+            _LOGGER.error(f"error while handling received data for serial {self._serial_number}: {e}")
+
+    def _connection_lost(self, exc):
+        _LOGGER.warning(f"WeAct Display {self._serial_number} disconnected: {exc}")
+        self._close()
+        if self._on_lost:
+            self._on_lost(exc)
+
+    def _close(self):
+        if not self._running:
+            return
+        self._running = False
+        self._loop.remove_reader(self._fd)
+        if self._writing:
+            self._loop.remove_writer(self._fd)
+            self._writing = False
+        self._out.clear()
+
+        # wartende Sender aufwecken, sie sehen _running == False
+        self._can_write.set()
+        self._drained.set()
+        for _, _, future in self._waiting:
+            if not future.done():
+                future.set_result(None)
+        self._waiting.clear()
+
+        try:
+            self._serial_port.close()
+        except Exception as e:
+            _LOGGER.debug(f"error while closing serial port of {self._serial_number}: {e}")
@@ -0,0 +1,585 @@
+import asyncio
+import logging
+import time
+
+from PIL import Image, ImageDraw
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.helpers.storage import Store
+
+import custom_components.weact_display.const as const
+from .fonts import get_font, text_bbox
+from .render import async_render
+
+_LOGGER = logging.getLogger(__name__)
+
+
+#************************************************************************
+#        W I D G E T S
+#************************************************************************
+# a widget is a named rectangle of a display with a renderer (text,
+# progress bar, icon), its style options and its current value, e.g.
+#   "kitchen_temp": {"type": "text", "box": [0, 0, 79, 19],
+#                    "options": {"font_size": 15}, "value": "21.5 °C"}
+#
+# update_widget only renders the rectangle of that widget into a widget
+# sized image. If the pixels are the same as on the content layer,
+# nothing is marked dirty and nothing is sent.
+#
+# the definitions are stored in the options of the config entry, the
+# last values in a Store of the display (written delayed, at most once
+# every const.WIDGET_SAVE_DELAY seconds). Both are drawn again after a
+# restart. Values of widgets bound to an entity are not stored, they are
+# taken from the state of the entity again
+#
+# a widget bound to an entity (entity_id) takes its value from the state
+# of that entity. State changes are collected per display and drawn
+# together after const.WIDGET_DEBOUNCE seconds, at most once every
+# const.WIDGET_MIN_INTERVAL seconds (latest state wins), so a noisy
+# sensor can not flood the serial link
+#************************************************************************
+
+
+#************************************************************************
+# loads the widget definitions of a display from the entry options and
+# their last values from the store of the display
+#************************************************************************
+# m: hass
+# m: serial_number
+# m: options, entry.options
+#************************************************************************
+async def load_widgets(hass, serial_number, options):
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+
+    store = Store(hass, const.WIDGET_STORE_VERSION, f"{const.DOMAIN}.widgets_{serial_number}")
+    device["widget_store"] = store
+    values = await store.async_load() or {}
+
+    widgets = {}
+    for name, definition in (options.get("widgets") or {}).items():
+        if definition.get("type") not in WIDGET_RENDERERS:
+            _LOGGER.warning(f"stored widget {name} of {serial_number} has an unknown type {definition.get("type")}, ignoring")
+            continue
+        widgets[name] = {**definition, "options": dict(definition.get("options") or {}), "value": values.get(name)}
+
+    device["widgets"] = widgets
+    _LOGGER.debug(f"loaded {len(widgets)} widgets for {serial_number}: {list(widgets)}")
+
+
+#************************************************************************
+# stores the widget definitions of a display in the entry options, the
+# entry is only updated if a definition changed
+#************************************************************************
+def _save_widgets(hass, serial_number):
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+
+    entry = hass.config_entries.async_get_entry(device.get("entry_id"))
+    if not entry:
+        _LOGGER.error(f"no config entry found for serial {serial_number}, widgets are not stored")
+        return
+
+    widgets = {
+        name: {"type": widget["type"], "box": list(widget["box"]), "options": widget["options"], "entity_id": widget.get("entity_id")}
+        for name, widget in device["widgets"].items()
+    }
+    if widgets == entry.options.get("widgets"):
+        return
+
+    new_options = {
+        **entry.options,
+        "widgets": widgets,
+    }
+    hass.config_entries.async_update_entry(entry, options=new_options)
+
+
+#************************************************************************
+# the values of the widgets not bound to an entity, as kept in the store
+#************************************************************************
+def _widget_values(device):
+    return {name: widget.get("value") for name, widget in device["widgets"].items() if not widget.get("entity_id")}
+
+
+#************************************************************************
+# stores the last values of a display delayed, many updates in a row
+# end up in one write
+#************************************************************************
+def _save_values(hass, serial_number):
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+
+    store = device.get("widget_store")
+    if store is not None:
+        store.async_delay_save(lambda: _widget_values(device), const.WIDGET_SAVE_DELAY)
+
+
+#************************************************************************
+# writes the last values of a display right away, e.g. on unload, so a
+# reload does not read an older state
+#************************************************************************
+async def save_widget_values(hass, serial_number):
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+
+    store = device.get("widget_store")
+    if store is not None:
+        await store.async_save(_widget_values(device))
+
+
+#************************************************************************
+#        R E G I S T E R  W I D G E T
+#************************************************************************
+# defines (or redefines) a widget and draws it with its value
+#************************************************************************
+# m: hass
+# m: serial_number
+# m: name
+# m: w_type, [text|progress_bar|gauge|icon]
+# m: X start
+# m: Y start
+# m: X end
+# m: Y end
+# o: options, style of the renderer (colors, font size, ...)
+# o: value, the first value to show
+# o: entity_id, takes the value from the state of this entity
+#************************************************************************
+async def register_widget(hass, serial_number, name, w_type, xs, ys, xe, ye, options = None, value = None, entity_id = None):
+    _LOGGER.debug(f"registering widget with values given: serial-number={serial_number}, name={name}, type={w_type}, xs={xs}, ys={ys}, xe={xe}, ye={ye}, options={options}, value={value}, entity-id={entity_id}")
+
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+
+    if w_type not in WIDGET_RENDERERS:
+        _LOGGER.error(f"unknown widget type {w_type}, possible types are {list(WIDGET_RENDERERS)}")
+        return
+    if xe < xs or ye < ys:
+        _LOGGER.error(f"widget {name} needs xs <= xe and ys <= ye, got ({xs}, {ys}, {xe}, {ye})")
+        return
+
+    widgets = device["widgets"]
+
+    # alter Platz wird frei, falls das Widget umzieht
+    old = widgets.get(name)
+    if old is not None:
+        _unbind_widget(hass, serial_number, name)
+        if list(old["box"]) != [xs, ys, xe, ye]:
+            await _clear_box(hass, serial_number, old["box"])
+
+    widgets[name] = {
+        "type": w_type,
+        "box": [xs, ys, xe, ye],
+        "options": dict(options or {}),
+        "value": value,
+        "entity_id": entity_id,
+    }
+    _save_widgets(hass, serial_number)
+    _save_values(hass, serial_number)
+
+    if entity_id:
+        _bind_widget(hass, serial_number, name)
+
+    await _render_widget(hass, serial_number, name, force = True)
+    await _flush(hass, serial_number)
+
+
+#************************************************************************
+#        U P D A T E  W I D G E T
+#************************************************************************
+# shows a new value in a widget, only its rectangle is rendered again
+#************************************************************************
+# m: hass
+# m: serial_number
+# m: name
+# m: value, text, number or icon name depending on the widget type
+# o: flush, sends the screen afterwards, default = True
+# r: True if the pixels of the widget changed
+#************************************************************************
+async def update_widget(hass, serial_number, name, value, flush = True):
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+
+    widget = device["widgets"].get(name)
+    if widget is None:
+        _LOGGER.error(f"no widget {name} registered for {serial_number}")
+        return False
+
+    if value == widget.get("value"):
+        _LOGGER.debug(f"widget {name} of {serial_number} already shows {value}, nothing to do")
+        return False
+
+    widget["value"] = value
+    if not widget.get("entity_id"):
+        _save_values(hass, serial_number)                   # nach einem Neustart wieder der letzte Wert
+    changed = await _render_widget(hass, serial_number, name)
+
+    if changed and flush:
+        await _flush(hass, serial_number)
+    return changed
+
+
+#************************************************************************
+#        R E M O V E  W I D G E T
+#************************************************************************
+# forgets a widget and fills its rectangle with the background color
+#************************************************************************
+# m: hass
+# m: serial_number
+# m: name
+#************************************************************************
+async def remove_widget(hass, serial_number, name):
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+
+    if name not in device["widgets"]:
+        _LOGGER.error(f"no widget {name} registered for {serial_number}")
+        return
+
+    _unbind_widget(hass, serial_number, name)
+    widget = device["widgets"].pop(name)
+    _save_widgets(hass, serial_number)
+    _save_values(hass, serial_number)
+
+    await _clear_box(hass, serial_number, widget["box"])
+    await _flush(hass, serial_number)
+
+
+#************************************************************************
+# draws all widgets of a display, e.g. after startup, and sends them
+# with one flush. Widgets bound to an entity start listening to it
+#************************************************************************
+async def draw_widgets(hass, serial_number):
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+
+    for name in list(device["widgets"]):
+        if device["widgets"][name].get("entity_id"):
+            _bind_widget(hass, serial_number, name)
+        await _render_widget(hass, serial_number, name, force = True)
+
+    if device["widgets"]:
+        await _flush(hass, serial_number)
+
+
+#************************************************************************
+# stops listening to all entities of a display, e.g. on unload
+#************************************************************************
+def unbind_widgets(hass, serial_number):
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+
+    for name in list(device.get("widget_unsubs", {})):
+        _unbind_widget(hass, serial_number, name)
+
+    task = device.get("widget_task")
+    if task and not task.done():
+        task.cancel()
+
+
+#************************************************************************
+# listens to the state changes of the entity of a widget, the current
+# state is taken over right away
+#************************************************************************
+def _bind_widget(hass, serial_number, name):
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+    widget = device["widgets"][name]
+    entity_id = widget["entity_id"]
+
+    @callback
+    def _state_changed(event):
+        new_state = event.data.get("new_state")
+        _queue_widget(hass, serial_number, name, _state_value(widget, new_state))
+
+    device.setdefault("widget_unsubs", {})[name] = async_track_state_change_event(hass, [entity_id], _state_changed)
+    widget["value"] = _state_value(widget, hass.states.get(entity_id))
+
+    _LOGGER.debug(f"widget {name} of {serial_number} is bound to {entity_id}, value={widget["value"]}")
+
+
+def _unbind_widget(hass, serial_number, name):
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+
+    unsub = device.get("widget_unsubs", {}).pop(name, None)
+    if unsub:
+        unsub()
+    device.get("widget_pending", {}).pop(name, None)
+
+
+#************************************************************************
+# turns the state of an entity into the value of a widget
+#   text:                 options "format", e.g. "{name}: {state} {unit}"
+#   progress_bar / gauge: the state as number, None if not numeric
+#   icon:                 options "icons" maps states to icons, else
+#                         options "icon" or the icon of the entity
+#************************************************************************
+def _state_value(widget, state):
+    if state is None:
+        return None
+
+    options = widget["options"]
+    attributes = state.attributes
+    w_type = widget["type"]
+
+    if w_type in ("progress_bar", "gauge"):
+        try:
+            return float(state.state)
+        except (TypeError, ValueError):
+            return None
+
+    if w_type == "icon":
+        return (options.get("icons") or {}).get(state.state) or options.get("icon") or attributes.get("icon")
+
+    return options.get("format", "{state} {unit}").format(
+        state = state.state,
+        unit = attributes.get("unit_of_measurement", ""),
+        name = attributes.get("friendly_name", state.entity_id),
+    ).strip()
+
+
+#************************************************************************
+# latest wins: remembers the value of a widget and lets the widget loop
+# of the display draw it with the next batch
+#************************************************************************
+def _queue_widget(hass, serial_number, name, value):
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+
+    pending = device.setdefault("widget_pending", {})
+    if name in pending:
+        device["widget_coalesced"] = device.get("widget_coalesced", 0) + 1
+    pending[name] = value
+
+    task = device.get("widget_task")
+    if task is None or task.done():
+        device["widget_task"] = hass.loop.create_task(_widget_loop(hass, serial_number))
+
+
+#************************************************************************
+# draws the pending widget values of a display as long as new ones arrive,
+# one flush per batch
+#************************************************************************
+async def _widget_loop(hass, serial_number):
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+
+    while device.get("widget_pending"):
+        await asyncio.sleep(const.WIDGET_DEBOUNCE)                      # Sensor zur Ruhe kommen lassen
+
+        # Ratenbegrenzung je Display
+        wait = device.get("widget_flush_time", 0) + const.WIDGET_MIN_INTERVAL - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        pending = device["widget_pending"]
+        device["widget_pending"] = {}
+
+        changed = False
+        for name, value in pending.items():
+            if name not in device["widgets"]:
+                continue
+            try:
+                changed |= await update_widget(hass, serial_number, name, value, flush = False)
+            except Exception as e:
+                _LOGGER.error(f"error while updating widget {name} of {serial_number}: {e}")
+
+        if changed:
+            device["widget_flush_time"] = time.monotonic()
+            await _flush(hass, serial_number)
+
+
+async def _flush(hass, serial_number):
+    from .commands import send_screen
+
+    await send_screen(hass, serial_number)
+
+
+#************************************************************************
+# renders one widget into an image of its size and takes it over into
+# the content layer if any pixel differs
+#************************************************************************
+async def _render_widget(hass, serial_number, name, force = False):
+    from .commands import normalize_color
+    from .iconutils import load_icon
+
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+    widget = device["widgets"][name]
+    xs, ys, xe, ye = widget["box"]
+    options = widget["options"]
+    value = widget.get("value")
+
+    bg_color = normalize_color(options.get("bg_color") or device.get("background_color"))
+
+    # Icons werden vorher geladen und gerastert, das geht nicht im Render-Job
+    icon = None
+    if widget["type"] == "icon" and value:
+        i_size = min(xe - xs + 1, ye - ys + 1)
+        try:
+            icon = await load_icon(hass, i_name = str(value), i_size = i_size, i_color = options.get("icon_color"))
+        except Exception as e:
+            _LOGGER.error(f"could not load icon {value} for widget {name}: {e}")
+
+    renderer = WIDGET_RENDERERS[widget["type"]]
+    shadow = device["shadow"]
+
+    def _draw():
+        img = Image.new("RGBA", (xe - xs + 1, ye - ys + 1), bg_color + (255,))
+        renderer(img, options, value, icon)
+
+        if not force and img.tobytes() == shadow.layer(const.LAYER_CONTENT).crop((xs, ys, xe + 1, ye + 1)).tobytes():
+            return False
+
+        shadow.paste(img, (xs, ys))
+        return True
+
+    changed = await async_render(hass, serial_number, _draw)
+    _LOGGER.debug(f"rendered widget {name} of {serial_number} with value {value}, changed={changed}")
+    return changed
+
+
+async def _clear_box(hass, serial_number, box):
+    from .commands import normalize_color
+
+    device = hass.data[const.DOMAIN]["devices"][serial_number]
+    shadow = device["shadow"]
+    xs, ys, xe, ye = box
+    bg_color = normalize_color(device.get("background_color"))
+
+    def _draw():
+        shadow.draw().rectangle((xs, ys, xe, ye), fill = bg_color)
+        shadow.mark_dirty(xs, ys, xe, ye)
+
+    await async_render(hass, serial_number, _draw)
+
+
+#************************************************************************
+#        R E N D E R E R S
+#************************************************************************
+# draw into img (widget sized, filled with the background color) and run
+# in the render executor
+#************************************************************************
+# m: img
+# m: options
+# m: value
+# m: icon, rasterized icon for icon widgets, else None
+#************************************************************************
+def _render_text(img, options, value, icon):
+    from .commands import normalize_color
+
+    if value is None:
+        return
+
+    t_color = normalize_color(options.get("t_color") or (255, 255, 255))
+    font_size = options.get("font_size", 15)
+    font = get_font(font_size, options.get("font"))
+    text = str(value)
+
+    draw = ImageDraw.Draw(img)
+    xs, ys, xe, ye = text_bbox(text, font_size, options.get("font"))
+
+    align = options.get("align", "left")
+    if align == "center":
+        x = (img.width - (xe - xs)) // 2 - xs
+    elif align == "right":
+        x = img.width - xe
+    else:
+        x = 0
+    y = (img.height - (ye - ys)) // 2 - ys                 # vertikal immer mittig
+
+    draw.text((x, y), text, fill = t_color, font = font)
+
+
+#************************************************************************
+# position of a value between min and max as 0..1, an empty or inverted
+# range (min >= max) shows nothing instead of dividing by zero
+#************************************************************************
+def _ratio(value, min_value, max_value):
+    if max_value <= min_value:
+        return 0.0
+    return (min(max(value, min_value), max_value) - min_value) / (max_value - min_value)
+
+
+def _render_progress_bar(img, options, value, icon):
+    from .commands import normalize_color
+
+    bg_color = img.getpixel((0, 0))                        # img ist mit der Hintergrundfarbe gefüllt
+    b_color = normalize_color(options.get("b_color") or (255, 255, 255))
+    bf_color = normalize_color(options.get("bf_color") or b_color)
+    bf_width = options.get("bf_width", 1)
+    min_value = options.get("min_value", 0)
+    max_value = options.get("max_value", 100)
+
+    try:
+        bar_value = float(value)
+    except (TypeError, ValueError):
+        bar_value = min_value
+    bar_value = min(max(bar_value, min_value), max_value)
+
+    bar_w = img.width - 1
+    bar_h = img.height - 1
+    fill_w = int((bar_w - 2 * bf_width) * _ratio(bar_value, min_value, max_value))
+
+    draw = ImageDraw.Draw(img)
+    if bf_width > 0:
+        draw.rectangle((0, 0, bar_w, bar_h), width = bf_width, outline = bf_color)
+    if fill_w > 0:
+        draw.rectangle((bf_width, bf_width, bf_width + fill_w, bar_h - bf_width), fill = b_color)
+
+    if options.get("show_value"):
+        value_str = f"{int(bar_value)}" + options.get("val_appendix", "")
+        font_size = max(1, bar_h - 2 * bf_width - 2)
+        font = get_font(font_size, options.get("font"))
+        bbox = text_bbox(value_str, font_size, options.get("font"))
+        tx = (bar_w - (bbox[2] - bbox[0])) // 2 - bbox[0]
+        ty = (bar_h - (bbox[3] - bbox[1])) // 2 - bbox[1]
+
+        # Text über der Füllung in Hintergrundfarbe, daneben in Balkenfarbe
+        mask = Image.new("L", img.size, 0)
+        ImageDraw.Draw(mask).rectangle((0, 0, bf_width + fill_w, bar_h), fill = 255)
+        inverted = img.copy()
+        draw.text((tx, ty), value_str, font = font, fill = b_color)
+        ImageDraw.Draw(inverted).text((tx, ty), value_str, font = font, fill = bg_color)
+        img.paste(inverted, (0, 0), mask)
+
+
+def _render_gauge(img, options, value, icon):
+    from .commands import normalize_color
+
+    g_color = normalize_color(options.get("g_color") or (0, 255, 0))
+    ga_color = normalize_color(options.get("ga_color") or (64, 64, 64))
+    min_value = options.get("min_value", 0)
+    max_value = options.get("max_value", 100)
+
+    size = min(img.width, img.height)
+    g_width = options.get("g_width") or max(1, size // 8)
+    xs = (img.width - size) // 2
+    ys = (img.height - size) // 2
+    box = (xs, ys, xs + size - 1, ys + size - 1)
+
+    # 270° Bogen, unten offen
+    draw = ImageDraw.Draw(img)
+    draw.arc(box, start = 135, end = 405, fill = ga_color, width = g_width)
+
+    try:
+        g_value = min(max(float(value), min_value), max_value)
+    except (TypeError, ValueError):
+        return
+
+    ratio = _ratio(g_value, min_value, max_value)
+    if ratio > 0:
+        draw.arc(box, start = 135, end = 135 + 270 * ratio, fill = g_color, width = g_width)
+
+    if options.get("show_value", True):
+        t_color = normalize_color(options.get("t_color") or (255, 255, 255))
+        value_str = f"{g_value:.{options.get("decimals", 0)}f}" + options.get("val_appendix", "")
+        font_size = max(1, size // 4)
+        font = get_font(font_size, options.get("font"))
+        bbox = text_bbox(value_str, font_size, options.get("font"))
+        tx = (img.width - (bbox[2] - bbox[0])) // 2 - bbox[0]
+        ty = (img.height - (bbox[3] - bbox[1])) // 2 - bbox[1]
+        draw.text((tx, ty), value_str, font = font, fill = t_color)
+
+
+def _render_icon(img, options, value, icon):
+    if icon is None:
+        return
+
+    icon = icon.convert("RGBA")
+    img.alpha_composite(icon, ((img.width - icon.width) // 2, (img.height - icon.height) // 2))
+
+
+# widget type -> renderer
+WIDGET_RENDERERS = {
+    "text": _render_text,
+    "progress_bar": _render_progress_bar,
+    "gauge": _render_gauge,
+    "icon": _render_icon,
+}
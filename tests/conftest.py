@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# custom_components liegt im Wurzelverzeichnis des Repos, nicht installiert
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,77 @@
+#************************************************************************
+# send_bitmap_565 with FastLZ
+#
+# the decision between CMD_SET_BITMAP_FASTLZ and a raw CMD_SET_BITMAP is
+# made per stripe: a noisy stripe goes out raw, the flat stripes of the
+# same bitmap stay compressed
+#************************************************************************
+import asyncio
+import random
+import struct
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+import custom_components.weact_display.const as const
+from custom_components.weact_display.commands import send_bitmap_565
+from custom_components.weact_display.encoder import encode_rgb565
+
+HEADER_SIZE = struct.calcsize("<BHHHHB")
+
+
+class _Transport:
+    # keeps the frames instead of writing them
+    def __init__(self):
+        self.frames = []
+
+    async def async_send(self, segments, priority):
+        self.frames.append(b"".join(data for data, _ in segments))
+        return True
+
+
+def _raw_length(payload):
+    # raw bytes of all FastLZ chunks of one stripe, from their length prefixes
+    total = 0
+    offset = 0
+    while offset < len(payload):
+        raw_len, compressed_len = struct.unpack_from("<HH", payload, offset)
+        total += raw_len
+        offset += 4 + compressed_len
+    assert offset == len(payload)
+    return total
+
+
+def test_fastlz_is_chosen_per_stripe():
+    width, height, stripe_rows = 64, 40, 10
+    rnd = random.Random(4)
+    rgb = bytearray(bytes((0, 0, 80)) * width * height)
+    noisy = range(width * 20 * 3, width * 30 * 3)                     # dritter Streifen: Rauschen
+    rgb[noisy.start:noisy.stop] = bytes(rnd.randrange(256) for _ in noisy)
+    data_565 = encode_rgb565(bytes(rgb), width, height)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        transport = _Transport()
+        hass = SimpleNamespace(loop = loop, data = {const.DOMAIN: {"devices": {"test": {"transport": transport, "lock": asyncio.Lock()}}}})
+        try:
+            sent = await send_bitmap_565(hass, "test", 0, 0, width, height, data_565, stripe_bytes = width * 2 * stripe_rows, header_pause = 0, fastlz = True)
+        finally:
+            hass.data[const.DOMAIN].pop("render_executor").shutdown()
+        return sent, transport.frames
+
+    sent, frames = asyncio.run(run())
+
+    assert sent is True
+    assert [frame[0] for frame in frames] == [const.CMD_SET_BITMAP_FASTLZ, const.CMD_SET_BITMAP_FASTLZ, const.CMD_SET_BITMAP, const.CMD_SET_BITMAP_FASTLZ]
+    stripe_len = width * 2 * stripe_rows
+    for i, frame in enumerate(frames):
+        _, xs, ys, xe, ye, end = struct.unpack_from("<BHHHHB", frame)
+        assert (xs, ys, xe, ye, end) == (0, i * stripe_rows, width - 1, (i + 1) * stripe_rows - 1, 0x0A)
+        payload = frame[HEADER_SIZE:]
+        if frame[0] == const.CMD_SET_BITMAP:
+            assert payload == data_565[i * stripe_len:(i + 1) * stripe_len]
+        else:
+            assert _raw_length(payload) == stripe_len
+            assert len(payload) <= stripe_len * const.FASTLZ_MAX_RATIO
@@ -0,0 +1,159 @@
+#************************************************************************
+# RGB565 encoders and FastLZ compressor
+#
+# all encoders must produce the bytes of the reference loop, the fills
+# (CMD_FULL) and the bitmaps must agree on the byte order, and every
+# block of the compressor must decompress to its input again
+#************************************************************************
+import random
+import struct
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from PIL import Image
+
+from custom_components.weact_display.encoder import ENCODERS, encode_rgb565, encode_rgb565_reference, rgb565_color
+from custom_components.weact_display.fastlz import fastlz_compress
+from custom_components.weact_display.shadow import ShadowImage
+
+SIZES = [(1, 1), (3, 1), (1, 5), (7, 3), (17, 9), (33, 16), (161, 3)]
+
+
+def _random_rgb(width, height, seed):
+    rnd = random.Random(seed)
+    return bytes(rnd.randrange(256) for _ in range(width * height * 3))
+
+
+@pytest.mark.parametrize("encoder", sorted(ENCODERS))
+@pytest.mark.parametrize("width, height", SIZES)
+def test_encoders_match_reference(encoder, width, height):
+    data = _random_rgb(width, height, width * 1000 + height)
+
+    assert encode_rgb565(data, width, height, encoder) == encode_rgb565_reference(data, width, height)
+
+
+@pytest.mark.parametrize("encoder", sorted(ENCODERS))
+def test_encoders_accept_buffers(encoder):
+    data = _random_rgb(5, 3, 1)
+    expected = encode_rgb565_reference(data, 5, 3)
+
+    assert encode_rgb565(bytearray(data), 5, 3, encoder) == expected
+    assert encode_rgb565(memoryview(data), 5, 3, encoder) == expected
+
+
+@pytest.mark.parametrize("encoder", sorted(ENCODERS))
+def test_encoders_all_colors_of_a_channel(encoder):
+    # jeder Wert jedes Kanals einmal, deckt alle Bitgrenzen ab
+    data = bytearray()
+    for v in range(256):
+        data += bytes((v, 0, 0)) + bytes((0, v, 0)) + bytes((0, 0, v))
+
+    assert encode_rgb565(bytes(data), 256 * 3, 1, encoder) == encode_rgb565_reference(bytes(data), 256 * 3, 1)
+
+
+@pytest.mark.parametrize("encoder", sorted(ENCODERS))
+@pytest.mark.parametrize("color, expected", [
+    ((255, 0, 0),     b"\x00\xF8"),
+    ((0, 255, 0),     b"\xE0\x07"),
+    ((0, 0, 255),     b"\x1F\x00"),
+    ((255, 255, 255), b"\xFF\xFF"),
+    ((8, 4, 8),       b"\x21\x08"),
+])
+def test_byte_order_is_lsb_first(encoder, color, expected):
+    assert encode_rgb565(bytes(color), 1, 1, encoder) == expected
+
+
+@pytest.mark.parametrize("encoder", sorted(ENCODERS))
+def test_fill_color_matches_bitmap(encoder):
+    # CMD_FULL packt die Farbe per struct, die Bitmaps kommen aus dem Encoder
+    rnd = random.Random(7)
+    for _ in range(200):
+        color = tuple(rnd.randrange(256) for _ in range(3))
+        assert struct.pack("<H", rgb565_color(color)) == encode_rgb565(bytes(color), 1, 1, encoder)
+
+
+@pytest.mark.parametrize("encoder", sorted(ENCODERS))
+def test_rgba_is_rejected(encoder):
+    img = Image.new("RGBA", (3, 2), (10, 20, 30, 128))
+
+    with pytest.raises(ValueError):
+        encode_rgb565(img.tobytes(), 3, 2, encoder)
+
+
+def test_rgba_layers_are_composited_before_encoding():
+    shadow = ShadowImage(19, 7, (0, 0, 0))
+    overlay = Image.new("RGBA", (19, 7), (0, 0, 0, 0))
+    overlay.putpixel((3, 2), (255, 255, 255, 128))                         # halbtransparent
+    overlay.putpixel((18, 6), (12, 200, 40, 255))
+    shadow.paste(overlay, (0, 0), overlay)
+    shadow.composite()
+
+    data = shadow.image.tobytes()
+    assert len(data) == 19 * 7 * 3
+
+    frame = shadow.snapshot().prepare()
+    assert bytes(frame.region565((0, 0, 19, 7))) == encode_rgb565_reference(data, 19, 7)
+    assert bytes(frame.region565((3, 2, 17, 7))) == encode_rgb565_reference(shadow.image.crop((3, 2, 17, 7)).tobytes(), 14, 5)
+
+
+#************************************************************************
+# FastLZ level 1 decompressor, only to check the compressor
+#************************************************************************
+def _fastlz_decompress(block):
+    out = bytearray()
+    if not block:
+        return bytes(out)
+
+    ip = 1
+    ctrl = block[0] & 31
+    while True:
+        if ctrl >= 32:
+            length = (ctrl >> 5) - 1
+            ref = len(out) - ((ctrl & 31) << 8) - 1
+            if length == 6:
+                length += block[ip]
+                ip += 1
+            ref -= block[ip]
+            ip += 1
+            length += 3
+            assert ref >= 0
+            for _ in range(length):
+                out.append(out[ref])
+                ref += 1
+        else:
+            ctrl += 1
+            out += block[ip:ip + ctrl]
+            ip += ctrl
+
+        if ip >= len(block):
+            return bytes(out)
+        ctrl = block[ip]
+        ip += 1
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"a",
+    b"abc",
+    b"abcd" * 3,
+    bytes(100),
+    bytes(range(256)) * 40,
+    b"\x00\xF8" * 5000 + b"\x1F\x00" * 5000,
+    bytes(random.Random(3).randrange(256) for _ in range(5000)),
+    bytes(random.Random(4).randrange(4) for _ in range(20000)),
+])
+def test_fastlz_round_trip(data):
+    assert _fastlz_decompress(fastlz_compress(data)) == data
+
+
+def test_fastlz_round_trip_rgb565_image():
+    img = Image.new("RGB", (64, 48), (0, 0, 80))
+    for x in range(0, 64, 5):
+        img.putpixel((x, x % 48), (255, 255, 0))
+    data = encode_rgb565(img.tobytes(), 64, 48)
+
+    block = fastlz_compress(data)
+    assert len(block) < len(data)
+    assert _fastlz_decompress(block) == data
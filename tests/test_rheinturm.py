@@ -0,0 +1,214 @@
+#************************************************************************
+# Rheinturm clock through the serial transport on an emulated port
+#
+# show_rheinturm writes through SerialTransport into one end of a pty,
+# the test reads the other end like the display would and rebuilds the
+# panel from the received CMD_FULL and bitmap packets. Checked are the
+# bytes on the wire per second tick and that the panel shows the image
+# of the shadow
+#************************************************************************
+import asyncio
+import os
+import struct
+import tty
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+import custom_components.weact_display.clock as clock
+import custom_components.weact_display.const as const
+from custom_components.weact_display.commands import send_screen
+from custom_components.weact_display.encoder import encode_rgb565
+from custom_components.weact_display.models import DISPLAY_MODELS
+from custom_components.weact_display.shadow import ShadowImage
+from custom_components.weact_display.transport import SerialTransport
+
+FILL_SIZE = struct.calcsize("<BHHHHHB")
+BITMAP_HEADER_SIZE = struct.calcsize("<BHHHHB")
+
+
+class _PtyPort:
+    # the part of a pyserial port the transport uses
+    def __init__(self, fd):
+        self._fd = fd
+
+    def fileno(self):
+        return self._fd
+
+    def close(self):
+        os.close(self._fd)
+
+
+class _Panel:
+    # the display end of the pty: parses the packets into an RGB565 image
+    def __init__(self, fd, width, height):
+        self.fd = fd
+        self.width = width
+        self.buffer = bytearray(width * height * 2)
+        self.received = 0
+        self.fills = 0
+        self.bitmaps = 0
+        self._data = bytearray()
+
+    def read(self):
+        try:
+            chunk = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return
+        self.received += len(chunk)
+        self._data += chunk
+        self._parse()
+
+    def _parse(self):
+        while self._data:
+            command = self._data[0]
+            if command == 0x04:
+                if len(self._data) < FILL_SIZE:
+                    return
+                _, xs, ys, xe, ye, color, end = struct.unpack_from("<BHHHHHB", self._data)
+                assert end == 0x0A
+                pixel = struct.pack("<H", color)
+                for y in range(ys, ye + 1):
+                    self._put(xs, y, pixel * (xe - xs + 1))
+                del self._data[:FILL_SIZE]
+                self.fills += 1
+            elif command == const.CMD_SET_BITMAP:
+                if len(self._data) < BITMAP_HEADER_SIZE:
+                    return
+                _, xs, ys, xe, ye, end = struct.unpack_from("<BHHHHB", self._data)
+                assert end == 0x0A
+                row = (xe - xs + 1) * 2
+                size = BITMAP_HEADER_SIZE + row * (ye - ys + 1)
+                if len(self._data) < size:
+                    return
+                for y in range(ys, ye + 1):
+                    offset = BITMAP_HEADER_SIZE + (y - ys) * row
+                    self._put(xs, y, self._data[offset:offset + row])
+                del self._data[:size]
+                self.bitmaps += 1
+            else:
+                raise AssertionError(f"unexpected command 0x{command:02X} on the wire")
+
+    def _put(self, xs, y, data):
+        start = (y * self.width + xs) * 2
+        self.buffer[start:start + len(data)] = data
+
+
+class _Clock(datetime):
+    now_value = None
+
+    @classmethod
+    def now(cls, tz = None):
+        return cls.now_value
+
+
+async def _settle(panel, transport):
+    # alles Geschriebene beim Panel angekommen
+    for _ in range(200):
+        if panel.received == transport.bytes_written:
+            return
+        await asyncio.sleep(0.005)
+    assert panel.received == transport.bytes_written
+
+
+async def _run(monkeypatch, tmp_path, model, width, height, start, seconds):
+    monkeypatch.setattr(const, "IMG_PATH", tmp_path)
+    monkeypatch.setattr(clock, "datetime", _Clock)
+    loop = asyncio.get_running_loop()
+
+    master, slave = os.openpty()
+    tty.setraw(slave)                                                  # keine Zeilenumsetzung im pty
+    os.set_blocking(master, False)
+    panel = _Panel(master, width, height)
+    loop.add_reader(master, panel.read)
+
+    hass = SimpleNamespace(loop = loop, data = {}, async_add_executor_job = lambda func, *args: loop.run_in_executor(None, func, *args))
+    transport = SerialTransport(hass, "test", _PtyPort(slave), on_data = lambda data: None)
+    device = {
+        "model": model,
+        "width": width,
+        "height": height,
+        "orientation_value": 2,
+        "background_color": (0, 0, 0),
+        "fastlz": False,
+        "header_pause": 0,
+        "clock_mode": "rheinturm",
+        "lock": asyncio.Lock(),
+        "shadow": ShadowImage(width, height, (0, 0, 0)),
+        "render_lock": asyncio.Lock(),
+        "flush_waiter": None,
+        "flush_task": None,
+        "flush_event": asyncio.Event(),
+        "transport": transport,
+    }
+    hass.data[const.DOMAIN] = {"devices": {"test": device}}
+    transport.start()
+
+    ticks = []
+    try:
+        await send_screen(hass, "test", full = True)                   # Panelinhalt bekannt machen
+
+        _Clock.now_value = start
+        await clock.show_rheinturm(hass, "test")
+        await _settle(panel, transport)
+        for _ in range(seconds):
+            _Clock.now_value += timedelta(seconds = 1)
+            received, fills, bitmaps = panel.received, panel.fills, panel.bitmaps
+            await clock.show_rheinturm(hass, "test")
+            await _settle(panel, transport)
+            assert panel.received - received == device["rheinturm_bytes"]
+            ticks.append((_Clock.now_value.strftime("%H:%M:%S"), device["rheinturm_bytes"], panel.fills - fills, panel.bitmaps - bitmaps))
+
+        shadow = device["shadow"]
+        assert bytes(panel.buffer) == encode_rgb565(shadow.image.tobytes(), width, height)
+    finally:
+        loop.remove_reader(master)
+        await transport.async_stop()
+        os.close(master)
+        clock._rheinturm_tower.cache_clear()
+
+    return {time_str: (sent, fills, bitmaps) for time_str, sent, fills, bitmaps in ticks}
+
+
+def test_wire_budget_480x320(monkeypatch, tmp_path):
+    ticks = asyncio.run(_run(monkeypatch, tmp_path, "FS V1", 480, 320, datetime(2026, 10, 18, 23, 59, 45), 30))
+    budget = DISPLAY_MODELS["FS V1"]["rheinturm_budget"]
+
+    for time_str, (sent, fills, bitmaps) in ticks.items():
+        assert sent <= budget, time_str
+        assert bitmaps == 0, time_str                                  # Lampen gehen nur als CMD_FULL raus
+        assert sent == fills * FILL_SIZE, time_str
+
+    # gewöhnliche Sekunde: eine Lampe an, höchstens zwei Kacheln
+    assert ticks["23:59:51"][0] <= 2 * FILL_SIZE
+    assert ticks["00:00:01"][0] <= 2 * FILL_SIZE
+    # Wechsel der Zehner und Mitternacht: nur wenige Rechtecke
+    assert ticks["23:59:50"][0] <= 8 * FILL_SIZE
+    assert ticks["00:00:00"][0] <= 32 * FILL_SIZE
+
+
+def test_wire_budget_160x80(monkeypatch, tmp_path):
+    ticks = asyncio.run(_run(monkeypatch, tmp_path, "FS 0.96 Inch", 160, 80, datetime(2026, 10, 18, 23, 59, 45), 30))
+    budget = DISPLAY_MODELS["FS 0.96 Inch"]["rheinturm_budget"]
+
+    for time_str, (sent, fills, bitmaps) in ticks.items():
+        assert sent <= budget, time_str
+
+    assert ticks["23:59:51"][0] <= 2 * FILL_SIZE
+
+
+# die teuersten Stundenwechsel (die meisten Lampen schalten) je Modell, hochkant
+@pytest.mark.parametrize("model, width, height, hour", [
+    ("FS V1", 320, 480, 19),
+    ("FS V1", 480, 320, 9),
+    ("FS 0.96 Inch", 80, 160, 9),
+    ("FS 0.96 Inch", 160, 80, 0),
+])
+def test_wire_budget_hour_rollover(monkeypatch, tmp_path, model, width, height, hour):
+    ticks = asyncio.run(_run(monkeypatch, tmp_path, model, width, height, datetime(2026, 10, 18, hour, 59, 58), 3))
+
+    for time_str, (sent, fills, bitmaps) in ticks.items():
+        assert sent <= DISPLAY_MODELS[model]["rheinturm_budget"], time_str
@@ -0,0 +1,92 @@
+#************************************************************************
+# storage of the widgets
+#
+# the definitions go into the entry options, only when they change. The
+# last values go into the store of the display, delayed, and values of
+# widgets bound to an entity are not stored at all
+#************************************************************************
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from homeassistant.core import HomeAssistant
+
+import custom_components.weact_display.commands as commands
+import custom_components.weact_display.const as const
+import custom_components.weact_display.widgets as widgets
+from custom_components.weact_display.shadow import ShadowImage
+
+
+class _ConfigEntries:
+    # counts the updates of the one config entry of the test
+    def __init__(self, entry):
+        self.entry = entry
+        self.updates = 0
+
+    def async_get_entry(self, entry_id):
+        return self.entry
+
+    def async_update_entry(self, entry, options):
+        self.updates += 1
+        entry.options = options
+
+
+def _device():
+    return {
+        "entry_id": "entry",
+        "width": 160,
+        "height": 80,
+        "background_color": (0, 0, 0),
+        "shadow": ShadowImage(160, 80, (0, 0, 0)),
+        "render_lock": asyncio.Lock(),
+    }
+
+
+async def _run(tmp_path, monkeypatch):
+    async def send_screen(hass, serial_number, full = False):
+        pass
+    monkeypatch.setattr(commands, "send_screen", send_screen)
+
+    hass = HomeAssistant(str(tmp_path))
+    entry = SimpleNamespace(options = {})
+    hass.config_entries = _ConfigEntries(entry)
+    hass.data[const.DOMAIN] = {"devices": {"test": _device()}}
+    hass.states.async_set("sensor.temp", "21.5", {"unit_of_measurement": "°C"})
+    store_file = tmp_path / ".storage" / f"{const.DOMAIN}.widgets_test"
+
+    try:
+        await widgets.load_widgets(hass, "test", entry.options)
+        await widgets.register_widget(hass, "test", "label", "text", 0, 0, 79, 19, value = "one")
+        await widgets.register_widget(hass, "test", "temp", "text", 0, 20, 79, 39, entity_id = "sensor.temp")
+        assert hass.config_entries.updates == 2
+
+        # neue Werte ändern die Definitionen nicht und werden verzögert gespeichert
+        for value in ("two", "three", "four"):
+            await widgets.update_widget(hass, "test", "label", value)
+        await widgets.update_widget(hass, "test", "temp", "22.0 °C")
+        assert hass.config_entries.updates == 2
+        assert "value" not in json.dumps(entry.options)
+        assert not store_file.exists()
+
+        await widgets.save_widget_values(hass, "test")
+        assert json.loads(store_file.read_text())["data"] == {"label": "four"}
+
+        # nach einem Neustart: Wert aus dem Store, gebundenes Widget aus der Entität
+        widgets.unbind_widgets(hass, "test")
+        hass.data[const.DOMAIN]["devices"]["test"] = _device()
+        await widgets.load_widgets(hass, "test", entry.options)
+        await widgets.draw_widgets(hass, "test")
+        loaded = hass.data[const.DOMAIN]["devices"]["test"]["widgets"]
+        assert loaded["label"]["value"] == "four"
+        assert loaded["temp"]["value"] == "21.5 °C"
+        widgets.unbind_widgets(hass, "test")
+    finally:
+        await hass.async_stop(force = True)
+
+
+def test_values_are_not_stored_in_the_entry(tmp_path, monkeypatch):
+    asyncio.run(_run(tmp_path, monkeypatch))